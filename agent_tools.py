@@ -0,0 +1,324 @@
+import datetime as dt
+import functools
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from typing import Annotated, Optional
+
+import pandas as pd
+
+from fetch_engine import SingleFlight
+from llm_cache import OllamaModelClient, register_ollama_client
+from market_calendar import last_publish
+from tracing import span
+
+
+DEFAULT_TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH",
+                                    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tool_cache.sqlite"))
+DEFAULT_MAX_RESULTS = 2000      # LRU limit on cached tool results
+AGENT_MODEL = os.getenv("AGENT_MODEL", "llama3.1:8b")     # needs an Ollama model with tool calling
+MAX_TOOL_ROUNDS = 8             # tool calls the executor answers before the chat ends
+ANALYST_PROMPT = ("You are a financial analyst. Use the provided tools to look up prices and gains "
+                  "instead of writing code, and never guess numbers. Dates are YYYY-MM-DD; leave them "
+                  "out for year-to-date. When you have the answer, reply with a short summary and no "
+                  "further tool calls.")
+
+
+class ToolCache:
+    """
+    Persistent memo of agent tool results keyed by (tool, normalized arguments).
+    Agents repeat the same lookups across turns and runs, often spelled differently
+    ('nvda' vs 'NVDA', a symbol list in another order); the tools normalize their
+    arguments first, so all of those share one entry. A result computed before the
+    latest daily bar was published (market_calendar.last_publish) is recomputed, so a
+    cached answer never lags the price data. Identical calls in flight at the same time
+    share one computation, and errors are never cached.
+    """
+
+    def __init__(self, path = DEFAULT_TOOL_CACHE_PATH, max_results = DEFAULT_MAX_RESULTS):
+        """
+        Args:
+            path (str): SQLite file path, or ':memory:' for a throw-away cache.
+            max_results (int): Maximum number of cached results before LRU eviction.
+        """
+        self.path = path
+        self.max_results = max_results
+        self.hits = 0
+        self.misses = 0
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                tool        TEXT NOT NULL,
+                arguments   TEXT NOT NULL,
+                result      TEXT NOT NULL,
+                computed_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (tool, arguments)
+            )
+        """)
+
+    @staticmethod
+    def key(arguments):
+        """Canonical JSON of the normalized arguments; key order and spacing never matter."""
+        return json.dumps(arguments, sort_keys = True, separators = (",", ":"), default = str)
+
+    def get_or_call(self, tool, arguments, fn):
+        """
+        Returns the cached result of a tool call, computing and storing it when missing or stale.
+        Args:
+            tool (str): Tool name.
+            arguments (dict): Normalized arguments.
+            fn (callable): Zero-argument function computing the result (a string).
+        Returns:
+            str: The tool result.
+        """
+        key = self.key(arguments)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute("SELECT result, computed_at FROM results WHERE tool = ? AND arguments = ?",
+                                     (tool, key)).fetchone()
+
+            if row is not None and row[1] >= last_publish(now):
+                self.hits += 1
+
+                with self._conn:
+                    self._conn.execute("UPDATE results SET last_access = ? WHERE tool = ? AND arguments = ?",
+                                       (now, tool, key))
+
+                return row[0]
+
+            self.misses += 1
+
+        with span("tool.call", tool = tool):
+            return self._flights.do((tool, key), lambda: self._store(tool, key, fn()))
+
+    def _store(self, tool, key, result):
+        now = time.time()
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                               (tool, key, result, now, now))
+            self._conn.execute("DELETE FROM results WHERE rowid IN (SELECT rowid FROM results "
+                               "ORDER BY last_access DESC LIMIT -1 OFFSET ?)", (self.max_results,))
+
+        return result
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM results")
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses', 'hit_rate' and the number of stored 'results'.
+        """
+        with self._lock:
+            stored = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+        total = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0, "results": stored}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_tool_cache():
+    """
+    Returns:
+        ToolCache: The process-wide tool cache (TOOL_CACHE_PATH).
+    """
+    global _default_cache
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ToolCache()
+
+        return _default_cache
+
+
+def normalize_window(start_date = None, end_date = None):
+    """
+    Normalizes a date window the way agents tend to vary it.
+    Returns:
+        tuple[str, str]: ISO start and end dates; the end defaults to today (and is
+        clamped to it), the start to 1 January of the end date's year.
+    """
+    today = dt.date.today()
+    end = min(pd.Timestamp(end_date).date(), today) if end_date else today
+    start = pd.Timestamp(start_date).date() if start_date else dt.date(end.year, 1, 1)
+
+    if start > end:
+        raise ValueError(f"start_date {start} is after end_date {end}.")
+
+    return start.isoformat(), end.isoformat()
+
+
+def memoized_tool(normalize):
+    """
+    Caches a tool in the default ToolCache under its normalized arguments.
+    Args:
+        normalize (callable): Takes the tool's arguments, returns them as a normalized dict.
+    Returns:
+        callable: Decorator. The wrapped tool keeps its signature, so AutoGen still builds
+        its schema from the annotations, and returns {"error": ...} instead of raising.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                arguments = normalize(*args, **kwargs)
+
+                return default_tool_cache().get_or_call(fn.__name__, arguments, lambda: fn(**arguments))
+
+            except ValueError as e:
+                return json.dumps({"error": str(e)})
+
+        return wrapper
+
+    return decorate
+
+
+def _source():
+    from price_sources import get_source
+
+    return get_source(os.getenv("ALPHAVANTAGE_API_KEY"))
+
+
+def _symbol_window(symbol, start_date = None, end_date = None):
+    from stock_comparison import parse_symbols
+
+    symbols = parse_symbols(symbol, max_symbols = 1)
+
+    if not symbols:
+        raise ValueError(f"Invalid ticker symbol {symbol!r}.")
+
+    start, end = normalize_window(start_date, end_date)
+
+    return {"symbol": symbols[0], "start_date": start, "end_date": end}
+
+
+def _symbols_window(symbols, start_date = None, end_date = None):
+    from stock_comparison import parse_symbols
+
+    # Gains do not depend on the order, so ['IBM', 'NVDA'] and 'nvda, ibm' share an entry
+    parsed = sorted(parse_symbols(symbols if isinstance(symbols, str) else " ".join(symbols)))
+
+    if not parsed:
+        raise ValueError(f"Invalid ticker symbols {symbols!r}.")
+
+    start, end = normalize_window(start_date, end_date)
+
+    return {"symbols": parsed, "start_date": start, "end_date": end}
+
+
+@memoized_tool(_symbol_window)
+def get_price_summary(symbol: Annotated[str, "Ticker symbol, e.g. NVDA"],
+                      start_date: Annotated[Optional[str], "First date (YYYY-MM-DD); 1 January when omitted"] = None,
+                      end_date: Annotated[Optional[str], "Last date (YYYY-MM-DD); today when omitted"] = None) -> str:
+    """Daily price summary of one stock: first/last/high/low close and the change in percent."""
+    close = _source().fetch(symbol, start_date, end_date)['adj_close']
+
+    if close.dropna().empty:
+        raise ValueError(f"No prices for {symbol} between {start_date} and {end_date}.")
+
+    close = close.dropna()
+
+    return json.dumps({"symbol": symbol, "first_date": str(close.index[0].date()),
+                       "last_date": str(close.index[-1].date()), "bars": len(close),
+                       "first_close": round(float(close.iloc[0]), 4), "last_close": round(float(close.iloc[-1]), 4),
+                       "high": round(float(close.max()), 4), "low": round(float(close.min()), 4),
+                       "change_pct": round(float(close.iloc[-1] / close.iloc[0] - 1) * 100, 2)})
+
+
+@memoized_tool(_symbols_window)
+def get_gains(symbols: Annotated[list[str], "Ticker symbols, e.g. ['NVDA', 'IBM']"],
+              start_date: Annotated[Optional[str], "First date (YYYY-MM-DD); 1 January when omitted"] = None,
+              end_date: Annotated[Optional[str], "Last date (YYYY-MM-DD); today when omitted"] = None) -> str:
+    """Cumulative gain in percent of each stock over a date window (year-to-date by default), best first."""
+    from stock_comparison import compare, final_gains
+
+    gains, missing = compare(symbols, start_date, end_date, _source())
+
+    if gains.empty:
+        raise ValueError(f"No prices for {', '.join(symbols)} between {start_date} and {end_date}.")
+
+    return json.dumps({"start_date": start_date, "end_date": end_date,
+                       "gains_pct": final_gains(gains).round(2).to_dict(), "missing": missing})
+
+
+TOOLS = [get_price_summary, get_gains]
+
+
+def register_tools(caller, executor, tools = TOOLS):
+    """
+    Registers the finance tools with a pair of AutoGen agents.
+    Args:
+        caller (ConversableAgent): Agent whose LLM may call the tools.
+        executor (ConversableAgent): Agent that runs them (through the ToolCache).
+        tools (list[callable]): Tools to register.
+    """
+    from autogen import register_function
+
+    for tool in tools:
+        register_function(tool, caller = caller, executor = executor, name = tool.__name__,
+                          description = inspect.getdoc(tool))
+
+
+def ollama_llm_config(model = AGENT_MODEL):
+    """
+    Returns:
+        dict: AutoGen llm_config that answers through llm_cache.OllamaModelClient, so repeated
+        agent turns are served from the LLM cache; greedy decoding makes them repeatable.
+    """
+    return {"config_list": [{"model": model, "model_client_cls": OllamaModelClient.__name__, "temperature": 0}],
+            "cache_seed": None}
+
+
+def build_agents(llm_config):
+    """
+    Creates the analyst (LLM, calls tools) and the executor (runs tools, no LLM, no code execution).
+    Returns:
+        tuple[AssistantAgent, UserProxyAgent]: The analyst and the executor.
+    """
+    # AutoGen takes over a second to import, so it is loaded on the first pipeline run
+    from autogen import AssistantAgent, UserProxyAgent
+
+    analyst = AssistantAgent(name = "finance_analyst", llm_config = llm_config,
+                             system_message = ANALYST_PROMPT)
+    executor = UserProxyAgent(name = "tool_executor", human_input_mode = "NEVER",
+                              code_execution_config = False, llm_config = False,
+                              max_consecutive_auto_reply = MAX_TOOL_ROUNDS,
+                              # The analyst's first reply without tool calls is its answer
+                              is_termination_msg = lambda message: not message.get("tool_calls"))
+    register_tools(analyst, executor)
+    # Registering tools rebuilds the analyst's client, so the model client is registered last
+    register_ollama_client(analyst)
+
+    return analyst, executor
+
+
+def run_analysis(question, llm_config = None):
+    """
+    Answers a question about stocks with the tool-calling agent pair.
+    Args:
+        question (str): e.g. "How did NVDA and IBM do this year?"
+        llm_config (dict | None): AutoGen llm_config; ollama_llm_config() when None.
+    Returns:
+        tuple[str, dict]: The analyst's answer and the tool cache statistics.
+    """
+    analyst, executor = build_agents(llm_config or ollama_llm_config())
+
+    with span("agent.chat"):
+        result = executor.initiate_chat(analyst, message = question, summary_method = "last_msg")
+
+    return result.summary, default_tool_cache().stats()
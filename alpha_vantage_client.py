@@ -0,0 +1,67 @@
+import os
+
+import requests
+
+from alpha_vantage.timeseries import TimeSeries
+from fetch_engine import MAX_WORKERS, RateLimiter
+from requests.adapters import HTTPAdapter
+from tracing import span
+
+
+def create_session(pool_size = MAX_WORKERS):
+    """
+    Creates an HTTP session whose connection pool is shared by all worker threads.
+    Args:
+        pool_size (int): Number of keep-alive connections per host.
+    Returns:
+        requests.Session: Session with a sized connection pool.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+_session = create_session()
+
+
+class PooledTimeSeries(TimeSeries):
+    """
+    TimeSeries client that sends every request through one pooled HTTP session
+    and waits on a rate limiter before contacting Alpha Vantage.
+    base_url replaces the Alpha Vantage query endpoint, e.g. 'http://127.0.0.1:8765/query?';
+    it defaults to the ALPHAVANTAGE_BASE_URL environment variable.
+    """
+
+    def __init__(self, *args, session = None, limiter = None, base_url = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session = session or _session
+        self.limiter = limiter or RateLimiter()
+        self.base_url = base_url or os.getenv("ALPHAVANTAGE_BASE_URL")
+
+    def _handle_api_call(self, url):
+        # Same checks as AlphaVantage._handle_api_call, using the pooled session
+        if self.base_url:
+            url = url.replace(TimeSeries._ALPHA_VANTAGE_API_URL, self.base_url, 1)
+
+        with span("alpha_vantage.rate_limit_wait"):
+            self.limiter.acquire()
+
+        with span("alpha_vantage.http"):
+            response = self.session.get(url, proxies = self.proxy, headers = self.headers)
+
+        with span("alpha_vantage.json"):
+            json_response = response.json()
+
+        if not json_response:
+            raise ValueError('Error getting data from the api, no return was given.')
+        elif "Error Message" in json_response:
+            raise ValueError(json_response["Error Message"])
+        elif "Information" in json_response and self.treat_info_as_error:
+            raise ValueError(json_response["Information"])
+        elif "Note" in json_response and self.treat_info_as_error:
+            raise ValueError(json_response["Note"])
+
+        return json_response
@@ -0,0 +1,331 @@
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+HISTORY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_history.json")
+REGRESSION_THRESHOLD = 1.25     # fail when a median is this many times slower than the baseline
+BASELINE_RUNS = 5               # baseline = median of the last N saved runs on this machine
+DEFAULT_REPEAT = 7
+SYMBOL_COUNTS = [1, 10, 100, 1000]
+RENDER_DPIS = [72, 100, 300]
+BENCH_START, BENCH_END = "2025-01-02", "2025-10-31"     # inside the replay server's synthetic data
+STARTUP_APPS = ["gradio_plot_ytd_stock", "gradio_ytd_stock_data_with_AV", "gradio_ollama_control_panel",
+                "gradio_ollama_model_check", "test_autogen_ollama_minimal"]
+STARTUP_BUDGET = 1.0    # seconds an app's import may add on top of `import gradio`
+# Loaded on first use only; importing an app must not pull them in
+LAZY_MODULES = ["matplotlib", "yfinance", "alpha_vantage", "requests", "autogen", "ollama"]
+
+
+def measure(fn, repeat = DEFAULT_REPEAT, warmup = 1):
+    """
+    Times repeated calls of fn.
+    Args:
+        fn (callable): Zero-argument function to time.
+        repeat (int): Timed calls.
+        warmup (int): Untimed calls made first (imports, caches, JIT-like warm-up).
+    Returns:
+        dict: 'min', 'median' and 'mean' seconds, and 'repeat'.
+    """
+    for _ in range(warmup):
+        fn()
+
+    times = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+
+    return {"min": min(times), "median": statistics.median(times),
+            "mean": statistics.fmean(times), "repeat": repeat}
+
+
+def synthetic_closes(count, bars = 250):
+    """Random-walk close series for `count` symbols over `bars` business days."""
+    rng = np.random.default_rng(count)
+    index = pd.bdate_range(end = BENCH_END, periods = bars)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (bars, count)), axis = 0))
+
+    return {f"S{i:04d}": pd.Series(prices[:, i], index = index) for i in range(count)}
+
+
+def gain_cases():
+    from gain_kernel import cumulative_gain, gains_frame
+    from incremental_gains import IncrementalGains
+
+    for count in SYMBOL_COUNTS:
+        closes = synthetic_closes(count)
+
+        yield f"gains[{count} symbols]", lambda closes = closes: gains_frame(closes)
+
+    close = synthetic_closes(1, bars = 5000)["S0000"]
+    engine = IncrementalGains()
+    engine.update("S0000", BENCH_START, close)
+
+    yield "gains_full[1 symbol, 5000 bars]", lambda: cumulative_gain(close)
+    yield "gains_incremental[1 symbol, 5000 bars]", lambda: engine.update("S0000", BENCH_START, close)
+    yield "gains_push[1 bar]", lambda: engine.push("S0000", BENCH_START, close.index[-1], close.iloc[-1])
+
+
+def parse_cases(server):
+    from alpha_vantage_client import PooledTimeSeries
+    from fetch_engine import RateLimiter
+
+    # Unlimited quota: the case measures HTTP + JSON + pandas parsing, not the rate limiter
+    ts = PooledTimeSeries(key = "benchmark", output_format = 'pandas', base_url = server.alpha_vantage_url,
+                          limiter = RateLimiter(per_minute = 10 ** 9, per_day = 10 ** 9))
+
+    yield "parse_full_history[5000 bars]", lambda: ts.get_daily(symbol = "NVDA", outputsize = 'full')
+
+
+def store_cases():
+    from price_sources import slice_dates
+    from price_store import PriceStore
+
+    store = PriceStore(tempfile.mkdtemp())
+    closes = synthetic_closes(100, bars = 5000)
+    symbols = list(closes)
+
+    for symbol, close in closes.items():
+        store.write(symbol, pd.DataFrame({'close': close, 'adj_close': close, 'volume': 1.0}))
+
+    frame = pd.DataFrame({'close': closes[symbols[0]]})
+
+    yield "slice_dates[1 year of 5000 bars]", lambda: slice_dates(frame, "2024-11-01", BENCH_END)
+    yield "store_read[1 year of 5000 bars]", lambda: store.read(symbols[0], "2024-11-01", BENCH_END)
+    yield "store_aligned[100 symbols, 1 year]", lambda: store.aligned(symbols, "2024-11-01", BENCH_END)
+
+
+def render_cases():
+    from chart_render import close_figure, decimate_gains, plot_gains
+    from gain_kernel import gains_frame
+
+    gains = dict(gains_frame(synthetic_closes(2)).items())
+    long_gains = dict(gains_frame(synthetic_closes(10, bars = 5000)).items())
+
+    for dpi in RENDER_DPIS:
+        def render(dpi = dpi):
+            fig = plot_gains(gains, "Benchmark", figsize = (12, 7))
+            fig.savefig(io.BytesIO(), format = 'png', dpi = dpi)
+            close_figure(fig)
+
+        yield f"render_png[{dpi} dpi]", render
+
+    yield "decimate_gains[10 x 5000 bars]", lambda: decimate_gains(long_gains)
+
+
+def handler_cases(server):
+    from gradio_ytd_stock_data_with_AV import fetch_and_plot_stocks
+
+    def stock_chart():
+        chart, _, message = fetch_and_plot_stocks("benchmark", "NVDA", "IBM", BENCH_START, BENCH_END)
+
+        if chart is None:
+            raise RuntimeError(message)
+
+    yield "handler_stock_chart[2 symbols, cached prices]", stock_chart
+
+    from gradio_ollama_control_panel import chat_handler
+
+    def chat():
+        for _ in chat_handler(server.models[0], "", "Summarise the YTD gains of NVDA and IBM."):
+            pass
+
+    yield "handler_chat[streamed]", chat
+
+
+def run(pattern = "", repeat = DEFAULT_REPEAT):
+    """
+    Runs every benchmark case whose name contains pattern against a local replay server.
+    Returns:
+        dict[str, dict]: Timings keyed by case name.
+    """
+    from replay_server import ReplayServer
+
+    results = {}
+
+    with ReplayServer(port = 0, premium = True, load_seconds = 0.0, token_seconds = 0.0) as server:
+        # Every client created from here on talks to the replay server
+        os.environ["ALPHAVANTAGE_BASE_URL"] = server.alpha_vantage_url
+        os.environ["OLLAMA_HOST"] = server.url
+
+        groups = [gain_cases(), parse_cases(server), store_cases(), render_cases(), handler_cases(server)]
+
+        for group in groups:
+            for name, fn in group:
+                if pattern not in name:
+                    continue
+
+                results[name] = measure(fn, repeat)
+                print(f"{name:<50} median {results[name]['median'] * 1000:9.2f} ms   "
+                      f"min {results[name]['min'] * 1000:9.2f} ms")
+
+    return results
+
+
+def import_profile(module):
+    """
+    Imports a module in a fresh interpreter under `python -X importtime`.
+    Args:
+        module (str): Module name, e.g. 'gradio_plot_ytd_stock'.
+    Returns:
+        dict: 'seconds' for the whole import, 'gradio' for the part spent importing gradio,
+        and 'modules', the set of top-level packages that were loaded.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output = True, text = True, cwd = os.path.dirname(os.path.abspath(__file__)))
+
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {result.stderr.strip().splitlines()[-1]}")
+
+    profile = {"seconds": 0.0, "gradio": 0.0, "modules": set()}
+
+    # Lines look like "import time:  self [us] | cumulative | <indent>name"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("package"):
+            continue
+
+        _, cumulative, name = line.split("|")
+        profile["modules"].add(name.strip().split(".")[0])
+
+        if name.strip() == module:
+            profile["seconds"] = int(cumulative) / 1e6
+        elif name.strip() == "gradio" and not profile["gradio"]:
+            profile["gradio"] = int(cumulative) / 1e6
+
+    return profile
+
+
+def check_startup(apps = STARTUP_APPS, budget = STARTUP_BUDGET):
+    """
+    Profiles the import of every Gradio app and checks it against the startup budget.
+    Returns:
+        list[str]: One line per app that is over budget or imports a LAZY_MODULES package.
+    """
+    baseline = import_profile("gradio")["modules"]
+    failed = []
+
+    for app in apps:
+        profile = import_profile(app)
+        own = profile["seconds"] - profile["gradio"]
+        eager = [name for name in LAZY_MODULES if name in profile["modules"] and name not in baseline]
+        print(f"startup[{app}]".ljust(50) + f" total {profile['seconds'] * 1000:8.0f} ms   "
+              f"gradio {profile['gradio'] * 1000:6.0f} ms   app {own * 1000:6.0f} ms")
+
+        if own > budget:
+            failed.append(f"{app}: {own * 1000:.0f} ms on top of gradio (budget {budget * 1000:.0f} ms)")
+
+        if eager:
+            failed.append(f"{app}: imports {', '.join(eager)} at startup")
+
+    return failed
+
+
+def load_history(path = HISTORY_PATH):
+    if not os.path.exists(path):
+        return []
+
+    with open(path, encoding = "utf-8") as f:
+        return json.load(f)
+
+
+def baseline(history, machine, runs = BASELINE_RUNS):
+    """
+    Returns:
+        dict[str, float]: Median of the last `runs` saved medians per case, for this machine only.
+    """
+    samples = {}
+
+    for record in [record for record in history if record["machine"] == machine][-runs:]:
+        for name, timing in record["results"].items():
+            samples.setdefault(name, []).append(timing["median"])
+
+    return {name: statistics.median(values) for name, values in samples.items()}
+
+
+def regressions(results, reference, threshold = REGRESSION_THRESHOLD):
+    """
+    Returns:
+        list[str]: One line per case that got slower than threshold × its baseline.
+    """
+    lines = []
+
+    for name, timing in results.items():
+        if name in reference and timing["median"] > reference[name] * threshold:
+            lines.append(f"{name}: {timing['median'] * 1000:.2f} ms vs baseline "
+                         f"{reference[name] * 1000:.2f} ms ({timing['median'] / reference[name]:.2f}x)")
+
+    return lines
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output = True,
+                              text = True, cwd = os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+    except OSError:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Benchmarks of the fetch → transform → render pipeline.")
+    parser.add_argument("-k", "--filter", default = "", help = "only run cases whose name contains this")
+    parser.add_argument("--repeat", type = int, default = DEFAULT_REPEAT)
+    parser.add_argument("--threshold", type = float, default = REGRESSION_THRESHOLD)
+    parser.add_argument("--save", action = "store_true", help = "append this run to the history file")
+    parser.add_argument("--history", default = HISTORY_PATH)
+    parser.add_argument("--startup", action = "store_true",
+                        help = "only profile the apps' import time against the startup budget")
+    args = parser.parse_args()
+
+    if args.startup:
+        failed = check_startup()
+
+        if failed:
+            print("\n❌ Startup budget exceeded:")
+            print("\n".join(failed))
+            sys.exit(1)
+
+        print("\n✅ Every app starts within the budget.")
+        return
+
+    # Keep benchmark data out of the real price cache and store
+    scratch = tempfile.mkdtemp()
+    os.environ.setdefault("PRICE_CACHE_PATH", os.path.join(scratch, "price_cache.sqlite"))
+    os.environ.setdefault("PRICE_STORE_DIR", os.path.join(scratch, "price_store"))
+    # handler_chat measures streaming from the model, not LLM cache hits
+    os.environ.setdefault("LLM_CACHE", "0")
+
+    results = run(args.filter, args.repeat)
+    machine = platform.node()
+    history = load_history(args.history)
+    failed = regressions(results, baseline(history, machine), args.threshold)
+
+    if args.save:
+        history.append({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+                        "machine": machine, "python": platform.python_version(), "results": results})
+
+        with open(args.history, "w", encoding = "utf-8") as f:
+            json.dump(history, f, indent = 1)
+
+    if failed:
+        print(f"\n❌ Performance regressions (threshold {args.threshold}x):")
+        print("\n".join(failed))
+        sys.exit(1)
+
+    print("\n✅ No regressions against the saved baseline.")
+
+
+if __name__ == "__main__":
+    main()
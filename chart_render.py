@@ -0,0 +1,174 @@
+import numpy as np
+import pandas as pd
+
+
+MAX_CHART_POINTS = 500          # per series sent to interactive charts
+PNG_EXPORT_DPI = 100
+PNG_EXPORT_FIGSIZE = (12, 7)
+LINE_COLORS = ['blue', 'red', 'green', 'orange', 'purple', 'brown', 'pink', 'gray', 'olive', 'cyan']
+
+
+def new_figure(figsize = (10, 5)):
+    """
+    Creates a figure bound to its own Agg canvas, independent of pyplot's global state.
+    Such figures are safe to build in worker threads and are freed by normal garbage
+    collection, because pyplot never registers them.
+    Args:
+        figsize (tuple[float, float]): Figure size in inches.
+    Returns:
+        tuple[Figure, Axes]: The figure and its single axes.
+    """
+    # matplotlib takes about half a second to import and only PNG export needs it
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize = figsize)
+    FigureCanvasAgg(fig)
+
+    return fig, fig.add_subplot()
+
+
+def plot_gains(gains, title, figsize = (20, 13), ylabel = 'Percentage Gain (%)'):
+    """
+    Draws one line per symbol on a new, request-scoped figure.
+    Args:
+        gains (dict[str, pandas.Series]): Gain series keyed by symbol.
+        title (str): Plot title.
+        figsize (tuple[float, float]): Figure size in inches.
+        ylabel (str): Y axis label.
+    Returns:
+        Figure: The rendered figure (gr.Plot accepts it directly).
+    """
+    fig, ax = new_figure(figsize)
+
+    for index, (symbol, series) in enumerate(gains.items()):
+        ax.plot(series.index, series, label = f'{symbol} YTD Gain',
+                color = LINE_COLORS[index % len(LINE_COLORS)])
+
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    ax.grid(True)
+
+    return fig
+
+
+def plot_comparison(gains, top, band, title, figsize = (12, 7), ylabel = 'Percentage Gain (%)'):
+    """
+    Draws a basket comparison: the highlighted symbols as lines and the rest of the
+    basket as a faint percentile band with its median, so the number of artists stays
+    constant however many symbols the basket holds.
+    Args:
+        gains (pandas.DataFrame): date×symbol gains.
+        top (list[str]): Symbols drawn as individual lines.
+        band (pandas.DataFrame | None): 'low', 'median' and 'high' columns, or None.
+        title (str): Plot title.
+        figsize (tuple[float, float]): Figure size in inches.
+        ylabel (str): Y axis label.
+    Returns:
+        Figure: The rendered figure.
+    """
+    fig, ax = new_figure(figsize)
+
+    if band is not None:
+        ax.fill_between(band.index, band['low'], band['high'], color = 'gray', alpha = 0.15,
+                        linewidth = 0, label = f'Basket ({gains.shape[1]} symbols)')
+        ax.plot(band.index, band['median'], color = 'gray', linestyle = '--', linewidth = 1,
+                label = 'Basket median')
+
+    for index, symbol in enumerate(top):
+        ax.plot(gains.index, gains[symbol], label = symbol, linewidth = 1.5,
+                color = LINE_COLORS[index % len(LINE_COLORS)])
+
+    ax.set_title(title)
+    ax.set_xlabel('Date')
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    ax.grid(True)
+
+    return fig
+
+
+def save_png(fig, path, dpi = 300):
+    """
+    Writes a figure to a PNG file.
+    Args:
+        fig (Figure): Figure to save.
+        path (str): Output file path.
+        dpi (int): Output resolution.
+    Returns:
+        str: The output path.
+    """
+    fig.savefig(path, dpi = dpi)
+
+    return path
+
+
+def close_figure(fig):
+    """
+    Releases a figure's artists immediately instead of waiting for garbage collection.
+    Args:
+        fig (Figure): Figure that is no longer needed.
+    """
+    fig.clear()
+
+
+def lttb_indices(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets point selection: keeps the first and last points
+    and, in every bucket between them, the point that forms the largest triangle
+    with the previously kept point and the average of the next bucket.
+    Args:
+        x (numpy.ndarray): Monotonic x values as floats.
+        y (numpy.ndarray): Y values.
+        threshold (int): Number of points to keep.
+    Returns:
+        numpy.ndarray: Sorted indices of the kept points.
+    """
+    n = len(x)
+
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype = int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        selected[i + 1] = a
+
+    return selected
+
+
+def decimate_gains(gains, max_points = MAX_CHART_POINTS):
+    """
+    Downsamples every series with LTTB and returns them as one long table for
+    client-side charts such as gr.LinePlot.
+    Args:
+        gains (dict[str, pandas.Series]): Gain series keyed by symbol.
+        max_points (int): Maximum points kept per symbol.
+    Returns:
+        pandas.DataFrame: Columns 'Date', 'Gain (%)' and 'Symbol'.
+    """
+    frames = []
+
+    for symbol, series in gains.items():
+        series = series.dropna()
+        x = series.index.to_numpy(dtype = 'datetime64[ns]').astype(np.int64).astype(np.float64)
+        keep = lttb_indices(x, series.to_numpy(dtype = np.float64), max_points)
+        frames.append(pd.DataFrame({"Date": series.index[keep],
+                                    "Gain (%)": series.to_numpy()[keep],
+                                    "Symbol": symbol}))
+
+    if not frames:
+        return pd.DataFrame(columns = ["Date", "Gain (%)", "Symbol"])
+
+    return pd.concat(frames, ignore_index = True)
@@ -1,7 +1,8 @@
 import matplotlib.pyplot as plt
-import pandas as pd
 
 from alpha_vantage.timeseries import TimeSeries
+from gain_kernel import gains_frame
+from price_sources import normalize, slice_dates
 
 
 def fetch_and_plot_stocks(api_key):
@@ -19,30 +20,14 @@ def fetch_and_plot_stocks(api_key):
     nvda_data, nvda_meta = ts.get_daily(symbol = 'NVDA', outputsize = 'compact')
     slyg_data, slyg_meta = ts.get_daily(symbol = 'SLYG', outputsize = 'compact')
 
-    # Ensure the index is a datetime index
-    nvda_data.index = pd.to_datetime(nvda_data.index)
-    slyg_data.index = pd.to_datetime(slyg_data.index)
+    # Convert to the shared ascending schema, then select 2025-01-01 to 2025-10-29 by binary search
+    closes = {symbol: slice_dates(normalize(data, '4. close'), "2025-01-01", "2025-10-29")['close']
+              for symbol, data in (('NVDA', nvda_data), ('SLYG', slyg_data))}
 
-    # Filter data for the period from 2025-01-01 to 2025-10-29 safely
-    nvda_data = (nvda_data[
-                        (nvda_data.index >= "2025-01-01") & (nvda_data.index <= "2025-10-29")
-                        ]['4. close']
-                        .pct_change()
-                        .fillna(0)
-                        .add(1)
-                        .cumprod()
-                        .sub(1)
-                        .mul(100))
-
-    slyg_data = (slyg_data[
-                        (slyg_data.index >= "2025-01-01") & (slyg_data.index <= "2025-10-29")
-                        ]['4. close']
-                        .pct_change()
-                        .fillna(0)
-                        .add(1)
-                        .cumprod()
-                        .sub(1)
-                        .mul(100))
+    # Compute the cumulative gains of both symbols in one pass
+    gains = gains_frame(closes)
+    nvda_data = gains['NVDA']
+    slyg_data = gains['SLYG']
 
     # Plotting the results
     plt.figure(figsize = (10, 5))
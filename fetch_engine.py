@@ -0,0 +1,210 @@
+import contextvars
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from tracing import span
+
+
+# Alpha Vantage free tier limits
+AV_CALLS_PER_MINUTE = 5
+AV_CALLS_PER_DAY = 25
+MAX_WORKERS = 8
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Callers that find the bucket empty wait
+    until a token is refilled instead of failing.
+    """
+
+    def __init__(self, capacity, period):
+        """
+        Args:
+            capacity (int): Maximum number of tokens (burst size).
+            period (float): Seconds needed to refill the full capacity.
+        """
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self):
+        """
+        Returns:
+            float: Tokens currently available.
+        """
+        with self._lock:
+            self._refill()
+
+            return self._tokens
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available, without waiting.
+        Returns:
+            float: 0 when a token was taken, otherwise the seconds until one is refilled.
+        """
+        with self._lock:
+            self._refill()
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+
+                return 0.0
+
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        """Blocks until a token is available and takes it."""
+        while True:
+            wait = self.try_acquire()
+
+            if not wait:
+                return
+
+            time.sleep(wait)
+
+
+class RateLimiter:
+    """Combines several token buckets; a call proceeds only when every bucket has a token."""
+
+    def __init__(self, per_minute = AV_CALLS_PER_MINUTE, per_day = AV_CALLS_PER_DAY):
+        self.buckets = [TokenBucket(per_minute, 60), TokenBucket(per_day, 24 * 60 * 60)]
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Queues the caller until all limits allow one more call."""
+        # Serialise waiters so queued calls are released in arrival order
+        with self._lock:
+            for bucket in self.buckets:
+                bucket.acquire()
+
+    def remaining(self):
+        """
+        Returns:
+            int: Calls that can be made right now without waiting.
+        """
+        return int(min(bucket.available() for bucket in self.buckets))
+
+    def remaining_today(self):
+        """
+        Returns:
+            int: Calls left in the longest (daily) window, ignoring short-term limits.
+        """
+        return int(self.buckets[-1].available())
+
+
+class _Flight:
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: the first caller for a key runs the call and
+    every caller that arrives while it is in flight waits for and shares its result
+    (or exception). Nothing is cached; once the call returns, the next caller runs it again.
+    Shared results must be treated as read-only.
+    """
+
+    def __init__(self):
+        self.calls = 0          # underlying calls made
+        self.shared = 0         # callers served by another caller's call
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        Args:
+            key (hashable): Identifies identical calls, e.g. (api_key, symbol, endpoint, outputsize).
+            fn (callable): Zero-argument call to run when no identical call is in flight.
+        Returns:
+            The result of fn, from this caller's call or from the one already in flight.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            with span("single_flight.wait"):
+                flight.done.wait()
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+
+        except BaseException as e:
+            flight.error = e
+            raise
+
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+            flight.done.set()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_time_series(api_key):
+    """
+    Returns the shared pandas-output client for an API key, so the rate limit
+    is tracked across all requests that use the key.
+    Args:
+        api_key (str): Alpha Vantage API key.
+    Returns:
+        PooledTimeSeries: Client bound to the key.
+    """
+    # requests and alpha_vantage are only imported once an app actually calls the API
+    from alpha_vantage_client import PooledTimeSeries
+
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = PooledTimeSeries(key = api_key, output_format = 'pandas')
+
+        return _clients[api_key]
+
+
+def fetch_many(symbols, fetch_one, max_workers = MAX_WORKERS):
+    """
+    Runs fetch_one for every distinct symbol concurrently.
+    Args:
+        symbols (list[str]): Ticker symbols; duplicates are fetched once.
+        fetch_one (callable): fetch_one(symbol) -> result.
+        max_workers (int): Maximum number of concurrent fetches.
+    Returns:
+        dict: Results keyed by symbol, in first-seen order.
+    """
+    unique = list(dict.fromkeys(symbols))
+
+    if len(unique) <= 1:
+        return {symbol: fetch_one(symbol) for symbol in unique}
+
+    with ThreadPoolExecutor(max_workers = min(max_workers, len(unique))) as pool:
+        # Each worker runs in a copy of the caller's context so its spans join the caller's trace
+        futures = {symbol: pool.submit(contextvars.copy_context().run, fetch_one, symbol)
+                   for symbol in unique}
+
+        return {symbol: future.result() for symbol, future in futures.items()}
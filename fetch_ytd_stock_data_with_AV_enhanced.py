@@ -1,7 +1,9 @@
 import matplotlib.pyplot as plt
-import pandas as pd
 
 from alpha_vantage.timeseries import TimeSeries
+from gain_kernel import cumulative_gain
+from price_sources import slice_dates
+from stock_cache import get_daily_prices
 
 
 def get_stock_data(ts, symbol, start_date, end_date):
@@ -16,24 +18,8 @@ def get_stock_data(ts, symbol, start_date, end_date):
     Returns:
         pandas.Series: Cumulative percentage gains indexed by date.
     """
-    try:
-        data, _ = ts.get_daily_adjusted(symbol = symbol, outputsize = 'full')
-        column = '5. adjusted close'
-        print(f"✅ Using adjusted data for {symbol}")
-    except ValueError:
-        data, _ = ts.get_daily(symbol = symbol, outputsize = 'compact')
-        column = '4. close'
-        print(f"⚠️ Premium endpoint not available for {symbol}. Using basic daily data.")
-
-    data.index = pd.to_datetime(data.index)
-    data = data.sort_index()
-    data = (data[start_date:end_date][column]
-            .pct_change()
-            .fillna(0)
-            .add(1)
-            .cumprod()
-            .sub(1)
-            .mul(100))
+    data, column = get_daily_prices(ts, symbol)
+    data = cumulative_gain(slice_dates(data[column], start_date, end_date))
 
     return data
 
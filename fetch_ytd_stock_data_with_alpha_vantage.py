@@ -3,6 +3,8 @@ import sys
 import pandas as pd
 
 from alpha_vantage.timeseries import TimeSeries
+from gain_kernel import gains_frame
+from price_sources import normalize, slice_dates
 
 
 def fetch_and_plot_stocks(api_key):
@@ -40,21 +42,12 @@ def fetch_and_plot_stocks(api_key):
         sys.exit()
 
     # Filter data for the period from 2025-01-01 to 2025-10-29
-    nvda_data = (nvda_data['2025-01-01' : '2025-10-29']['5. adjusted close']
-                 .pct_change()
-                 .fillna(0)
-                 .add(1)
-                 .cumprod()
-                 .sub(1)
-                 .mul(100))
-
-    amd_data = (amd_data['2025-01-01' : '2025-10-29']['5. adjusted close']
-                .pct_change()
-                .fillna(0)
-                .add(1)
-                .cumprod()
-                .sub(1)
-                .mul(100))
+    # (the API lists bars newest first, so normalize to ascending order before slicing)
+    gains = gains_frame({symbol: slice_dates(normalize(data, '4. close', '5. adjusted close'),
+                                             '2025-01-01', '2025-10-29')['adj_close']
+                         for symbol, data in (('NVDA', nvda_data), ('AMD', amd_data))})
+    nvda_data = gains['NVDA']
+    amd_data = gains['AMD']
 
     # Plotting the results
     plt.figure(figsize = (10, 5))
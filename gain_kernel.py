@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+
+def align_closes(closes):
+    """
+    Aligns any number of close-price series on a shared, sorted date index.
+    Args:
+        closes (dict[str, pandas.Series]): Close prices keyed by symbol.
+    Returns:
+        tuple[pandas.DatetimeIndex, list[str], numpy.ndarray]: Union of all dates,
+        symbol order, and a float64 date×symbol matrix with NaN where a symbol has no bar.
+    """
+    frame = pd.concat(closes, axis = 1, sort = True)
+    frame.index = pd.to_datetime(frame.index)
+
+    return frame.index, list(frame.columns), frame.to_numpy(dtype = np.float64)
+
+
+def forward_fill(prices):
+    """
+    Carries the last valid price forward over missing days, column by column.
+    Leading NaNs (before a symbol's first bar) are kept.
+    Args:
+        prices (numpy.ndarray): date×symbol price matrix.
+    Returns:
+        numpy.ndarray: Filled copy of the matrix.
+    """
+    rows = np.where(np.isnan(prices), 0, np.arange(prices.shape[0])[:, None])
+    np.maximum.accumulate(rows, axis = 0, out = rows)
+
+    return prices[rows, np.arange(prices.shape[1])]
+
+
+def cumulative_gains(prices, percent = True):
+    """
+    Computes cumulative gains for every column in one pass as
+    price / price[first_valid] - 1, relative to each symbol's own first valid bar.
+    Args:
+        prices (numpy.ndarray): date×symbol price matrix, NaN for missing bars.
+        percent (bool): Scale the result to percent.
+    Returns:
+        numpy.ndarray: Gains with the same shape; NaN before a symbol's first bar.
+    """
+    prices = np.asarray(prices, dtype = np.float64)
+
+    if prices.shape[0] == 0:
+        return prices.copy()
+
+    prices = forward_fill(prices)
+    valid = ~np.isnan(prices)
+    first = valid.argmax(axis = 0)
+    base = prices[first, np.arange(prices.shape[1])]
+
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        gains = prices / base - 1
+
+    return gains * 100 if percent else gains
+
+
+def gains_frame(closes, percent = True):
+    """
+    Aligns close series and returns their cumulative gains as one DataFrame.
+    Args:
+        closes (dict[str, pandas.Series]): Close prices keyed by symbol.
+        percent (bool): Scale the result to percent.
+    Returns:
+        pandas.DataFrame: Gains indexed by date with one column per symbol.
+    """
+    index, symbols, prices = align_closes(closes)
+
+    return pd.DataFrame(cumulative_gains(prices, percent), index = index, columns = symbols)
+
+
+def cumulative_gain(close, percent = True):
+    """
+    Cumulative gain of a single close-price series.
+    Args:
+        close (pandas.Series): Close prices indexed by date.
+        percent (bool): Scale the result to percent.
+    Returns:
+        pandas.Series: Gains indexed by date, starting at 0.
+    """
+    gains = cumulative_gains(close.to_numpy(dtype = np.float64)[:, None], percent)[:, 0]
+
+    return pd.Series(gains, index = close.index, name = close.name)
@@ -2,8 +2,11 @@ import re
 import subprocess
 import gradio as gr
 
-from ollama import Client
-from ollama_manager import list_model_names, model_exists, start_model, stop_model
+from llm_cache import cached_stream_generate
+from ollama_manager import (generation_stats, list_model_names, model_exists, start_model,
+                            start_preloader, stop_model)
+from serving import OLLAMA_GENERATE_ID, OLLAMA_GENERATE_LIMIT, launch
+from tracing import traced
 
 
 # --- Helpers ---
@@ -21,6 +24,7 @@ def clean_model_name(name: str) -> str:
     return re.sub(r'[^a-zA-Z0-9\.:-]', '', name.strip())
 
 
+@traced()
 def start_handler(selected_model, manual_name):
     """
     Starts the specified model in Ollama (selected or manually entered).
@@ -39,9 +43,11 @@ def start_handler(selected_model, manual_name):
         return f"⚠️ Model '{use}' not found in Ollama.", None
 
     try:
-        start_model(use)
+        stats = start_model(use)
+        start_kind = "cold start" if stats["cold"] else "already warm"
 
-        return f"✅ Model '{use}' started successfully!", None
+        return (f"✅ Model '{use}' started successfully! "
+                f"({start_kind}, loaded in {stats['load_seconds']:.2f}s)"), None
 
     except Exception as e:
         return f"❌ Failed to start model '{use}': {e}", None
@@ -76,7 +82,7 @@ def refresh_handler():
         tuple[gr.update, str]: Dropdown choices update and status message.
     """
     try:
-        names = list_model_names()
+        names = list_model_names(refresh = True)
 
         if not names:
             return gr.update(choices = []), "No models found or Ollama not reachable"
@@ -101,29 +107,53 @@ def status_handler():
         return f"❌ Failed to get status: {e}"
 
 
-def chat_handler(selected_model, manual_name, prompt):
+def format_generation_stats():
     """
-    Sends a prompt to the selected Ollama model for chat completion.
+    Formats the per-model streaming latency recorded by ollama_manager.
+    Returns:
+        str: One line per model with time-to-first-token and tokens/sec.
+    """
+    lines = [f"{model}: TTFT {s['last_ttft_seconds']:.2f}s (avg {s['mean_ttft_seconds']:.2f}s), "
+             f"{s['last_tokens_per_second']:.1f} tok/s (avg {s['mean_tokens_per_second']:.1f}), "
+             f"{s['runs']} run(s)"
+             for model, s in generation_stats().items()]
+
+    return "\n".join(lines)
+
+
+@traced()
+def chat_handler(selected_model, manual_name, prompt, seed = None):
+    """
+    Streams the selected Ollama model's response to a prompt as tokens arrive.
     Args:
         selected_model (str): Model name from dropdown.
         manual_name (str): Model name entered manually.
         prompt (str): User's input prompt.
-    Returns:
-        tuple[str, gr.update]: Model's response and cleared input field update.
+        seed (float | None): Sampling seed; seeded answers are repeatable and cached.
+    Yields:
+        tuple[str, gr.update, str]: Response so far, cleared input field update,
+        and per-model latency stats.
     """
     use = manual_name.strip() or selected_model or ""
 
     if not use:
-        return "⚠️ No model selected.", gr.update(value="")
+        yield "⚠️ No model selected.", gr.update(value=""), format_generation_stats()
+        return
+
+    response = ""
+    options = None if seed is None else {"seed": int(seed)}
 
     try:
-        client = Client(host="http://localhost:11434")
-        response = client.generate(model = use, prompt = prompt)
+        # A seeded prompt sent before is answered from the LLM cache without contacting Ollama
+        for chunk in cached_stream_generate(use, prompt, options):
+            response += chunk
+
+            yield response, gr.update(value = ""), gr.update()
 
-        return response["response"], gr.update(value = "")
+        yield response, gr.update(value = ""), format_generation_stats()
 
     except Exception as e:
-        return f"❌ Chat failed: {e}", gr.update(value = "")
+        yield f"❌ Chat failed: {e}", gr.update(value = ""), format_generation_stats()
 
 
 # --- Gradio UI ---
@@ -135,7 +165,7 @@ with gr.Blocks() as demo:
                     """)
         gr.Markdown("""
                     **⚠️ Important:**
-                    - Press **Refresh** to load available models.
+                    - Available models load when the page opens; press **Refresh** after pulling new ones.
                     - If **Ollama is not running**, the list will be empty and actions will fail.
                     - You must start Ollama before using this panel.
 
@@ -170,20 +200,33 @@ with gr.Blocks() as demo:
         chat_input = gr.Textbox(label = "Enter prompt", placeholder = "Ask something...", lines = 6)
         chat_output = gr.Textbox(label = "Model response", interactive = False, lines = 10)
 
+    chat_seed = gr.Number(label = "Seed (optional)", precision = 0, value = None,
+                          info = "Seeded answers are repeatable and served from the LLM cache; "
+                                 "leave empty for a fresh answer every time.")
+
+    chat_stats = gr.Textbox(label = "Streaming latency per model (time to first token, tokens/sec)",
+                            interactive = False, lines = 2)
+
     # Wire buttons
     refresh_btn.click(fn = refresh_handler, inputs = None, outputs = [models_dd, info])
+    # Fill the list when the page opens; startup itself never waits for the Ollama daemon
+    demo.load(fn = refresh_handler, inputs = None, outputs = [models_dd, info])
 
+    # Start (model load) and chat both run on the GPU, so they share one concurrency limit
     start_btn.click(fn = start_handler, inputs = [models_dd, custom_input],
-                    outputs = [info, out_image])
+                    outputs = [info, out_image],
+                    concurrency_limit = OLLAMA_GENERATE_LIMIT, concurrency_id = OLLAMA_GENERATE_ID)
 
     stop_btn.click(fn = stop_handler, inputs = [models_dd, custom_input],
                    outputs = [info, out_image])
 
     status_btn.click(fn = status_handler, inputs = None, outputs = status_box)
 
-    chat_btn.click(fn = chat_handler, inputs = [models_dd, custom_input, chat_input],
-                    outputs = [chat_output, chat_input])
+    chat_btn.click(fn = chat_handler, inputs = [models_dd, custom_input, chat_input, chat_seed],
+                    outputs = [chat_output, chat_input, chat_stats],
+                    concurrency_limit = OLLAMA_GENERATE_LIMIT, concurrency_id = OLLAMA_GENERATE_ID)
 
 
 if __name__ == "__main__":
-    demo.launch()
+    start_preloader()    # keeps OLLAMA_PRELOAD_MODELS resident, if set
+    launch(demo)
@@ -2,10 +2,9 @@ import gradio as gr
 import re
 
 from ollama_manager import start_model, model_exists, list_model_names
+from serving import OLLAMA_GENERATE_ID, OLLAMA_GENERATE_LIMIT, launch
 
 
-available_models = list_model_names()
-
 def clean_model_name(name):
     return re.sub(r'[^a-zA-Z0-9\.:]', '', name.strip())
 
@@ -27,14 +26,26 @@ def start_ollama_model(model_name):
         return f"❌ Failed to start model '{model_name}': {e}"
 
 
+def load_models():
+    # Runs when the page opens, so the app starts (and stays up) without a running Ollama daemon
+    try:
+        return gr.update(choices = list_model_names()), ""
+
+    except Exception as e:
+        return gr.update(choices = []), f"❌ Failed to connect to Ollama: {e}"
+
+
 with gr.Blocks() as demo:
     # input = gr.Textbox(label = "Ollama model name", placeholder = "e.g. mistral:7b",
     #                    info = "Enter/copy Ollama model name (e.g. gemma3:4b or 12b, llama3.1:8b," \
     #                                                 " mistral:7b, phi3.5:3.8b, qwen3:4b or 8b)")
-    input = gr.Dropdown(choices = available_models, label = "Choose Ollama model",
+    input = gr.Dropdown(choices = [], label = "Choose Ollama model",
                         info = "Select a model available in your Ollama setup")
     btn_start = gr.Button("Start Ollama model")
     out = gr.Textbox(label = "Message", interactive = False)
-    btn_start.click(start_ollama_model, inputs = input, outputs = out)
+    btn_start.click(start_ollama_model, inputs = input, outputs = out,
+                    concurrency_limit = OLLAMA_GENERATE_LIMIT, concurrency_id = OLLAMA_GENERATE_ID)
+    demo.load(load_models, inputs = None, outputs = [input, out])
 
-demo.launch()
+if __name__ == "__main__":
+    launch(demo)
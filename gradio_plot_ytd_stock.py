@@ -1,16 +1,39 @@
 import gradio as gr
-import yfinance as yf
-import matplotlib.pyplot as plt
 import string
 
+from chart_render import PNG_EXPORT_DPI, PNG_EXPORT_FIGSIZE, decimate_gains, plot_gains
 from datetime import datetime
+from incremental_gains import default_engine as gain_engine
+from price_sources import get_source
+from refresh_scheduler import start_scheduler
+from render_cache import default_cache as render_cache
+from serving import STOCK_CHART_LIMIT, launch
+from stock_comparison import (DEFAULT_TOP_N, MAX_SYMBOLS, compare, comparison_chart,
+                              comparison_figure, final_gains, parse_symbols)
+from tracing import TRACE_ENABLED, span, with_timings
 
 
 def clean_ticker(ticker):
     return ''.join(filter(lambda c: c in string.ascii_uppercase, ticker.upper()))
 
 
-def plot_ytd(ticker1, ticker2, start_date, end_date):
+def check_dates(start_date, end_date):
+    """Returns an error message for an invalid or future date range, or '' when it is valid."""
+    try:
+        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
+        today = datetime.today().date()
+
+        if start_dt > today or end_dt > today:
+            return "⚠️ Dates must not be in the future. Please select a valid range."
+
+    except ValueError:
+        return "⚠️ Invalid date format. Please use YYYY-MM-DD."
+
+    return ""
+
+
+def plot_ytd(ticker1, ticker2, start_date, end_date, export_png = False):
     # Ensure date format is correct
     start_date = str(start_date)[ : 10]
     end_date = str(end_date)[ : 10]
@@ -19,77 +42,163 @@ def plot_ytd(ticker1, ticker2, start_date, end_date):
     ticker2 = clean_ticker(ticker2)
 
     if not ticker1 or not ticker2:
-        return None, "⚠️ Invalid ticker symbols. Please use Latin letters only."
+        return None, None, "⚠️ Invalid ticker symbols. Please use Latin letters only."
 
 
-    message = ""
+    message = check_dates(start_date, end_date)
 
-    try:
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d").date()
-        end_dt = datetime.strptime(end_date, "%Y-%m-%d").date()
-        today = datetime.today().date()
+    if message:
+        return None, None, message
 
-        if start_dt > today or end_dt > today:
-            message = "⚠️ Dates must not be in the future. Please select a valid range."
 
-            return None, message
+    # Fetch both tickers in one batched download (yfinance first, local files as fallback)
+    with span("fetch"):
+        results = get_source().fetch_many([ticker1, ticker2], start_date, end_date)
 
-    except ValueError:
-        message = "⚠️ Invalid date format. Please use YYYY-MM-DD."
+    if ticker1 not in results or ticker2 not in results:
+        message = "⚠️ No data returned. Check ticker symbols or date range."
 
-        return None, message
+        return None, None, message
 
+    data1 = results[ticker1]
+    data2 = results[ticker2]
 
-    # Fetch stock data
-    data1 = yf.download(ticker1, start = start_date, end = end_date)
-    data2 = yf.download(ticker2, start = start_date, end = end_date)
 
-    if data1.empty or data2.empty:
-        message = "⚠️ No data returned. Check ticker symbols or date range."
+    # Calculate the YTD gains; bars already computed for this start date are reused
+    with span("gains"):
+        gain1 = gain_engine().update(ticker1, start_date, data1['adj_close'])
+        gain2 = gain_engine().update(ticker2, start_date, data2['adj_close'])
+
+    gains = {ticker1: gain1, ticker2: gain2}
+    title = f'YTD Stock Gains of {ticker1} and {ticker2}'
+
+    # The interactive chart gets at most MAX_CHART_POINTS points per symbol
+    with span("decimate"):
+        chart = decimate_gains(gains)
 
-        return None, message
-
-
-    # Calculate the YTD gains
-    gain1 = ((data1['Close'] - data1['Close'].iloc[0]) / data1['Close'].iloc[0]) * 100
-    gain2 = ((data2['Close'] - data2['Close'].iloc[0]) / data2['Close'].iloc[0]) * 100
-
-    # Create a plot
-    plt.figure(figsize = (20, 13))
-    plt.plot(gain1.index, gain1, label = f'{ticker1} YTD Gain', color = 'blue')
-    plt.plot(gain2.index, gain2, label = f'{ticker2} YTD Gain', color = 'red')
-    plt.title(f'YTD Stock Gains of {ticker1} and {ticker2}')
-    plt.xlabel('Date')
-    plt.ylabel('Percentage Gain (%)')
-    plt.legend()
-    plt.grid(True)
-
-    # Save the plot as PNG
-    plt.savefig("ytd_gain_plot.png", dpi = 300)
-
-    return plt, ""
-
-
-demo = gr.Interface(
-                    fn = plot_ytd,
-                    inputs = [
-                            gr.Textbox(label = "Ticker 1", placeholder = "e.g. META",
-                                       info = "Enter stock symbol (e.g. AAPL, TSLA, NVDA)"),
-                            gr.Textbox(label = "Ticker 2", placeholder = "e.g. NVDA",
-                                       info = "Enter stock symbol (e.g. MSFT, AMZN, GOOG)"),
-                            gr.Textbox(label = "Start Date (YYYY-MM-DD)",
-                                       placeholder = "e.g. 2025-01-01"),
-                            gr.Textbox(label = "End Date (YYYY-MM-DD)",
-                                       placeholder = "e.g. 2025-10-29")
-                            ],
-                    outputs = [
-                                gr.Plot(label = "YTD Gain Plot"),
-                                gr.Textbox(label = "Message", interactive = False)
-                               ],
-                    title = "YTD Stock Gain Comparison",
-                    description = ("Compare year-to-date stock gains between two companies. "
-                                "Dates must be in YYYY-MM-DD format and not in the future. "
-                                "To stop the app, press Ctrl+C in the terminal!")
-                    )
-
-demo.launch()
+    if not export_png:
+        return chart, None, ""
+
+    # Reuse the stored PNG for identical requests; render it only when the data changed
+    cache = render_cache()
+    key = cache.key(list(gains), start_date, end_date, gains, title = title,
+                    dpi = PNG_EXPORT_DPI, figsize = PNG_EXPORT_FIGSIZE)
+
+    with span("render_png", dpi = PNG_EXPORT_DPI):
+        png = cache.get_or_render(key, lambda: plot_gains(gains, title, figsize = PNG_EXPORT_FIGSIZE),
+                                  dpi = PNG_EXPORT_DPI)
+
+    return chart, png, ""
+
+
+def compare_basket(symbols_text, start_date, end_date, top_n = DEFAULT_TOP_N, export_png = False):
+    """
+    Compares a basket of up to MAX_SYMBOLS symbols: one batched fetch, one gain matrix,
+    and a chart of the top_n symbols over the basket's percentile band.
+    Returns:
+        tuple: Chart data, PNG path or None, ranking table and message.
+    """
+    start_date = str(start_date)[ : 10]
+    end_date = str(end_date)[ : 10]
+    symbols = parse_symbols(symbols_text)
+
+    if not symbols:
+        return None, None, None, "⚠️ Enter at least one ticker symbol (Latin letters only)."
+
+    message = check_dates(start_date, end_date)
+
+    if message:
+        return None, None, None, message
+
+    gains, missing = compare(symbols, start_date, end_date)
+
+    if gains.empty:
+        return None, None, None, "⚠️ No data returned. Check ticker symbols or date range."
+
+    top_n = max(1, int(top_n))
+    ranking = final_gains(gains).round(2).rename_axis("Symbol").reset_index(name = "Gain (%)")
+    message = f"⚠️ No data for: {', '.join(missing)}" if missing else ""
+
+    with span("decimate"):
+        chart = comparison_chart(gains, top_n)
+
+    if not export_png:
+        return chart, None, ranking, message
+
+    title = f'YTD Gains: top {min(top_n, gains.shape[1])} of {gains.shape[1]} symbols'
+    cache = render_cache()
+    key = cache.key(list(gains.columns), start_date, end_date, dict(gains.items()), title = title,
+                    top_n = top_n, dpi = PNG_EXPORT_DPI, figsize = PNG_EXPORT_FIGSIZE)
+
+    with span("render_png", dpi = PNG_EXPORT_DPI):
+        png = cache.get_or_render(key, lambda: comparison_figure(gains, title, top_n, PNG_EXPORT_FIGSIZE),
+                                  dpi = PNG_EXPORT_DPI)
+
+    return chart, png, ranking, message
+
+
+pair_demo = gr.Interface(
+                         fn = with_timings(plot_ytd),
+                         inputs = [
+                                 gr.Textbox(label = "Ticker 1", placeholder = "e.g. META",
+                                            info = "Enter stock symbol (e.g. AAPL, TSLA, NVDA)"),
+                                 gr.Textbox(label = "Ticker 2", placeholder = "e.g. NVDA",
+                                            info = "Enter stock symbol (e.g. MSFT, AMZN, GOOG)"),
+                                 gr.Textbox(label = "Start Date (YYYY-MM-DD)",
+                                            placeholder = "e.g. 2025-01-01"),
+                                 gr.Textbox(label = "End Date (YYYY-MM-DD)",
+                                            placeholder = "e.g. 2025-10-29"),
+                                 gr.Checkbox(label = "Also export PNG", value = False,
+                                             info = f"Renders a {PNG_EXPORT_DPI}-dpi image for download")
+                                 ],
+                         outputs = [
+                                     gr.LinePlot(x = "Date", y = "Gain (%)", color = "Symbol",
+                                                 label = "YTD Gain Plot"),
+                                     gr.Image(label = "PNG export", type = "filepath"),
+                                     gr.Textbox(label = "Message", interactive = False),
+                                     gr.Textbox(label = "Stage timings (debug)", interactive = False,
+                                                lines = 8, visible = TRACE_ENABLED)
+                                    ],
+                         title = "YTD Stock Gain Comparison",
+                         concurrency_limit = STOCK_CHART_LIMIT,
+                         description = ("Compare year-to-date stock gains between two companies. "
+                                     "Dates must be in YYYY-MM-DD format and not in the future. "
+                                     "To stop the app, press Ctrl+C in the terminal!")
+                         )
+
+basket_demo = gr.Interface(
+                           fn = with_timings(compare_basket),
+                           inputs = [
+                                   gr.Textbox(label = "Ticker symbols", lines = 3,
+                                              placeholder = "e.g. NVDA, AMD, INTC, AVGO, QCOM, TXN, MU",
+                                              info = f"Comma or space separated, up to {MAX_SYMBOLS} symbols"),
+                                   gr.Textbox(label = "Start Date (YYYY-MM-DD)",
+                                              placeholder = "e.g. 2025-01-01"),
+                                   gr.Textbox(label = "End Date (YYYY-MM-DD)",
+                                              placeholder = "e.g. 2025-10-29"),
+                                   gr.Slider(1, 10, value = DEFAULT_TOP_N, step = 1, label = "Highlight top N",
+                                             info = "The rest of the basket is drawn as a percentile band"),
+                                   gr.Checkbox(label = "Also export PNG", value = False,
+                                               info = f"Renders a {PNG_EXPORT_DPI}-dpi image for download")
+                                   ],
+                           outputs = [
+                                       gr.LinePlot(x = "Date", y = "Gain (%)", color = "Symbol",
+                                                   label = "Basket YTD Gains"),
+                                       gr.Image(label = "PNG export", type = "filepath"),
+                                       gr.Dataframe(label = "Ranking by gain"),
+                                       gr.Textbox(label = "Message", interactive = False),
+                                       gr.Textbox(label = "Stage timings (debug)", interactive = False,
+                                                  lines = 8, visible = TRACE_ENABLED)
+                                      ],
+                           title = "Basket YTD Gain Comparison",
+                           concurrency_limit = STOCK_CHART_LIMIT,
+                           description = ("Compare the year-to-date gains of a whole basket of stocks. "
+                                       "The best performers are highlighted; the rest are summarised "
+                                       "by their median and 10th-90th percentile band.")
+                           )
+
+demo = gr.TabbedInterface([pair_demo, basket_demo], ["Two tickers", "Basket"])
+
+if __name__ == "__main__":
+    start_scheduler()    # keeps the WATCHLIST symbols current after every close, if set
+    launch(demo, allowed_paths = [render_cache().directory])
@@ -1,17 +1,24 @@
 import gradio as gr
-import matplotlib.pyplot as plt
-import pandas as pd
 import string
 
-from alpha_vantage.timeseries import TimeSeries
+from chart_render import PNG_EXPORT_DPI, PNG_EXPORT_FIGSIZE, decimate_gains, plot_gains
 from datetime import datetime
+from fetch_engine import fetch_many
+from incremental_gains import default_engine as gain_engine
+from intraday import DEFAULT_INTERVAL, INTERVALS, interval_seconds, live_chart
+from price_sources import get_source
+from refresh_scheduler import start_scheduler
+from render_cache import default_cache as render_cache
+from serving import STOCK_CHART_LIMIT, launch
+from stock_comparison import parse_symbols
+from tracing import TRACE_ENABLED, span, with_timings
 
 
 def clean_ticker(ticker):
     return ''.join(filter(lambda c: c in string.ascii_uppercase, ticker.upper()))
 
 
-def get_stock_data(ts, symbol, start_date, end_date):
+def get_stock_data(source, symbol, start_date, end_date):
     # Ensure date format is correct
     start_date = str(start_date)[ : 10]
     end_date = str(end_date)[ : 10]
@@ -39,59 +46,81 @@ def get_stock_data(ts, symbol, start_date, end_date):
         return None, message
 
     try:
-        data, _ = ts.get_daily_adjusted(symbol = symbol, outputsize = 'full')
-        column = '5. adjusted close'
-        print(f"✅ Using adjusted data for {symbol}")
-    except ValueError:
-        data, _ = ts.get_daily(symbol = symbol, outputsize = 'compact')
-        column = '4. close'
-        print(f"⚠️ Premium endpoint not available for {symbol}. Using basic daily data.")
+        data = source.fetch(symbol, start_date, end_date)
 
-    data.index = pd.to_datetime(data.index)
-    data = data.sort_index()
-    data = (data[start_date:end_date][column]
-            .pct_change()
-            .fillna(0)
-            .add(1)
-            .cumprod()
-            .sub(1)
-            .mul(100))
+    except ValueError as e:
+        return None, f"⚠️ {e}"
 
-    return data, ""
+    # Only bars not seen by an earlier request for this start date are computed
+    with span("gains", symbol = symbol):
+        return gain_engine().update(symbol, start_date, data['adj_close']), ""
 
 
-def fetch_and_plot_stocks(api_key, ticker1, ticker2, start_date, end_date):
+def fetch_and_plot_stocks(api_key, ticker1, ticker2, start_date, end_date, export_png = False):
     if not api_key.strip():
-        return None, "⚠️ Please enter a valid API key."
+        return None, None, "⚠️ Please enter a valid API key."
 
-    ts = TimeSeries(key = api_key, output_format = 'pandas')
+    # Alpha Vantage first, then yfinance and local files if it is down or out of quota
+    source = get_source(api_key.strip())
 
-    data1, msg1 = get_stock_data(ts, ticker1, start_date, end_date)
-    data2, msg2 = get_stock_data(ts, ticker2, start_date, end_date)
+    # Both tickers are fetched concurrently; the client's rate limiter queues excess calls
+    results = fetch_many([ticker1, ticker2],
+                         lambda ticker: get_stock_data(source, ticker, start_date, end_date))
+    data1, msg1 = results[ticker1]
+    data2, msg2 = results[ticker2]
 
     if data1 is None or data2 is None or data1.empty or data2.empty:
         message = msg1 or msg2 or "⚠️ No data returned. Check ticker symbols or date range."
 
-        return None, message
+        return None, None, message
+
+    gains = {ticker1.upper(): data1, ticker2.upper(): data2}
+    title = f'YTD Stock Gains of {ticker1.upper()} and {ticker2.upper()}'
+
+    # The interactive chart gets at most MAX_CHART_POINTS points per symbol
+    with span("decimate"):
+        chart = decimate_gains(gains)
+
+    if not export_png:
+        return chart, None, ""
+
+    # Identical requests on unchanged data reuse the stored PNG instead of re-rendering
+    cache = render_cache()
+    key = cache.key(list(gains), start_date, end_date, gains, title = title,
+                    dpi = PNG_EXPORT_DPI, figsize = PNG_EXPORT_FIGSIZE)
+
+    with span("render_png", dpi = PNG_EXPORT_DPI):
+        png = cache.get_or_render(key, lambda: plot_gains(gains, title, figsize = PNG_EXPORT_FIGSIZE),
+                                  dpi = PNG_EXPORT_DPI)
+
+    return chart, png, ""
+
+
+def intraday_tick(api_key, tickers, interval, days, seen):
+    if not api_key.strip():
+        return gr.skip(), "⚠️ Please enter a valid API key.", seen
 
-    plt.figure(figsize=(20, 13))
-    plt.plot(data1.index, data1, label=f'{ticker1.upper()} YTD Gain', color='blue')
-    plt.plot(data2.index, data2, label=f'{ticker2.upper()} YTD Gain', color='red')
-    plt.title(f'YTD Stock Gains of {ticker1.upper()} and {ticker2.upper()}')
-    plt.xlabel('Date')
-    plt.ylabel('Percentage Gain (%)')
-    plt.legend()
-    plt.grid(True)
-    plt.savefig("ytd_stock_gains.png", dpi=300)
+    symbols = parse_symbols(tickers)
 
-    return plt, ""
+    if not symbols:
+        return gr.skip(), "⚠️ Invalid ticker symbols. Please use Latin letters only.", seen
+
+    chart, message, state = live_chart(api_key.strip(), symbols, interval, int(days), seen)
+
+    # Nothing new: leave the chart as it is instead of re-sending the same points
+    return (gr.skip() if chart is None else chart), message, state
+
+
+def start_live(interval):
+    # One poll per bar; polling faster only spends quota on unchanged responses
+    return gr.Timer(value = interval_seconds(interval), active = True)
 
 
 # Use your Alpha Vantage API Key here
 # api_key = "YOUR_API_KEY"  # Replace "YOUR_API_KEY" with your actual API key
 
-demo = gr.Interface(
-                    fn = fetch_and_plot_stocks,
+daily_demo = gr.Interface(
+                    fn = with_timings(fetch_and_plot_stocks),
                     inputs = [
                             gr.Textbox(label = "Alpha Vantage API Key",
                                        placeholder = "Paste your API key here",
@@ -103,13 +132,20 @@ demo = gr.Interface(
                             gr.Textbox(label = "Start Date (YYYY-MM-DD)",
                                        placeholder = "e.g. 2025-01-01"),
                             gr.Textbox(label = "End Date (YYYY-MM-DD)",
-                                       placeholder = "e.g. 2025-10-29")
+                                       placeholder = "e.g. 2025-10-29"),
+                            gr.Checkbox(label = "Also export PNG", value = False,
+                                        info = f"Renders a {PNG_EXPORT_DPI}-dpi image for download")
                             ],
                     outputs = [
-                                gr.Plot(label = "YTD Gain Plot"),
-                                gr.Textbox(label = "Message", interactive = False)
+                                gr.LinePlot(x = "Date", y = "Gain (%)", color = "Symbol",
+                                            label = "YTD Gain Plot"),
+                                gr.Image(label = "PNG export", type = "filepath"),
+                                gr.Textbox(label = "Message", interactive = False),
+                                gr.Textbox(label = "Stage timings (debug)", interactive = False,
+                                           lines = 8, visible = TRACE_ENABLED)
                                ],
                     title = "YTD Stock Gain Comparison",
+                    concurrency_limit = STOCK_CHART_LIMIT,
                     description = ("Compare year-to-date stock gains between two companies. "
                                 "Dates must be in YYYY-MM-DD format and not in the future. "
                                 "Please visit 'https://www.alphavantage.co/support/#api-key' to "
@@ -117,4 +153,36 @@ demo = gr.Interface(
                                 "To stop the app, press Ctrl+C in the terminal!")
                     )
 
-demo.launch()
+with gr.Blocks() as intraday_demo:
+    gr.Markdown("## Intraday Gains (live)\n"
+                "Polls Alpha Vantage once per bar and adds only the new bars to the chart. "
+                "The free tier allows 25 calls a day, so keep the watchlist short.")
+
+    with gr.Row():
+        api_key_input = gr.Textbox(label = "Alpha Vantage API Key", placeholder = "Paste your API key here")
+        tickers_input = gr.Textbox(label = "Tickers", placeholder = "e.g. NVDA, IBM")
+        interval_input = gr.Dropdown(INTERVALS, value = DEFAULT_INTERVAL, label = "Bar interval")
+        days_input = gr.Slider(1, 5, value = 1, step = 1, label = "Days shown")
+
+    with gr.Row():
+        start_btn = gr.Button("▶️ Start live", variant = "primary")
+        stop_btn = gr.Button("⏹️ Stop")
+
+    intraday_plot = gr.LinePlot(x = "Date", y = "Gain (%)", color = "Symbol", label = "Intraday Gain Plot")
+    intraday_message = gr.Textbox(label = "Message", interactive = False)
+    chart_state = gr.State(None)
+    timer = gr.Timer(value = interval_seconds(DEFAULT_INTERVAL), active = False)
+
+    tick_inputs = [api_key_input, tickers_input, interval_input, days_input, chart_state]
+    tick_outputs = [intraday_plot, intraday_message, chart_state]
+
+    start_btn.click(intraday_tick, tick_inputs, tick_outputs, concurrency_limit = STOCK_CHART_LIMIT) \
+             .then(start_live, interval_input, timer)
+    stop_btn.click(lambda: gr.Timer(active = False), None, timer)
+    timer.tick(intraday_tick, tick_inputs, tick_outputs, concurrency_limit = STOCK_CHART_LIMIT)
+
+demo = gr.TabbedInterface([daily_demo, intraday_demo], ["Daily YTD", "Intraday"])
+
+if __name__ == "__main__":
+    start_scheduler()    # keeps the WATCHLIST symbols current after every close, if set
+    launch(demo, allowed_paths = [render_cache().directory])
@@ -0,0 +1,361 @@
+import threading
+import time
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from gain_kernel import forward_fill
+from tracing import span
+
+
+MAX_SERIES = 1000           # (symbol, start_date, column) series kept, least recently used dropped
+INITIAL_CAPACITY = 256      # bars per series before the buffers grow (doubling)
+REBASE_RTOL = 1e-6          # the newest bar moved more than this: it was revised
+STREAM_INTERVAL = 60        # seconds between polls of IncrementalGains.stream()
+
+
+def _dates(prices):
+    dates = prices.index.values
+
+    return dates if dates.dtype.kind == 'M' else dates.astype('datetime64[s]')
+
+
+class GainSeries:
+    """
+    Cumulative gain of one symbol from a fixed start date, kept in growable arrays.
+    New bars are appended in O(1) each: gain = price / base - 1, with the base price
+    and the last (forward-filled) price remembered from earlier bars. Returned series
+    are views of the buffers that never change once handed out: appending writes past
+    them, and a revised bar (today's provisional quote) or a rebuild moves the series
+    to new buffers first.
+    """
+
+    def __init__(self, percent = True):
+        self.percent = percent
+        self.length = 0
+        self.base = np.nan              # first valid price on or after the start date
+        self.base_position = None
+        self.rebuilds = 0
+        self.date_dtype = np.dtype('datetime64[s]')     # unit of the source's index, so dates compare without conversion
+        self._allocate(INITIAL_CAPACITY)
+
+    def _allocate(self, capacity):
+        self.dates = np.empty(capacity, dtype = self.date_dtype)
+        self.prices = np.empty(capacity, dtype = np.float64)     # as received, NaN for missing bars
+        self.filled = np.empty(capacity, dtype = np.float64)     # last valid price carried forward
+        self.gains = np.empty(capacity, dtype = np.float64)
+
+    def _reallocate(self, capacity, keep):
+        old = self.dates, self.prices, self.filled, self.gains
+        self._allocate(capacity)
+
+        for new, previous in zip((self.dates, self.prices, self.filled, self.gains), old):
+            new[:keep] = previous[:keep]
+
+    def _reserve(self, count):
+        needed = self.length + count
+
+        if needed > len(self.gains):
+            self._reallocate(max(needed, 2 * len(self.gains)), self.length)
+
+    def _append(self, dates, prices):
+        if not len(prices):
+            return
+
+        if not self.length and dates.dtype != self.date_dtype:
+            self.date_dtype = dates.dtype
+            self._allocate(len(self.gains))
+
+        if self.base_position is None:
+            valid = np.flatnonzero(~np.isnan(prices))
+
+            if valid.size:
+                self.base_position = self.length + int(valid[0])
+                self.base = prices[valid[0]]
+
+        last = self.filled[self.length - 1] if self.length else np.nan
+        filled = forward_fill(np.concatenate(([last], prices))[:, None])[1:, 0]
+
+        with np.errstate(divide = 'ignore', invalid = 'ignore'):
+            gains = filled / self.base - 1
+
+        self._reserve(len(prices))
+        end = self.length + len(prices)
+        self.dates[self.length:end] = dates
+        self.prices[self.length:end] = prices
+        self.filled[self.length:end] = filled
+        self.gains[self.length:end] = gains * 100 if self.percent else gains
+        self.length = end
+
+    def _truncate(self, length):
+        # Series handed out earlier are views of these buffers and may still be hashed or
+        # plotted by other requests: revised bars go into new buffers instead of over them
+        if length < self.length:
+            self._reallocate(len(self.gains), length)
+
+        self.length = length
+
+        if self.base_position is not None and self.base_position >= length:
+            self.base_position, self.base = None, np.nan
+
+    def rebuild(self, dates, prices):
+        """Recomputes the whole series, e.g. after a split or dividend re-adjusted the history."""
+        self.length = 0
+        self.base, self.base_position = np.nan, None
+        self.rebuilds += 1
+        self.date_dtype = dates.dtype
+        self._allocate(max(INITIAL_CAPACITY, 2 * len(prices)))
+        self._append(dates, prices)
+
+    def _same_price(self, values, position):
+        # Plain float arithmetic; np.isclose costs more than the whole update for one scalar
+        new, old = float(values[position]), float(self.prices[position])
+
+        return (new != new and old != old) or abs(new - old) <= REBASE_RTOL * abs(old)
+
+    def _resume_position(self, prices):
+        """
+        Compares prices with the bars computed so far. Every shared date and price is
+        compared (one vectorized pass, far cheaper than recomputing), so a bar revised
+        anywhere, e.g. after a failover to another provider or a data correction,
+        triggers a rebuild; only the newest bar may differ and is then recomputed alone.
+        Returns:
+            int | None: Number of computed bars that are still valid, or None to rebuild.
+        """
+        shared = min(len(prices), self.length)
+
+        if not shared:
+            return self.length
+
+        index = _dates(prices)[:shared]
+        values = prices.to_numpy(dtype = np.float64)
+
+        if index.dtype != self.date_dtype:
+            index = index.astype(self.date_dtype)
+
+        # Bitwise comparison: exact, NaN-safe and several times faster than np.array_equal(equal_nan = True)
+        if not np.array_equal(index.view(np.int64), self.dates[:shared].view(np.int64)):
+            return None
+
+        if not np.array_equal(values[:shared - 1].view(np.int64), self.prices[:shared - 1].view(np.int64)):
+            return None
+
+        if self._same_price(values, shared - 1):
+            return self.length
+
+        # Only the newest bar was revised (a provisional intraday bar): recompute just that bar
+        if shared == self.length:
+            return shared - 1
+
+        return None
+
+    def update(self, prices):
+        """
+        Brings the series in line with prices, computing only the bars it has not seen.
+        Args:
+            prices (pandas.Series): Prices from the start date, ascending by date.
+        Returns:
+            int: Number of bars covered by prices.
+        """
+        position = self._resume_position(prices)
+
+        if position is None:
+            self.rebuild(_dates(prices), prices.to_numpy(dtype = np.float64))
+        else:
+            if position < self.length:
+                self._truncate(position)
+
+            if len(prices) > self.length:
+                tail = prices.iloc[self.length:]
+                self._append(_dates(tail), tail.to_numpy(dtype = np.float64))
+
+        return len(prices)
+
+    def push(self, date, price):
+        """
+        Adds one bar in O(1). A bar for the last known date replaces it, so intraday
+        quotes can update today's provisional bar until the day closes.
+        Returns:
+            float: Gain at the new bar.
+        """
+        date = np.datetime64(pd.Timestamp(date), 's')
+
+        if self.length and date < self.dates[self.length - 1]:
+            raise ValueError(f"Bar for {date} is older than the last bar {self.dates[self.length - 1]}.")
+
+        if self.length and date == self.dates[self.length - 1]:
+            self._truncate(self.length - 1)
+
+        # Scalar version of _append: one tick must not pay for array set-up
+        price = float(price)
+        last = self.filled[self.length - 1] if self.length else np.nan
+        filled = last if price != price else price
+
+        if self.base_position is None and price == price:
+            self.base_position, self.base = self.length, price
+
+        gain = filled / self.base - 1 if self.base else np.nan
+        gain = gain * 100 if self.percent else gain
+
+        self._reserve(1)
+        self.dates[self.length] = date
+        self.prices[self.length] = price
+        self.filled[self.length] = filled
+        self.gains[self.length] = gain
+        self.length += 1
+
+        return gain
+
+    def series(self, count = None, name = None):
+        """
+        Returns:
+            pandas.Series: The first `count` gains (all when None) indexed by date, without copying.
+        """
+        count = self.length if count is None else min(count, self.length)
+        index = pd.DatetimeIndex(self.dates[:count], copy = False, name = 'date')
+
+        return pd.Series(self.gains[:count], index = index, name = name, copy = False)
+
+
+class IncrementalGains:
+    """
+    Cumulative gains per (symbol, start_date, column), kept between requests.
+    A request for a longer window than last time only computes the new bars; a shorter
+    one is a prefix view. When a split or dividend changes the adjusted history, the
+    stored base price no longer matches and the series is rebuilt from the new prices.
+    """
+
+    def __init__(self, percent = True, max_series = MAX_SERIES):
+        """
+        Args:
+            percent (bool): Gains in percent, as gain_kernel.cumulative_gain.
+            max_series (int): Number of series kept before the least recently used is dropped.
+        """
+        self.percent = percent
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, symbol, start_date, column):
+        key = (symbol, str(start_date)[:10], column)
+
+        with self._lock:
+            entry = self._series.get(key)
+
+            if entry is None:
+                entry = self._series[key] = (GainSeries(self.percent), threading.Lock())
+
+                if len(self._series) > self.max_series:
+                    self._series.popitem(last = False)
+            else:
+                self._series.move_to_end(key)
+
+            return entry
+
+    def update(self, symbol, start_date, prices, column = 'adj_close'):
+        """
+        Returns the cumulative gains of prices, reusing the bars computed by earlier calls.
+        Args:
+            symbol (str): Ticker symbol.
+            start_date (str): First date of the window the gains are relative to.
+            prices (pandas.Series): Prices from start_date, ascending by date (any end date).
+            column (str): Price column the series was taken from; part of the key.
+        Returns:
+            pandas.Series: Gains indexed by date, matching cumulative_gain(prices).
+        """
+        series, lock = self._get(symbol, start_date, column)
+
+        with span("gains.incremental", symbol = symbol), lock:
+            count = series.update(prices)
+
+            return series.series(count, name = prices.name)
+
+    def push(self, symbol, start_date, date, price, column = 'adj_close'):
+        """
+        Appends (or, for the same date, replaces) one bar in O(1).
+        Returns:
+            float: The gain at that bar.
+        """
+        series, lock = self._get(symbol, start_date, column)
+
+        with lock:
+            return series.push(date, price)
+
+    def last(self, symbol, start_date, column = 'adj_close'):
+        """
+        Returns:
+            tuple[pandas.Timestamp, float] | None: Date and gain of the latest bar, or None.
+        """
+        series, lock = self._get(symbol, start_date, column)
+
+        with lock:
+            if not series.length:
+                return None
+
+            return pd.Timestamp(series.dates[series.length - 1]), float(series.gains[series.length - 1])
+
+    def stream(self, symbols, start_date, source = None, interval = STREAM_INTERVAL, stop_event = None,
+               column = 'adj_close'):
+        """
+        Polls a price source and yields only the gains that changed since the last poll.
+        Args:
+            symbols (list[str]): Ticker symbols.
+            start_date (str): First date of the window.
+            source (PriceSource | None): Price source; the shared keyless source when None.
+            interval (float): Seconds between polls.
+            stop_event (threading.Event | None): Set it to end the stream.
+            column (str): Price column.
+        Yields:
+            dict[str, pandas.Series]: New gains per symbol; the first poll yields the full series.
+        """
+        if source is None:
+            from price_sources import get_source
+            source = get_source()
+
+        stop_event = stop_event or threading.Event()
+        seen = {}
+
+        while not stop_event.is_set():
+            started = time.monotonic()
+            changed = {}
+
+            for symbol, data in source.fetch_many(symbols, start_date).items():
+                gains = self.update(symbol, start_date, data[column], column)
+                rebuilds = self._get(symbol, start_date, column)[0].rebuilds
+                count, last, seen_rebuilds = seen.get(symbol, (0, np.nan, rebuilds))
+
+                if rebuilds != seen_rebuilds:
+                    count = 0       # history was re-adjusted: send the whole series again
+
+                if len(gains) > count:
+                    changed[symbol] = gains.iloc[count:]
+                elif len(gains) and not np.isclose(gains.iloc[-1], last, equal_nan = True):
+                    changed[symbol] = gains.iloc[-1:]     # today's provisional bar moved
+
+                if len(gains):
+                    seen[symbol] = (len(gains), gains.iloc[-1], rebuilds)
+
+            if changed:
+                yield changed
+
+            stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def default_engine():
+    """
+    Returns:
+        IncrementalGains: The process-wide engine shared by the apps and the refresh scheduler.
+    """
+    global _default_engine
+
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = IncrementalGains()
+
+        return _default_engine
@@ -0,0 +1,259 @@
+import datetime as dt
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from chart_render import MAX_CHART_POINTS, decimate_gains
+from fetch_engine import SingleFlight, get_time_series
+from incremental_gains import default_engine as gain_engine
+from market_calendar import MARKET_TZ, last_close, next_open, session_open
+from price_store import DEFAULT_STORE_DIR, PriceStore
+from tracing import span
+
+
+INTERVALS = ["1min", "5min", "15min", "30min", "60min"]
+DEFAULT_INTERVAL = "5min"
+COMPACT_BARS = 100          # bars in a 'compact' intraday response
+KEEP_DAYS = 30              # days of intraday bars kept per symbol
+INTRADAY_STORE_DIR = os.path.join(DEFAULT_STORE_DIR, "intraday")
+
+_polls = SingleFlight()
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+
+def interval_seconds(interval):
+    """
+    Returns:
+        int: Length of one bar, e.g. 300 for '5min'.
+    """
+    return int(interval.removesuffix("min")) * 60
+
+
+def normalize_intraday(frame):
+    """
+    Converts an Alpha Vantage intraday frame to the store schema. Unlike
+    price_sources.normalize the timestamps keep their time of day.
+    Returns:
+        pandas.DataFrame: 'close', 'adj_close' and 'volume', ascending by timestamp (US/Eastern).
+    """
+    index = frame.index if isinstance(frame.index, pd.DatetimeIndex) else pd.to_datetime(frame.index)
+    close = frame['4. close'].to_numpy(dtype = float)
+    data = pd.DataFrame({'close': close, 'adj_close': close,
+                         'volume': frame['5. volume'].to_numpy(dtype = float)}, index = index)
+    data.index.name = 'date'
+
+    # Newest bar first, as for daily series
+    if data.index.is_monotonic_decreasing:
+        return data.iloc[::-1]
+
+    return data if data.index.is_monotonic_increasing else data.sort_index()
+
+
+class IntradayFeed:
+    """
+    Intraday bars of one API key and bar interval, kept in a columnar PriceStore of
+    their own. Alpha Vantage cannot be asked for bars after a timestamp, so poll()
+    requests the 'compact' window (the last COMPACT_BARS bars) whenever the stored bars
+    reach into it and the full month otherwise, and merges only the bars newer than the
+    last stored one. Concurrent polls of the same symbol share one request, and
+    outside the NYSE session a symbol is only polled until its final bar is stored.
+    """
+
+    def __init__(self, api_key, interval = DEFAULT_INTERVAL, store = None):
+        """
+        Args:
+            api_key (str): Alpha Vantage API key.
+            interval (str): One of INTERVALS.
+            store (PriceStore | None): Where bars are kept; a per-interval store under INTRADAY_STORE_DIR when None.
+        """
+        if interval not in INTERVALS:
+            raise ValueError(f"Unsupported interval {interval!r}; use one of {', '.join(INTERVALS)}.")
+
+        self.api_key = api_key
+        self.interval = interval
+        self.ts = get_time_series(api_key)
+        self.store = store or PriceStore(os.path.join(INTRADAY_STORE_DIR, interval))
+
+    def last_timestamp(self, symbol):
+        """
+        Returns:
+            pandas.Timestamp | None: Newest stored bar, or None when nothing is stored.
+        """
+        bars = self.store.read(symbol)
+
+        return None if bars is None or bars.empty else bars.index[-1]
+
+    def outputsize(self, last):
+        """'compact' when the bars since `last` fit in one compact response, else 'full'."""
+        if last is None:
+            return 'full'
+
+        # Alpha Vantage timestamps are US/Eastern wall-clock times
+        now = pd.Timestamp.now(tz = "America/New_York").tz_localize(None)
+        missing = (now - last).total_seconds() / interval_seconds(self.interval)
+
+        return 'compact' if missing < COMPACT_BARS else 'full'
+
+    def due(self, symbol, now = None):
+        """
+        Whether a poll can bring new bars: always during the session, and outside it only
+        while the last session's final bar is missing. A chart left running overnight or
+        over a weekend therefore spends no quota.
+        Args:
+            symbol (str): Ticker symbol.
+            now (float | None): Unix time; the current time when None.
+        Returns:
+            bool: True when the symbol should be polled.
+        """
+        if session_open(now):
+            return True
+
+        last = self.last_timestamp(symbol)
+
+        if last is None:
+            return True
+
+        closes = dt.datetime.fromtimestamp(last_close(now), MARKET_TZ).replace(tzinfo = None)
+
+        return last < closes - pd.Timedelta(seconds = interval_seconds(self.interval))
+
+    def _poll(self, symbol):
+        last = self.last_timestamp(symbol)
+        size = self.outputsize(last)
+
+        with span("intraday.download", symbol = symbol, size = size):
+            frame, _ = self.ts.get_intraday(symbol = symbol, interval = self.interval, outputsize = size)
+
+        bars = normalize_intraday(frame)
+
+        if last is not None:
+            bars = bars.iloc[bars.index.searchsorted(last, side = 'right'):]
+
+        if bars.empty:
+            return 0
+
+        stored = self.store.read(symbol)
+        merged = bars if stored is None else pd.concat([stored.astype(float), bars])
+        cutoff = merged.index[-1] - pd.Timedelta(days = KEEP_DAYS)
+        self.store.write(symbol, merged.iloc[merged.index.searchsorted(cutoff):])
+
+        return len(bars)
+
+    def poll(self, symbol):
+        """
+        Fetches the bars published since the last poll.
+        Args:
+            symbol (str): Ticker symbol.
+        Returns:
+            int: Number of new bars stored.
+        """
+        return _polls.do((self.api_key, symbol, self.interval), lambda: self._poll(symbol))
+
+    def bars(self, symbol, start = None):
+        """
+        Returns:
+            pandas.DataFrame | None: Stored bars from start (inclusive), without copying.
+        """
+        return self.store.read(symbol, start)
+
+
+def get_feed(api_key, interval = DEFAULT_INTERVAL):
+    """
+    Returns:
+        IntradayFeed: The shared feed for an API key and interval.
+    """
+    with _feeds_lock:
+        feed = _feeds.get((api_key, interval))
+
+        if feed is None:
+            feed = _feeds[(api_key, interval)] = IntradayFeed(api_key, interval)
+
+        return feed
+
+
+def session_gains(feed, symbols, days = 1):
+    """
+    Intraday gains of each symbol relative to the first bar of its last `days` calendar
+    days of stored bars. The gains are extended bar by bar in the shared incremental
+    engine, so a poll that added one bar costs one bar.
+    Args:
+        feed (IntradayFeed): Where the bars are stored.
+        symbols (list[str]): Ticker symbols.
+        days (int): Calendar days shown.
+    Returns:
+        dict[str, pandas.Series]: Gains (%) indexed by timestamp, for symbols with bars.
+    """
+    gains = {}
+
+    for symbol in symbols:
+        last = feed.last_timestamp(symbol)
+
+        if last is None:
+            continue
+
+        start = last.normalize() - pd.Timedelta(days = days - 1)
+        close = feed.bars(symbol, start)['close']
+        gains[symbol] = gain_engine().update(symbol, start, close.astype(np.float64),
+                                             column = f"intraday_{feed.interval}")
+
+    return gains
+
+
+def live_chart(api_key, symbols, interval = DEFAULT_INTERVAL, days = 1, seen = None,
+               max_points = MAX_CHART_POINTS):
+    """
+    One tick of a live intraday chart: polls every symbol that is due (see
+    IntradayFeed.due) and rebuilds the (decimated) chart data only when a new bar arrived.
+    Args:
+        api_key (str): Alpha Vantage API key.
+        symbols (list[str]): Ticker symbols.
+        interval (str): Bar interval.
+        days (int): Calendar days shown.
+        seen (dict | None): Last chart state returned by this function; None on the first tick.
+        max_points (int): Maximum points per line.
+    Returns:
+        tuple[pandas.DataFrame | None, str, dict]: Chart data (None when nothing changed),
+        a message and the state to pass to the next tick.
+    """
+    feed = get_feed(api_key, interval)
+    notes = []
+    closed = False
+
+    for symbol in symbols:
+        if not feed.due(symbol):
+            closed = True
+            continue
+
+        # A tick must never block on the rate limiter; the next one tries again
+        if feed.ts.limiter.remaining() < 1:
+            notes.append(f"⚠️ Alpha Vantage quota used up; {symbol} waits for the next tick.")
+            continue
+
+        try:
+            feed.poll(symbol)
+
+        except Exception as e:
+            notes.append(f"⚠️ {symbol}: {e}")
+
+    if closed:
+        opens = dt.datetime.fromtimestamp(next_open(), MARKET_TZ)
+        notes.append(f"🕑 Market closed; polling resumes at {opens:%Y-%m-%d %H:%M} (US/Eastern).")
+
+    state = {'symbols': list(symbols), 'interval': interval, 'days': days,
+             'last': {symbol: str(feed.last_timestamp(symbol)) for symbol in symbols}}
+
+    if state == seen:
+        return None, "\n".join(notes), seen
+
+    with span("decimate"):
+        chart = decimate_gains(session_gains(feed, symbols, days), max_points)
+
+    stamps = [stamp for stamp in state['last'].values() if stamp != "None"]
+    notes.insert(0, f"✅ Last bar {max(stamps)} (US/Eastern), updated {time.strftime('%H:%M:%S')}."
+                 if stamps else "⚠️ No intraday bars yet.")
+
+    return chart, "\n".join(notes), state
@@ -0,0 +1,437 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from types import SimpleNamespace
+
+from fetch_engine import SingleFlight, fetch_many
+from ollama_manager import get_client, model_digest, stream_generate
+from tracing import span
+
+
+DEFAULT_LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite"))
+DEFAULT_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024   # LRU limit on stored responses
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+# Requests sent to Ollama at once by generate_many()/chat_many(); match the server's OLLAMA_NUM_PARALLEL
+OLLAMA_PARALLEL = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# AutoGen request fields that map onto Ollama options
+_OPTION_FIELDS = {"temperature": "temperature", "top_p": "top_p", "seed": "seed", "stop": "stop",
+                  "max_tokens": "num_predict"}
+
+
+class LLMCache:
+    """
+    Persistent cache of Ollama responses keyed by (model, weights digest, prompt or
+    messages, options). Sampling settings, including the seed, are part of the options,
+    so a request that changes any of them is a different entry, and a re-pulled model
+    never serves the old model's answers. Entries are evicted least-recently-used once
+    the stored responses exceed max_bytes. Identical requests in flight at the same time
+    share one generation, and failed generations are never stored.
+
+    The module functions only use the cache for deterministic requests (see
+    deterministic()): a sampled answer is not worth repeating forever.
+    """
+
+    def __init__(self, path = DEFAULT_LLM_CACHE_PATH, max_bytes = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path (str): SQLite file path, or ':memory:' for a throw-away cache.
+            max_bytes (int): Maximum total size of the stored responses.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._flights = SingleFlight()
+        self._digests = {}      # model -> digest whose responses are kept
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+
+        # Responses stored before digests were recorded cannot be matched to their weights
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+
+        if columns and "digest" not in columns:
+            self._conn.execute("DROP TABLE responses")
+
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT    PRIMARY KEY,
+                model       TEXT    NOT NULL,
+                digest      TEXT    NOT NULL,
+                response    TEXT    NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL    NOT NULL,
+                last_access REAL    NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def key(model, digest, request, options = None):
+        """
+        Args:
+            model (str): Ollama model name.
+            digest (str): Digest of the model's weights (ollama_manager.model_digest).
+            request (dict): {'prompt': str} or {'messages': list[dict]}, plus e.g. 'tools'.
+            options (dict | None): Ollama options such as temperature and seed.
+        Returns:
+            str: SHA-256 of the canonical JSON of the request.
+        """
+        canonical = json.dumps({"model": model, "digest": digest, "request": request, "options": options or {}},
+                               sort_keys = True, separators = (",", ":"), ensure_ascii = False)
+
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns:
+            str | None: The stored response, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+
+            with self._conn:
+                self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+
+            return row[0]
+
+    def put(self, key, model, digest, response):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (key, model, digest, response, size, now, now))
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+            if total > self.max_bytes:
+                self._evict(total - self.max_bytes)
+
+    def _evict(self, excess):
+        # Caller holds the lock: drop the least recently used responses until `excess` bytes are freed
+        keys = []
+
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access"):
+            if excess <= 0:
+                break
+
+            keys.append((key,))
+            excess -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+
+    def use_digest(self, model, digest):
+        """Drops the responses of a model's earlier weights the first time a new digest is seen."""
+        with self._lock:
+            if self._digests.get(model) == digest:
+                return
+
+            self._digests[model] = digest
+
+            with self._conn:
+                self._conn.execute("DELETE FROM responses WHERE model = ? AND digest != ?", (model, digest))
+
+    def get_or_call(self, key, model, digest, fn):
+        """
+        Returns the stored response, generating and storing it through fn on a miss.
+        Args:
+            key (str): Cache key (see key()).
+            model (str): Model name, kept for invalidate().
+            digest (str): Digest of the model's weights.
+            fn (callable): Zero-argument function returning the response text.
+        Returns:
+            str: The response.
+        """
+        cached = self.get(key)
+
+        if cached is not None:
+            return cached
+
+        def generate():
+            response = fn()
+            self.put(key, model, digest, response)
+
+            return response
+
+        return self._flights.do(key, generate)
+
+    def invalidate(self, model = None):
+        """
+        Drops stored responses, e.g. after a model was re-pulled with new weights.
+        Args:
+            model (str | None): Drop only this model's responses, or everything when None.
+        """
+        where, params = ("WHERE model = ?", (model,)) if model else ("", ())
+
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM responses {where}", params)
+
+    def stats(self):
+        """
+        Returns:
+            dict: 'hits', 'misses', 'hit_rate', stored 'responses' and their total 'bytes'.
+        """
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+        total = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0,
+                "responses": count, "bytes": size}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_llm_cache():
+    """
+    Returns:
+        LLMCache | None: The process-wide cache (LLM_CACHE_PATH), or None when LLM_CACHE=0.
+    """
+    global _default_cache
+
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+
+        return _default_cache
+
+
+def deterministic(options):
+    """
+    Returns:
+        bool: True when the options make a reply repeatable: a fixed seed or greedy
+        decoding (temperature 0). Only such requests are cached.
+    """
+    options = options or {}
+
+    return options.get("seed") is not None or options.get("temperature") == 0
+
+
+def _cache_entry(model_name, request, options):
+    """
+    Returns:
+        tuple[LLMCache | None, str | None, str | None]: The cache, key and model digest, or
+        Nones when the request must go to Ollama: caching is off, the request is sampled,
+        or the model's digest is unknown.
+    """
+    cache = default_llm_cache()
+
+    if cache is None or not deterministic(options):
+        return None, None, None
+
+    digest = model_digest(model_name)
+
+    if digest is None:
+        return None, None, None
+
+    cache.use_digest(model_name, digest)
+
+    return cache, LLMCache.key(model_name, digest, request, options), digest
+
+
+def cached_stream_generate(model_name, prompt, options = None):
+    """
+    stream_generate() through the cache: a repeated deterministic prompt is answered at
+    once as one chunk, anything else streams token by token (and is stored when it
+    completes, if deterministic).
+    """
+    cache, key, digest = _cache_entry(model_name, {"prompt": prompt}, options)
+
+    if cache is not None:
+        cached = cache.get(key)
+
+        if cached is not None:
+            with span("llm_cache.hit", model = model_name):
+                yield cached
+            return
+
+    chunks = []
+
+    for chunk in stream_generate(model_name, prompt, options):
+        chunks.append(chunk)
+        yield chunk
+
+    # Only complete responses are stored; an aborted stream is simply dropped
+    if cache is not None:
+        cache.put(key, model_name, digest, "".join(chunks))
+
+
+def generate(model_name, prompt, options = None):
+    """
+    Returns:
+        str: The complete response to a prompt, from the cache when the same
+        deterministic request was seen before.
+    """
+    def call():
+        with span("ollama.generate", model = model_name):
+            return get_client().generate(model = model_name, prompt = prompt, options = options)['response']
+
+    cache, key, digest = _cache_entry(model_name, {"prompt": prompt}, options)
+
+    if cache is None:
+        return call()
+
+    return cache.get_or_call(key, model_name, digest, call)
+
+
+def _ollama_messages(messages):
+    # OpenAI-style history (as AutoGen keeps it) to Ollama's: tool call arguments are objects, not JSON text
+    converted = []
+
+    for message in messages:
+        entry = {"role": message["role"], "content": message.get("content") or ""}
+
+        if message.get("tool_calls"):
+            entry["tool_calls"] = [{"function": {"name": call["function"]["name"],
+                                                 "arguments": json.loads(call["function"]["arguments"] or "{}")}}
+                                   for call in message["tool_calls"]]
+
+        converted.append(entry)
+
+    return converted
+
+
+def chat_message(model_name, messages, options = None, tools = None):
+    """
+    Args:
+        model_name (str): Ollama model name.
+        messages (list[dict]): Chat history as {'role', 'content'} dicts; assistant turns may
+            carry OpenAI-style 'tool_calls' and tool results use the 'tool' role.
+        options (dict | None): Ollama options; include 'seed' for reproducible sampling.
+        tools (list[dict] | None): OpenAI-style tool schemas the model may call.
+    Returns:
+        dict: The assistant's reply: 'content' and OpenAI-style 'tool_calls' (None when
+        the model called no tool), from the cache when the same conversation was seen before.
+    """
+    messages = _ollama_messages(messages)
+
+    def call():
+        with span("ollama.chat", model = model_name):
+            reply = get_client().chat(model = model_name, messages = messages, options = options,
+                                      tools = tools)['message']
+
+        # Ids are positional so a cached reply and its tool results still match
+        tool_calls = [{"id": f"call_{i}", "type": "function",
+                       "function": {"name": call.function.name, "arguments": json.dumps(call.function.arguments)}}
+                      for i, call in enumerate(reply.tool_calls or [])]
+
+        return json.dumps({"content": reply.content or "", "tool_calls": tool_calls or None})
+
+    request = {"messages": messages, "tools": tools} if tools else {"messages": messages}
+    cache, key, digest = _cache_entry(model_name, request, options)
+
+    if cache is None:
+        return json.loads(call())
+
+    return json.loads(cache.get_or_call(key, model_name, digest, call))
+
+
+def chat(model_name, messages, options = None):
+    """
+    Returns:
+        str: The assistant's reply to a chat history (see chat_message()).
+    """
+    return chat_message(model_name, messages, options)["content"]
+
+
+def generate_many(model_name, prompts, options = None, max_workers = OLLAMA_PARALLEL):
+    """
+    Answers independent prompts as one batch: repeated prompts are sent once, cached
+    ones are not sent at all, and the rest are dispatched concurrently so Ollama can
+    schedule them in parallel (up to its OLLAMA_NUM_PARALLEL slots).
+    Args:
+        model_name (str): Ollama model name.
+        prompts (list[str]): Prompts.
+        options (dict | None): Ollama options shared by all prompts; set a seed or temperature 0
+            for evaluation runs, or nothing is cached.
+        max_workers (int): Requests in flight at once.
+    Returns:
+        list[str]: Responses in the order of prompts.
+    """
+    with span("ollama.batch", model = model_name, prompts = len(prompts)):
+        results = fetch_many(prompts, lambda prompt: generate(model_name, prompt, options), max_workers)
+
+    return [results[prompt] for prompt in prompts]
+
+
+def chat_many(model_name, conversations, options = None, max_workers = OLLAMA_PARALLEL):
+    """
+    Like generate_many() for independent chat histories.
+    Returns:
+        list[str]: Replies in the order of conversations.
+    """
+    keys = [json.dumps(messages, sort_keys = True) for messages in conversations]
+    by_key = dict(zip(keys, conversations))
+
+    with span("ollama.batch", model = model_name, prompts = len(conversations)):
+        results = fetch_many(keys, lambda key: chat(model_name, by_key[key], options), max_workers)
+
+    return [results[key] for key in keys]
+
+
+class OllamaModelClient:
+    """
+    AutoGen model client that answers through Ollama's chat API and the LLMCache.
+    Name it in a config_list entry ({"model": ..., "model_client_cls": "OllamaModelClient"})
+    and call register_ollama_client(agent) after creating the agent. Set "cache_seed": None
+    in the llm_config so AutoGen does not keep a second, unbounded cache of its own.
+    Tools registered with the agent are passed to Ollama, so tool-calling agents work too.
+    """
+
+    def __init__(self, config, **kwargs):
+        self.model = config["model"]
+        self.options = {option: config[field] for field, option in _OPTION_FIELDS.items() if field in config}
+
+    def create(self, params):
+        options = dict(self.options)
+        options.update({option: params[field] for field, option in _OPTION_FIELDS.items()
+                        if params.get(field) is not None})
+        reply = chat_message(params.get("model") or self.model, params["messages"], options or None,
+                             params.get("tools"))
+        message = SimpleNamespace(role = "assistant", content = reply["content"], function_call = None,
+                                  tool_calls = reply["tool_calls"])
+
+        return SimpleNamespace(model = self.model, choices = [SimpleNamespace(message = message)],
+                               usage = SimpleNamespace(prompt_tokens = 0, completion_tokens = 0, total_tokens = 0))
+
+    def message_retrieval(self, response):
+        # A reply with tool calls goes back as a message dict, so AutoGen's executor runs them
+        return [{"role": "assistant", "content": choice.message.content, "tool_calls": choice.message.tool_calls}
+                if choice.message.tool_calls else choice.message.content
+                for choice in response.choices]
+
+    def cost(self, response):
+        return 0.0      # local model
+
+    @staticmethod
+    def get_usage(response):
+        return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost": 0.0,
+                "model": response.model}
+
+
+def register_ollama_client(agent):
+    """
+    Registers OllamaModelClient with an agent whose llm_config names it; does nothing otherwise.
+    Returns:
+        The agent.
+    """
+    config_list = (agent.llm_config or {}).get("config_list", [])
+
+    if any(config.get("model_client_cls") == OllamaModelClient.__name__ for config in config_list):
+        agent.register_model_client(model_client_cls = OllamaModelClient)
+
+    return agent
@@ -0,0 +1,158 @@
+import datetime as dt
+import functools
+import time
+
+import pandas as pd
+
+from pandas.tseries.holiday import (AbstractHolidayCalendar, GoodFriday, Holiday, USLaborDay,
+                                    USMartinLutherKingJr, USMemorialDay, USPresidentsDay,
+                                    USThanksgivingDay, nearest_workday, sunday_to_monday)
+from zoneinfo import ZoneInfo
+
+
+MARKET_TZ = ZoneInfo("America/New_York")
+MARKET_OPEN = dt.time(9, 30)
+MARKET_CLOSE = dt.time(16, 0)
+# Daily bars appear at Alpha Vantage and Yahoo a little after the close
+PUBLISH_DELAY = dt.timedelta(minutes = 30)
+
+_window = (0.0, 0.0)    # (last publish, next publish) around the most recent lookup
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Full-day NYSE holidays. Early closes (13:00) are treated as normal days, which only
+    means their bars are picked up at the regular publish time.
+    """
+
+    rules = [
+             # A New Year's Day on Saturday is not observed on the Friday before
+             Holiday("New Year's Day", month = 1, day = 1, observance = sunday_to_monday),
+             USMartinLutherKingJr,
+             USPresidentsDay,
+             GoodFriday,
+             USMemorialDay,
+             Holiday("Juneteenth", month = 6, day = 19, start_date = "2022-01-01", observance = nearest_workday),
+             Holiday("Independence Day", month = 7, day = 4, observance = nearest_workday),
+             USLaborDay,
+             USThanksgivingDay,
+             Holiday("Christmas", month = 12, day = 25, observance = nearest_workday),
+             ]
+
+
+@functools.lru_cache(maxsize = 8)
+def _holidays(year):
+    return frozenset(day.date() for day in NYSEHolidayCalendar().holidays(f"{year}-01-01", f"{year}-12-31"))
+
+
+def is_trading_day(day):
+    """
+    Args:
+        day (datetime.date): Calendar date.
+    Returns:
+        bool: True on weekdays that are not NYSE holidays.
+    """
+    return day.weekday() < 5 and day not in _holidays(day.year)
+
+
+def trading_days(start_date, end_date):
+    """
+    Returns:
+        pandas.DatetimeIndex: NYSE trading days between two dates, inclusive.
+    """
+    days = pd.bdate_range(start_date, end_date)
+
+    return days[[is_trading_day(day.date()) for day in days]]
+
+
+def _publish_time(day):
+    return (dt.datetime.combine(day, MARKET_CLOSE, tzinfo = MARKET_TZ) + PUBLISH_DELAY).timestamp()
+
+
+def last_publish(now = None):
+    """
+    Returns the time the most recent daily bar became available: the last trading-day
+    close plus PUBLISH_DELAY. Prices fetched after it are complete until next_publish().
+    Args:
+        now (float | None): Unix time; the current time when None.
+    Returns:
+        float: Unix time.
+    """
+    global _window
+
+    now = time.time() if now is None else now
+    last, upcoming = _window
+
+    # Called for every stored symbol on every request, so reuse the current window
+    if last <= now < upcoming:
+        return last
+
+    day = dt.datetime.fromtimestamp(now, MARKET_TZ).date()
+
+    while not (is_trading_day(day) and _publish_time(day) <= now):
+        day -= dt.timedelta(days = 1)
+
+    _window = (_publish_time(day), next_publish(now))
+
+    return _window[0]
+
+
+def next_publish(now = None):
+    """
+    Returns:
+        float: Unix time at which the next daily bar becomes available.
+    """
+    now = time.time() if now is None else now
+    day = dt.datetime.fromtimestamp(now, MARKET_TZ).date()
+
+    while not (is_trading_day(day) and _publish_time(day) > now):
+        day += dt.timedelta(days = 1)
+
+    return _publish_time(day)
+
+
+def session_open(now = None):
+    """
+    Args:
+        now (float | None): Unix time; the current time when None.
+    Returns:
+        bool: True between the open and the close of a trading day.
+    """
+    now = dt.datetime.fromtimestamp(time.time() if now is None else now, MARKET_TZ)
+
+    return is_trading_day(now.date()) and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def last_close(now = None):
+    """
+    Returns:
+        float: Unix time of the most recent trading-day close at or before now.
+    """
+    now = time.time() if now is None else now
+    today = dt.datetime.fromtimestamp(now, MARKET_TZ).date()
+
+    # No NYSE break is longer than four days, so two weeks always hold a close
+    for day in reversed(trading_days(today - dt.timedelta(days = 14), today)):
+        closes = dt.datetime.combine(day.date(), MARKET_CLOSE, tzinfo = MARKET_TZ).timestamp()
+
+        if closes <= now:
+            return closes
+
+    raise ValueError(f"No NYSE close in the two weeks before {today}.")
+
+
+def next_open(now = None):
+    """
+    Returns:
+        float: Unix time of the next trading-day open after now.
+    """
+    now = time.time() if now is None else now
+    day = dt.datetime.fromtimestamp(now, MARKET_TZ).date()
+
+    while True:
+        opens = dt.datetime.combine(day, MARKET_OPEN, tzinfo = MARKET_TZ).timestamp()
+
+        if is_trading_day(day) and opens > now:
+            return opens
+
+        day += dt.timedelta(days = 1)
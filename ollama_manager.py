@@ -1,34 +1,222 @@
+import os
 import subprocess
+import threading
+import time
 
-from ollama import Client
+from tracing import span
+
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+MODEL_CACHE_TTL = 30    # seconds a fetched model list is reused
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "10m")
+COLD_START_SECONDS = 0.5    # load_duration above this means the weights were not resident
+PRELOAD_INTERVAL = 240      # seconds between preloader rounds; keep below keep_alive
+
+_client = None
+_client_lock = threading.Lock()
+
+# Cached result of client.list(): ordered names for display, a set for O(1) lookups,
+# and each model's digest (it changes when the model is re-pulled)
+_registry = {"names": [], "name_set": frozenset(), "digests": {}, "fetched_at": None}
+_registry_lock = threading.Lock()
+
+_load_stats = {}
+_load_stats_lock = threading.Lock()
+
+STATS_WINDOW = 50   # recent streaming runs kept per model
+_generation_stats = {}
+_generation_stats_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared Ollama client; its HTTP connection pool is reused by every call."""
+    global _client
+
+    with _client_lock:
+        if _client is None:
+            from ollama import Client     # imported on first use so the apps start without it
+
+            _client = Client(host = OLLAMA_HOST)
+
+        return _client
+
+
+def _model_registry(refresh = False):
+    with _registry_lock:
+        fetched_at = _registry["fetched_at"]
+
+        if refresh or fetched_at is None or time.monotonic() - fetched_at > MODEL_CACHE_TTL:
+            models = get_client().list()['models']
+            names = [m.model for m in models if getattr(m, 'model', None)]
+            digests = {m.model: m.digest for m in models if getattr(m, 'model', None)}
+            _registry.update(names = names, name_set = frozenset(names), digests = digests,
+                             fetched_at = time.monotonic())
+
+        return _registry
+
+
+def invalidate_model_cache():
+    """Force the next lookup to fetch the model list from Ollama again."""
+    with _registry_lock:
+        _registry["fetched_at"] = None
 
 
 def model_exists(model_name):
-    client = Client(host = 'http://localhost:11434')
-    models = client.list()['models']
+    return model_name in _model_registry()["name_set"]
+
+
+def list_model_names(refresh = False):
+    return list(_model_registry(refresh)["names"])
 
-    return any(getattr(m, 'model', None) == model_name for m in models)
 
+def model_digest(model_name):
+    """
+    Return the digest of an installed model's weights, or None when it is not
+    installed or Ollama cannot be reached. A name without a tag means ':latest'.
+    """
+    try:
+        digests = _model_registry()["digests"]
 
-def list_model_names():
-    client = Client(host = 'http://localhost:11434')
-    models = client.list()['models']
+    except Exception:
+        return None
 
-    return [m.model for m in models]
+    return digests.get(model_name) or digests.get(f"{model_name}:latest")
 
 
-def start_model(model_name = "mistral:7b"):
-    """Start the Ollama model if not already running."""
+def start_model(model_name = "mistral:7b", keep_alive = OLLAMA_KEEP_ALIVE, mode = "load"):
+    """
+    Start the Ollama model if not already running.
+    mode="load" sends an empty prompt, which only loads the weights and keeps them
+    resident for `keep_alive`; mode="generate" runs a short completion as before.
+    Returns a dict with the load latency and whether it was a cold start.
+    """
     try:
-        # Ollama models are loaded on-demand, so just check if the server is running
-        client = Client(host = 'http://localhost:11434')
-        client.generate(model = model_name, prompt = "Test")
-        print(f"Model {model_name} is ready!")
+        started = time.perf_counter()
+        prompt = "" if mode == "load" else "Test"
+
+        with span("ollama.load", model = model_name, mode = mode):
+            response = get_client().generate(model = model_name, prompt = prompt, keep_alive = keep_alive)
+
+        # Load-only replies carry no timings on some Ollama versions; fall back to wall time
+        load_ns = response.get('load_duration')
+        load_seconds = load_ns / 1e9 if load_ns else time.perf_counter() - started
+        stats = {
+                "model": model_name,
+                "mode": mode,
+                "load_seconds": load_seconds,
+                "wall_seconds": time.perf_counter() - started,
+                "cold": load_seconds >= COLD_START_SECONDS,
+                }
+
+        with _load_stats_lock:
+            _load_stats[model_name] = stats
+
+        print(f"Model {model_name} is ready! "
+              f"({'cold' if stats['cold'] else 'warm'} start, loaded in {load_seconds:.2f}s)")
+
+        return stats
 
     except Exception as e:
         print(f"Error starting model {model_name}: {e}")
         raise
 
+    finally:
+        invalidate_model_cache()
+
+
+def load_stats():
+    """Return the latest warm-up result per model (see start_model)."""
+    with _load_stats_lock:
+        return dict(_load_stats)
+
+
+def stream_generate(model_name, prompt, options = None):
+    """
+    Generate a completion token by token, yielding text chunks as they arrive.
+    options are passed to Ollama as is (temperature, seed, ...).
+    Time-to-first-token and tokens/sec are recorded per model (see generation_stats).
+    """
+    started = time.perf_counter()
+    first_token_seconds = None
+    eval_count = eval_duration = 0
+
+    with span("ollama.generate", model = model_name):
+        for chunk in get_client().generate(model = model_name, prompt = prompt, options = options,
+                                           stream = True):
+            if first_token_seconds is None and chunk['response']:
+                first_token_seconds = time.perf_counter() - started
+
+            if chunk['done']:
+                eval_count = chunk['eval_count'] or 0
+                eval_duration = chunk['eval_duration'] or 0
+
+            yield chunk['response']
+
+    total_seconds = time.perf_counter() - started
+
+    with _generation_stats_lock:
+        stats = _generation_stats.setdefault(model_name, {"runs": 0, "ttft_seconds": [],
+                                                          "tokens_per_second": []})
+        stats["runs"] += 1
+        stats["ttft_seconds"].append(first_token_seconds if first_token_seconds is not None
+                                     else total_seconds)
+        stats["tokens_per_second"].append(eval_count / (eval_duration / 1e9) if eval_duration else 0.0)
+
+        # Keep a bounded window of recent runs per model
+        del stats["ttft_seconds"][:-STATS_WINDOW]
+        del stats["tokens_per_second"][:-STATS_WINDOW]
+
+
+def generation_stats():
+    """
+    Return per-model streaming latency: run count, last and mean time-to-first-token,
+    and last and mean tokens/sec over the recent window.
+    """
+    with _generation_stats_lock:
+        summary = {}
+
+        for model_name, stats in _generation_stats.items():
+            ttft, tps = stats["ttft_seconds"], stats["tokens_per_second"]
+            summary[model_name] = {
+                                   "runs": stats["runs"],
+                                   "last_ttft_seconds": ttft[-1],
+                                   "mean_ttft_seconds": sum(ttft) / len(ttft),
+                                   "last_tokens_per_second": tps[-1],
+                                   "mean_tokens_per_second": sum(tps) / len(tps),
+                                   }
+
+        return summary
+
+
+def _preload_loop(models, interval, keep_alive, stop_event):
+    while not stop_event.is_set():
+        for model_name in models:
+            try:
+                start_model(model_name, keep_alive = keep_alive)
+
+            except Exception:
+                pass    # start_model already logged it; retry on the next round
+
+        stop_event.wait(interval)
+
+
+def start_preloader(models = None, interval = PRELOAD_INTERVAL, keep_alive = OLLAMA_KEEP_ALIVE):
+    """
+    Keep a set of models resident by re-loading them in a background thread.
+    Models default to the comma-separated OLLAMA_PRELOAD_MODELS variable.
+    Returns a threading.Event; set it to stop the preloader.
+    """
+    if models is None:
+        models = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", "").split(",") if m.strip()]
+
+    stop_event = threading.Event()
+
+    if models:
+        threading.Thread(target = _preload_loop, args = (models, interval, keep_alive, stop_event),
+                         name = "ollama-preloader", daemon = True).start()
+
+    return stop_event
+
 
 def stop_model(model_name: str) -> bool:
     """Stop a running Ollama model via CLI."""
@@ -47,6 +235,9 @@ def stop_model(model_name: str) -> bool:
     except Exception as e:
         raise RuntimeError(f"Failed to stop model '{model_name}': {e}") from e
 
+    finally:
+        invalidate_model_cache()
+
 
 if __name__ == "__main__":
     start_model("phi3.5:3.8b")
@@ -1,16 +1,21 @@
-import yfinance as yf
 import matplotlib.pyplot as plt
 
+from gain_kernel import gains_frame
+from price_sources import get_source
+
 
 # Fetch stock data for NVDA and IBM from the start of 2025 to October 29, 2025
 start_date = "2025-01-01"
 end_date = "2025-10-29"
-nvda_data = yf.download('NVDA', start = start_date, end = end_date)
-ibm_data = yf.download('IBM', start = start_date, end = end_date)
+# One batched yfinance download for both symbols, with local CSV files as fallback
+prices = get_source().fetch_many(['NVDA', 'IBM'], start_date, end_date)
+nvda_data = prices['NVDA']
+ibm_data = prices['IBM']
 
 # Calculate the YTD gains
-nvda_gain = ((nvda_data['Close'] - nvda_data['Close'].iloc[0]) / nvda_data['Close'].iloc[0]) * 100
-ibm_gain = ((ibm_data['Close'] - ibm_data['Close'].iloc[0]) / ibm_data['Close'].iloc[0]) * 100
+gains = gains_frame({'NVDA': nvda_data['adj_close'], 'IBM': ibm_data['adj_close']})
+nvda_gain = gains['NVDA']
+ibm_gain = gains['IBM']
 
 # Create a plot
 plt.figure(figsize = (10, 5))
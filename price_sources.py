@@ -0,0 +1,511 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from fetch_engine import fetch_many, get_time_series
+from market_calendar import last_publish
+from price_store import default_store
+from stock_cache import get_daily_prices
+from tracing import span
+
+
+# Normalized schema returned by every source: ascending DatetimeIndex named 'date'
+# (timezone-naive) and these float columns.
+COLUMNS = ['close', 'adj_close', 'volume']
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_data")
+LATENCY_SMOOTHING = 0.3     # weight of the newest sample in the latency average
+FAILURE_COOLDOWN = 60       # seconds a failing source is tried only after healthy ones
+YF_BATCH_SIZE = 50          # symbols per yfinance download call
+YF_BATCH_WINDOW = 0.05      # seconds concurrent single-symbol requests wait to join a batch
+STORE_MAX_AGE = 5 * 24 * 60 * 60   # refetch stored histories at least this often (longest market break + 1 day)
+
+# yf.download keeps module-global state, so only one download may run at a time
+_yf_download_lock = threading.Lock()
+
+
+class PriceSourceError(ValueError):
+    """Raised when a source (or every source in a failover chain) cannot deliver prices."""
+
+
+class PriceSource:
+    """
+    Base class of the price backends. Subclasses implement _fetch(); fetch() adds
+    normalization checks, inclusive date slicing, and latency/failure bookkeeping
+    used by FailoverSource.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.latency = None     # smoothed seconds per successful fetch
+        self.failed_at = None
+        self._lock = threading.Lock()
+
+    def _fetch(self, symbol, start_date, end_date):
+        raise NotImplementedError
+
+    def remaining_quota(self):
+        """
+        Returns:
+            int | None: Calls available right now, or None when the source is not rate limited.
+        """
+        return None
+
+    def fetch(self, symbol, start_date = None, end_date = None):
+        """
+        Fetches daily prices in the normalized schema.
+        Args:
+            symbol (str): Stock ticker symbol.
+            start_date (str | None): First date (YYYY-MM-DD), inclusive.
+            end_date (str | None): Last date (YYYY-MM-DD), inclusive.
+        Returns:
+            pandas.DataFrame: 'close', 'adj_close' and 'volume' indexed by ascending date.
+        """
+        started = time.perf_counter()
+
+        try:
+            with span(f"{self.name}.fetch", symbol = symbol):
+                data = self._fetch(symbol, start_date, end_date)
+
+            if data is None or data.empty:
+                raise PriceSourceError(f"{self.name} returned no data for {symbol}")
+
+        except Exception:
+            with self._lock:
+                self.failed_at = time.monotonic()
+
+            raise
+
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.failed_at = None
+            self.latency = elapsed if self.latency is None else \
+                LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * self.latency
+
+        return slice_dates(data, start_date, end_date)
+
+    def fetch_many(self, symbols, start_date = None, end_date = None):
+        """
+        Fetches several symbols; backends that support it override this with a batched call.
+        Args:
+            symbols (list[str]): Ticker symbols; duplicates are fetched once.
+            start_date (str | None): First date (YYYY-MM-DD), inclusive.
+            end_date (str | None): Last date (YYYY-MM-DD), inclusive.
+        Returns:
+            dict[str, pandas.DataFrame]: Normalized prices for the symbols that succeeded.
+        """
+        def fetch_one(symbol):
+            try:
+                return self.fetch(symbol, start_date, end_date)
+
+            except Exception as e:
+                print(f"⚠️ {self.name} failed for {symbol}. ({e})")
+
+                return None
+
+        results = fetch_many(symbols, fetch_one)
+
+        return {symbol: data for symbol, data in results.items() if data is not None}
+
+    def healthy(self):
+        with self._lock:
+            return self.failed_at is None or time.monotonic() - self.failed_at > FAILURE_COOLDOWN
+
+
+def normalize(frame, close, adj_close = None, volume = None):
+    """
+    Converts a backend frame to the shared schema.
+    Args:
+        frame (pandas.DataFrame): Backend output indexed by date.
+        close (str): Name of the raw close column.
+        adj_close (str | None): Name of the adjusted close column; close is used when None.
+        volume (str | None): Name of the volume column, if any.
+    Returns:
+        pandas.DataFrame: Normalized, ascending frame.
+    """
+    with span("normalize", rows = len(frame)):
+        index = frame.index if isinstance(frame.index, pd.DatetimeIndex) else pd.to_datetime(frame.index)
+
+        if index.tz is not None:
+            index = index.tz_localize(None)
+
+        data = pd.DataFrame({
+                             'close': frame[close].to_numpy(dtype = float),
+                             'adj_close': frame[adj_close or close].to_numpy(dtype = float),
+                             'volume': frame[volume].to_numpy(dtype = float) if volume else float('nan'),
+                             }, index = index.normalize())
+        data.index.name = 'date'
+
+        # Alpha Vantage lists bars newest first: reversing is cheaper than a sort
+        if data.index.is_monotonic_decreasing:
+            return data.iloc[::-1]
+
+        return data if data.index.is_monotonic_increasing else data.sort_index()
+
+
+def slice_dates(data, start_date = None, end_date = None):
+    """
+    Selects an inclusive date range of a normalized (ascending, date-indexed) frame by
+    binary search on its index. The result is a positional slice, so no boolean mask
+    over the whole history is built and the rows are not copied.
+    Args:
+        data (pandas.DataFrame | pandas.Series): Ascending DatetimeIndex.
+        start_date (str | None): First date (YYYY-MM-DD), inclusive.
+        end_date (str | None): Last date (YYYY-MM-DD), inclusive (the whole day).
+    Returns:
+        pandas.DataFrame | pandas.Series: Rows within the range.
+    """
+    dates = data.index
+    i = 0 if start_date is None else dates.searchsorted(pd.Timestamp(start_date), side = 'left')
+
+    if end_date is None:
+        j = len(dates)
+    else:
+        end = pd.Timestamp(end_date)
+        # A date without a time covers the whole day, like .loc['YYYY-MM-DD']
+        j = dates.searchsorted(end + pd.Timedelta(days = 1), side = 'left') if end == end.normalize() \
+            else dates.searchsorted(end, side = 'right')
+
+    return data.iloc[i:max(i, j)]
+
+
+class AlphaVantageSource(PriceSource):
+    """Alpha Vantage daily bars through the persistent price cache and rate limiter."""
+
+    name = "alpha_vantage"
+
+    def __init__(self, api_key):
+        super().__init__()
+        self.ts = get_time_series(api_key)
+
+    def remaining_quota(self):
+        return self.ts.limiter.remaining()
+
+    def _fetch(self, symbol, start_date, end_date):
+        data, column = get_daily_prices(self.ts, symbol)
+        volume = '6. volume' if '6. volume' in data.columns else '5. volume'
+
+        return normalize(data, '4. close', column, volume if volume in data.columns else None)
+
+
+class _PendingBatch:
+    def __init__(self):
+        self.symbols = []
+        self.results = {}
+        self.error = None
+        self.done = threading.Event()
+
+
+class YFinanceSource(PriceSource):
+    """
+    Yahoo Finance daily bars via yfinance (no API key needed).
+    Symbols are downloaded in batched multi-ticker calls: fetch_many() splits a watchlist
+    into YF_BATCH_SIZE chunks, and concurrent fetch() calls for the same date range that
+    arrive within YF_BATCH_WINDOW seconds share one download.
+    """
+
+    name = "yfinance"
+
+    def __init__(self, batch_size = YF_BATCH_SIZE, batch_window = YF_BATCH_WINDOW):
+        super().__init__()
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def download(self, symbols, start_date, end_date):
+        """
+        Downloads many symbols in one yfinance call and splits the result per symbol.
+        Args:
+            symbols (list[str]): Ticker symbols.
+            start_date (str | None): First date (YYYY-MM-DD), inclusive.
+            end_date (str | None): Last date (YYYY-MM-DD), inclusive.
+        Returns:
+            dict[str, pandas.DataFrame]: Normalized prices for the symbols that returned data.
+        """
+        import yfinance as yf
+
+        symbols = list(dict.fromkeys(symbols))
+        # yfinance treats 'end' as exclusive; the shared schema is inclusive
+        end = None if end_date is None else \
+            (pd.Timestamp(end_date) + pd.Timedelta(days = 1)).strftime("%Y-%m-%d")
+
+        with span("yfinance.download", symbols = len(symbols)), _yf_download_lock:
+            frame = yf.download(symbols, start = start_date, end = end,
+                                period = None if start_date else "max", group_by = 'ticker',
+                                auto_adjust = False, threads = True, progress = False)
+
+        if frame is None or frame.empty:
+            return {}
+
+        if not isinstance(frame.columns, pd.MultiIndex):
+            frame = pd.concat({symbols[0]: frame}, axis = 1)
+
+        # Normalize the whole batch once; per-symbol selections below are views of it
+        with span("normalize", rows = len(frame)):
+            index = pd.to_datetime(frame.index)
+            frame.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+            frame.index.name = 'date'
+            frame = frame.rename(columns = {'Close': 'close', 'Adj Close': 'adj_close',
+                                            'Volume': 'volume'}, level = 1).sort_index()
+        results = {}
+
+        for symbol in symbols:
+            if symbol not in frame.columns.get_level_values(0):
+                continue
+
+            data = frame[symbol][COLUMNS]
+
+            if data['close'].isna().any():
+                data = data.dropna(subset = ['close'])
+
+            if not data.empty:
+                results[symbol] = data
+
+        return results
+
+    def fetch_many(self, symbols, start_date = None, end_date = None):
+        unique = list(dict.fromkeys(symbols))
+        chunks = [unique[i:i + self.batch_size] for i in range(0, len(unique), self.batch_size)]
+        results = {}
+        started = time.perf_counter()
+
+        for chunk in chunks:
+            results.update(self.download(chunk, start_date, end_date))
+
+        if results:
+            elapsed = (time.perf_counter() - started) / max(len(chunks), 1)
+
+            with self._lock:
+                self.failed_at = None
+                self.latency = elapsed if self.latency is None else \
+                    LATENCY_SMOOTHING * elapsed + (1 - LATENCY_SMOOTHING) * self.latency
+
+        return results
+
+    def _fetch(self, symbol, start_date, end_date):
+        key = (start_date, end_date)
+
+        with self._pending_lock:
+            batch = self._pending.get(key)
+            leader = batch is None or len(batch.symbols) >= self.batch_size
+
+            if leader:
+                batch = _PendingBatch()
+                self._pending[key] = batch
+
+            batch.symbols.append(symbol)
+
+        if not leader:
+            batch.done.wait()
+        else:
+            # Give concurrent requests a moment to join, then download them together
+            time.sleep(self.batch_window)
+
+            with self._pending_lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+
+            try:
+                batch.results = self.download(batch.symbols, start_date, end_date)
+
+            except Exception as e:
+                batch.error = e
+
+            finally:
+                batch.done.set()
+
+        if batch.error is not None:
+            raise batch.error
+
+        return batch.results.get(symbol)
+
+
+class LocalFileSource(PriceSource):
+    """
+    Offline prices from CSV files named <SYMBOL>.csv with a 'date' column and
+    'close' (required), 'adj_close' and 'volume' columns.
+    """
+
+    name = "local_file"
+
+    def __init__(self, directory = DEFAULT_DATA_DIR):
+        super().__init__()
+        self.directory = directory
+
+    def _fetch(self, symbol, start_date, end_date):
+        path = os.path.join(self.directory, f"{symbol}.csv")
+
+        if not os.path.exists(path):
+            raise PriceSourceError(f"No local price file for {symbol} in {self.directory}")
+
+        frame = pd.read_csv(path, index_col = 'date')
+
+        return normalize(frame, 'close',
+                         'adj_close' if 'adj_close' in frame.columns else None,
+                         'volume' if 'volume' in frame.columns else None)
+
+
+class FailoverSource(PriceSource):
+    """
+    Tries several sources in order of health, remaining quota and measured latency,
+    so a backend that is down or out of quota does not stall requests.
+    """
+
+    name = "failover"
+
+    def __init__(self, sources):
+        super().__init__()
+        self.sources = list(sources)
+
+    def ordered_sources(self):
+        """
+        Returns:
+            list[PriceSource]: Healthy sources with quota first, then fastest measured
+            latency; sources not measured yet follow in their configured order.
+        """
+        def rank(item):
+            position, source = item
+            quota = source.remaining_quota()
+
+            return (not source.healthy(),
+                    quota is not None and quota < 1,
+                    source.latency if source.latency is not None else float('inf'),
+                    position)
+
+        return [source for _, source in sorted(enumerate(self.sources), key = rank)]
+
+    def remaining_quota(self):
+        quotas = [source.remaining_quota() for source in self.sources]
+
+        return None if None in quotas else sum(quotas)
+
+    def _fetch(self, symbol, start_date, end_date):
+        errors = []
+
+        for source in self.ordered_sources():
+            try:
+                return source.fetch(symbol, start_date, end_date)
+
+            except Exception as e:
+                errors.append(f"{source.name}: {e}")
+                print(f"⚠️ {source.name} failed for {symbol}, trying next source. ({e})")
+
+        raise PriceSourceError(f"All price sources failed for {symbol}: " + "; ".join(errors))
+
+    def fetch_many(self, symbols, start_date = None, end_date = None):
+        results = {}
+        missing = list(dict.fromkeys(symbols))
+
+        # Each source gets one batched call for whatever the previous sources could not deliver
+        for source in self.ordered_sources():
+            if not missing:
+                break
+
+            try:
+                results.update(source.fetch_many(missing, start_date, end_date))
+
+            except Exception as e:
+                print(f"⚠️ {source.name} failed for {len(missing)} symbol(s), trying next source. ({e})")
+
+            missing = [symbol for symbol in missing if symbol not in results]
+
+        return {symbol: results[symbol] for symbol in symbols if symbol in results}
+
+
+class StoredSource(PriceSource):
+    """
+    Serves prices from the memory-mapped PriceStore and refreshes a symbol's full
+    history from the wrapped source once a new daily bar has been published since it
+    was stored (see market_calendar), or once it is older than ttl.
+    Date ranges are then binary-searched views of the stored columns, instead of
+    filtered copies of a full pandas frame.
+    """
+
+    name = "store"
+
+    def __init__(self, source, store = None, ttl = STORE_MAX_AGE):
+        """
+        Args:
+            source (PriceSource): Source used for missing or stale symbols.
+            store (PriceStore | None): Store to use; the shared default store when None.
+            ttl (float): Maximum seconds a stored history is served before it is refreshed.
+        """
+        super().__init__()
+        self.source = source
+        self.store = store or default_store()
+        self.ttl = ttl
+
+    def remaining_quota(self):
+        return self.source.remaining_quota()
+
+    def fresh(self, symbol):
+        updated_at = self.store.updated_at(symbol)
+
+        now = time.time()
+
+        return updated_at is not None and now - updated_at < self.ttl and updated_at >= last_publish(now)
+
+    def _fetch(self, symbol, start_date, end_date):
+        if not self.fresh(symbol):
+            try:
+                self.store.write(symbol, self.source.fetch(symbol))
+
+            except Exception:
+                # A stale copy is better than no data while every source is failing
+                if self.store.updated_at(symbol) is None:
+                    raise
+
+                print(f"⚠️ Serving stored prices for {symbol}; refresh failed.")
+
+        return self.store.read(symbol, start_date, end_date)
+
+    def refresh(self, symbols):
+        """Fetches everything missing or out of date in one batched full-history call."""
+        stale = [symbol for symbol in dict.fromkeys(symbols) if not self.fresh(symbol)]
+
+        if stale:
+            for symbol, data in self.source.fetch_many(stale).items():
+                self.store.write(symbol, data)
+
+    def fetch_many(self, symbols, start_date = None, end_date = None):
+        unique = list(dict.fromkeys(symbols))
+        self.refresh(unique)
+        results = {symbol: self.store.read(symbol, start_date, end_date) for symbol in unique}
+
+        return {symbol: data for symbol, data in results.items() if data is not None and not data.empty}
+
+    def aligned(self, symbols, start_date = None, end_date = None, column = 'adj_close'):
+        """
+        Refreshes the symbols, then returns them on the store's shared trading calendar
+        as one matrix, without building a frame per symbol (see PriceStore.aligned).
+        """
+        self.refresh(symbols)
+
+        return self.store.aligned(list(dict.fromkeys(symbols)), start_date, end_date, column)
+
+
+_sources = {}
+_sources_lock = threading.Lock()
+
+
+def get_source(api_key = None):
+    """
+    Returns the shared source: prices come from the memory-mapped store and are
+    refreshed through a failover chain of Alpha Vantage (when an API key is given),
+    then yfinance, then local CSV files.
+    Args:
+        api_key (str | None): Alpha Vantage API key.
+    Returns:
+        StoredSource: Source reused across requests so latency and health persist.
+    """
+    with _sources_lock:
+        if api_key not in _sources:
+            backends = [AlphaVantageSource(api_key)] if api_key else []
+            backends += [YFinanceSource(), LocalFileSource()]
+            _sources[api_key] = StoredSource(FailoverSource(backends))
+
+        return _sources[api_key]
@@ -0,0 +1,274 @@
+import glob
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_STORE_DIR = os.getenv("PRICE_STORE_DIR",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_store"))
+MAGIC = b"PRICES01"
+# File layout: 16-byte header (magic, row count), then int64 dates (seconds since epoch),
+# int64 volume, float32 close and float32 adjusted close, each as one contiguous column.
+_HEADER = np.dtype([('magic', 'S8'), ('rows', '<i8')])
+_COLUMNS = [('dates', np.dtype('<i8')), ('volume', np.dtype('<i8')),
+            ('close', np.dtype('<f4')), ('adj_close', np.dtype('<f4'))]
+
+
+class _Columns:
+    """Read-only column views over one memory-mapped symbol file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._map = np.memmap(path, mode = 'r')
+        header = np.frombuffer(self._map, dtype = _HEADER, count = 1)[0]
+
+        if header['magic'] != MAGIC:
+            raise ValueError(f"{path} is not a price store file")
+
+        rows = int(header['rows'])
+        offset = _HEADER.itemsize
+        self.rows = rows
+
+        for name, dtype in _COLUMNS:
+            setattr(self, name, np.ndarray(rows, dtype = dtype, buffer = self._map, offset = offset))
+            offset += rows * dtype.itemsize
+
+        self.dates = self.dates.view('datetime64[s]')
+
+    def slice(self, start_date = None, end_date = None):
+        """Binary-searches the sorted dates; returns the [i, j) row range of an inclusive date range."""
+        i = 0 if start_date is None else \
+            int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date), 's'), 'left'))
+        j = self.rows if end_date is None else \
+            int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date), 's'), 'right'))
+
+        return i, max(i, j)
+
+
+class PriceStore:
+    """
+    Columnar on-disk price history, one memory-mapped file per symbol.
+    Prices are stored as float32 and volume as int64, so a 20-year daily history takes
+    about 120 KB instead of a pandas frame of strings and objects; pages are loaded by
+    the OS only when a date range is read. Reads return zero-copy views, and a shared
+    trading calendar (the union of all stored dates) aligns many symbols at once.
+
+    Each write creates a new file version, so readers holding views of the old one are
+    unaffected (and Windows, which cannot replace a mapped file, is supported).
+    """
+
+    def __init__(self, directory = DEFAULT_STORE_DIR):
+        """
+        Args:
+            directory (str): Folder holding the <SYMBOL>.<version>.prices files.
+        """
+        self.directory = directory
+        self._files = {}        # symbol -> _Columns of the newest version
+        self._calendar = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+        self._mtime = os.stat(directory).st_mtime_ns
+
+    def _check_directory(self):
+        # Caller holds the lock. Another process (e.g. refresh_scheduler.py) may have written
+        # new versions; the directory mtime changes with every file added or removed.
+        mtime = os.stat(self.directory).st_mtime_ns
+
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._files.clear()
+            self._calendar = None
+
+    def _versions(self, symbol):
+        # Exact match, so 'BRK' does not pick up the files of 'BRK.B'
+        return [path for path in glob.glob(os.path.join(self.directory, f"{glob.escape(symbol)}.*.prices"))
+                if os.path.basename(path).rsplit(".", 2)[0] == symbol]
+
+    def _path(self, symbol):
+        return max(self._versions(symbol), key = lambda path: int(path.rsplit(".", 2)[-2]), default = None)
+
+    def _columns(self, symbol):
+        with self._lock:
+            self._check_directory()
+            columns = self._files.get(symbol)
+
+            while columns is None:
+                path = self._path(symbol)
+
+                if path is None:
+                    return None
+
+                try:
+                    columns = self._files[symbol] = _Columns(path)
+
+                except FileNotFoundError:
+                    # A write (e.g. from the refresh scheduler's thread) replaced this version
+                    # between the glob and the mapping: the newer version is there now
+                    continue
+
+            return columns
+
+    def symbols(self):
+        """
+        Returns:
+            list[str]: Stored symbols, sorted.
+        """
+        names = {os.path.basename(path).rsplit(".", 2)[0]
+                 for path in glob.glob(os.path.join(self.directory, "*.prices"))}
+
+        return sorted(names)
+
+    def updated_at(self, symbol):
+        """
+        Returns:
+            float | None: Unix time of the symbol's last write, or None when not stored.
+        """
+        columns = self._columns(symbol)
+
+        return None if columns is None else int(columns.path.rsplit(".", 2)[-2]) / 1e9
+
+    def write(self, symbol, data):
+        """
+        Stores a symbol's full history, replacing any previous version.
+        Args:
+            symbol (str): Ticker symbol.
+            data (pandas.DataFrame): Normalized prices ('close', 'adj_close', 'volume' by date).
+        Returns:
+            str: Path of the new file.
+        """
+        data = data[~data.index.duplicated(keep = 'last')].sort_index()
+        rows = len(data)
+        volume = data['volume'].to_numpy(dtype = np.float64)
+        arrays = {
+                  'dates': data.index.to_numpy(dtype = 'datetime64[s]').view('<i8'),
+                  'volume': np.nan_to_num(volume, nan = 0).astype('<i8'),
+                  'close': data['close'].to_numpy(dtype = '<f4'),
+                  'adj_close': data['adj_close'].to_numpy(dtype = '<f4'),
+                  }
+        header = np.array([(MAGIC, rows)], dtype = _HEADER)
+        path = os.path.join(self.directory, f"{symbol}.{time.time_ns()}.prices")
+        fd, tmp_path = tempfile.mkstemp(suffix = ".tmp", dir = self.directory)
+
+        with os.fdopen(fd, "wb") as f:
+            f.write(header.tobytes())
+
+            for name, dtype in _COLUMNS:
+                f.write(np.ascontiguousarray(arrays[name], dtype = dtype).tobytes())
+
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._files.pop(symbol, None)
+            self._calendar = None
+
+        self._remove_old_versions(symbol, keep = path)
+
+        return path
+
+    def _remove_old_versions(self, symbol, keep):
+        for path in self._versions(symbol):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass    # still mapped by a reader (Windows); removed on a later write
+
+    def read(self, symbol, start_date = None, end_date = None):
+        """
+        Reads an inclusive date range without copying.
+        Args:
+            symbol (str): Ticker symbol.
+            start_date (str | None): First date (YYYY-MM-DD), inclusive.
+            end_date (str | None): Last date (YYYY-MM-DD), inclusive.
+        Returns:
+            pandas.DataFrame | None: 'close', 'adj_close' (float32) and 'volume' (int64)
+            indexed by date, backed by the mapped file; None when the symbol is not stored.
+        """
+        columns = self._columns(symbol)
+
+        if columns is None:
+            return None
+
+        i, j = columns.slice(start_date, end_date)
+        index = pd.DatetimeIndex(columns.dates[i:j], copy = False, name = 'date')
+
+        return pd.DataFrame({'close': columns.close[i:j], 'adj_close': columns.adj_close[i:j],
+                             'volume': columns.volume[i:j]}, index = index, copy = False)
+
+    def calendar(self):
+        """
+        Returns:
+            numpy.ndarray: Sorted union of the dates of all stored symbols (datetime64[s]).
+        """
+        with self._lock:
+            self._check_directory()
+            calendar = self._calendar
+
+        if calendar is None:
+            # A symbol listed by symbols() may have been removed since
+            dates = [columns.dates for columns in map(self._columns, self.symbols()) if columns is not None]
+            calendar = np.unique(np.concatenate(dates)) if dates else np.array([], dtype = 'datetime64[s]')
+
+            with self._lock:
+                self._calendar = calendar
+
+        return calendar
+
+    def aligned(self, symbols, start_date = None, end_date = None, column = 'adj_close'):
+        """
+        Places several symbols on the shared trading calendar.
+        Args:
+            symbols (list[str]): Ticker symbols; symbols that are not stored are skipped.
+            start_date (str | None): First date (YYYY-MM-DD), inclusive.
+            end_date (str | None): Last date (YYYY-MM-DD), inclusive.
+            column (str): 'close', 'adj_close' or 'volume'.
+        Returns:
+            tuple[pandas.DatetimeIndex, list[str], numpy.ndarray]: Calendar dates in the range,
+            the stored symbols, and a float64 date×symbol matrix with NaN where a symbol has no bar.
+        """
+        calendar = self.calendar()
+        lo = 0 if start_date is None else \
+            int(np.searchsorted(calendar, np.datetime64(pd.Timestamp(start_date), 's'), 'left'))
+        hi = len(calendar) if end_date is None else \
+            int(np.searchsorted(calendar, np.datetime64(pd.Timestamp(end_date), 's'), 'right'))
+        dates = calendar[lo:hi]
+        present = [symbol for symbol in symbols if self._columns(symbol) is not None]
+        matrix = np.full((len(dates), len(present)), np.nan)
+
+        for k, symbol in enumerate(present):
+            columns = self._columns(symbol)
+            i, j = columns.slice(start_date, end_date)
+            rows = np.searchsorted(dates, columns.dates[i:j])
+            matrix[rows, k] = getattr(columns, column)[i:j]
+
+        return pd.DatetimeIndex(dates, name = 'date'), present, matrix
+
+    def nbytes(self):
+        """
+        Returns:
+            int: Total size of the stored files.
+        """
+        return sum(os.path.getsize(path) for path in glob.glob(os.path.join(self.directory, "*.prices")))
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def default_store():
+    """
+    Returns the process-wide price store, creating it on first use.
+    Returns:
+        PriceStore: Shared store next to the scripts (or in PRICE_STORE_DIR).
+    """
+    global _default_store
+
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = PriceStore()
+
+        return _default_store
@@ -0,0 +1,200 @@
+import argparse
+import datetime as dt
+import os
+import threading
+import time
+
+import pandas as pd
+
+from fetch_engine import AV_CALLS_PER_MINUTE
+from incremental_gains import default_engine as gain_engine
+from market_calendar import MARKET_TZ, next_publish
+from price_sources import AlphaVantageSource, get_source
+from stock_comparison import final_gains, parse_symbols
+
+
+INTERACTIVE_RESERVE = 5                 # Alpha Vantage calls per day left for the Gradio apps
+REFRESH_WINDOW = 2 * 60 * 60            # Alpha Vantage refreshes are spread over this long after publish
+MIN_SPACING = 2 * 60 / AV_CALLS_PER_MINUTE   # at most half the per-minute quota goes to the scheduler
+RETRY_INTERVAL = 15 * 60                # retry symbols whose refresh failed after this many seconds
+
+
+class RefreshScheduler:
+    """
+    Keeps the stored prices of a watchlist current so no user waits for the network.
+    Once a trading day's bars are published (market_calendar.next_publish), stale symbols
+    are refreshed: up to the Alpha Vantage daily budget one call at a time, spaced over
+    REFRESH_WINDOW so interactive requests keep most of the per-minute quota, and the
+    rest in one batched keyless (yfinance) download. The watchlist's YTD gain series are
+    then extended by the new bars in this process's incremental gain engine.
+
+    Only the price store is shared on disk. Run as its own service (python
+    refresh_scheduler.py), the scheduler keeps app requests off the network; the gain
+    series are warmed only when it runs in the app process (start_scheduler), where app
+    requests for them just check that nothing changed.
+    """
+
+    def __init__(self, watchlist, api_key = None, reserve = INTERACTIVE_RESERVE,
+                 window = REFRESH_WINDOW, min_spacing = MIN_SPACING):
+        """
+        Args:
+            watchlist (list[str]): Symbols to keep current.
+            api_key (str | None): Alpha Vantage API key; yfinance and local files only when None.
+            reserve (int): Alpha Vantage calls per day the scheduler leaves unused.
+            window (float): Seconds over which Alpha Vantage refreshes are spread.
+            min_spacing (float): Minimum seconds between two Alpha Vantage refreshes.
+        """
+        self.watchlist = list(dict.fromkeys(watchlist))
+        self.reserve = reserve
+        self.window = window
+        self.min_spacing = min_spacing
+        self.source = get_source()
+        self.alpha_vantage = AlphaVantageSource(api_key) if api_key else None
+        self.ytd_gains = None       # date×symbol gains (%) after the last run, in this process only
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def stale(self):
+        """
+        Returns:
+            list[str]: Watchlist symbols stored before the latest daily bar was published.
+        """
+        return [symbol for symbol in self.watchlist if not self.source.fresh(symbol)]
+
+    def refresh(self):
+        """
+        Refreshes every stale symbol once.
+        Returns:
+            list[str]: Symbols that are still stale because every source failed.
+        """
+        stale = self.stale()
+        budget = 0
+
+        if self.alpha_vantage and stale:
+            budget = max(0, self.alpha_vantage.ts.limiter.remaining_today() - self.reserve)
+
+        via_alpha_vantage, rest = stale[:budget], stale[budget:]
+        spacing = max(self.min_spacing, self.window / len(via_alpha_vantage)) if via_alpha_vantage else 0
+
+        if rest:
+            print(f"Refreshing {len(rest)} symbol(s) in one batched download.")
+            self.source.refresh(rest)
+
+        for i, symbol in enumerate(via_alpha_vantage):
+            if i and self._stop.wait(spacing):
+                break
+
+            try:
+                self.source.store.write(symbol, self.alpha_vantage.fetch(symbol))
+                print(f"✅ Refreshed {symbol} from Alpha Vantage.")
+
+            except Exception as e:
+                print(f"⚠️ Alpha Vantage refresh of {symbol} failed ({e}). Trying the other sources.")
+                self.source.refresh([symbol])
+
+        return self.stale()
+
+    def run_once(self):
+        """
+        Refreshes the stale symbols and extends the watchlist's YTD gains.
+        Returns:
+            list[str]: Symbols that could not be refreshed.
+        """
+        failed = self.refresh()
+        today = dt.datetime.now(MARKET_TZ).date()
+        current = [symbol for symbol in self.watchlist if symbol not in failed]
+
+        if current:
+            start = f"{today.year}-01-01"
+            prices = self.source.fetch_many(current, start, today.isoformat())
+            self.ytd_gains = pd.DataFrame({symbol: gain_engine().update(symbol, start, data['adj_close'])
+                                           for symbol, data in prices.items()}).ffill()
+
+        self.last_run = time.time()
+
+        if failed:
+            print(f"⚠️ Could not refresh {', '.join(failed)}; retrying in {RETRY_INTERVAL // 60} minutes.")
+
+        return failed
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                failed = self.run_once()
+
+            except Exception as e:
+                print(f"⚠️ Scheduled refresh failed: {e}")
+                failed = True
+
+            wait = RETRY_INTERVAL if failed else max(0.0, next_publish() - time.time())
+
+            self._stop.wait(wait)
+
+    def start(self):
+        """Refreshes now, then after every market close, in a daemon thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target = self._loop, name = "refresh-scheduler", daemon = True)
+            self._thread.start()
+
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+def start_scheduler(watchlist = None, api_key = None):
+    """
+    Starts a background RefreshScheduler when there is a watchlist.
+    The watchlist defaults to the comma-separated WATCHLIST variable and the key to
+    ALPHAVANTAGE_API_KEY.
+    Returns:
+        RefreshScheduler | None: The running scheduler; call stop() to end it.
+    """
+    if watchlist is None:
+        watchlist = parse_symbols(os.getenv("WATCHLIST", ""))
+
+    if not watchlist:
+        return None
+
+    return RefreshScheduler(watchlist, api_key or os.getenv("ALPHAVANTAGE_API_KEY")).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Keeps a watchlist's prices current after every market close.")
+    parser.add_argument("symbols", nargs = "*", help = "watchlist (default: the WATCHLIST variable)")
+    parser.add_argument("--api-key", default = os.getenv("ALPHAVANTAGE_API_KEY"))
+    parser.add_argument("--reserve", type = int, default = INTERACTIVE_RESERVE,
+                        help = "Alpha Vantage calls per day to leave for the apps")
+    parser.add_argument("--once", action = "store_true", help = "refresh once and exit")
+    args = parser.parse_args()
+
+    watchlist = parse_symbols(" ".join(args.symbols) or os.getenv("WATCHLIST", ""))
+
+    if not watchlist:
+        parser.error("no symbols given and WATCHLIST is not set")
+
+    scheduler = RefreshScheduler(watchlist, args.api_key, reserve = args.reserve)
+
+    if args.once:
+        scheduler.run_once()
+
+        if scheduler.ytd_gains is not None and not scheduler.ytd_gains.empty:
+            print(final_gains(scheduler.ytd_gains).round(2).to_string())
+
+        return
+
+    scheduler.start()
+    print(f"Keeping {len(watchlist)} symbol(s) current; next publish at "
+          f"{dt.datetime.fromtimestamp(next_publish(), MARKET_TZ):%Y-%m-%d %H:%M %Z}. Ctrl+C to stop.")
+
+    try:
+        while True:
+            time.sleep(3600)
+
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
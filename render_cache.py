@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from chart_render import close_figure, save_png
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "chart_cache")
+DEFAULT_MAX_FILES = 200
+PRUNE_GRACE = 300       # seconds a file just returned or being written is never pruned
+
+
+def data_version(gains):
+    """
+    Fingerprints the data a chart is drawn from, so a chart is invalidated as soon
+    as any price behind it changes.
+    Args:
+        gains (dict[str, pandas.Series]): Gain series keyed by symbol.
+    Returns:
+        str: Hex digest of the series values and their dates.
+    """
+    digest = hashlib.sha256()
+
+    for symbol, series in gains.items():
+        digest.update(symbol.encode())
+        digest.update(pd.util.hash_pandas_object(series, index = True).to_numpy().tobytes())
+
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Content-addressed store of rendered chart PNGs.
+    The file name is a hash of the tickers, date range, data version and render
+    settings, so repeated requests reuse the stored file and every distinct chart
+    gets its own path. Least recently used files are pruned beyond max_files, except
+    those used within PRUNE_GRACE seconds, so a path handed to one request is still
+    there when Gradio serves it.
+    """
+
+    def __init__(self, directory = DEFAULT_CACHE_DIR, max_files = DEFAULT_MAX_FILES, grace = PRUNE_GRACE):
+        """
+        Args:
+            directory (str): Folder holding the cached PNG files.
+            max_files (int): Maximum number of files kept on disk.
+            grace (float): Seconds after its last use during which a file is never pruned.
+        """
+        self.directory = directory
+        self.max_files = max_files
+        self.grace = grace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok = True)
+
+    def key(self, symbols, start_date, end_date, gains, **render_params):
+        """
+        Builds the cache key of a chart.
+        Args:
+            symbols (list[str]): Plotted symbols, in legend order.
+            start_date (str): Start of the date range.
+            end_date (str): End of the date range.
+            gains (dict[str, pandas.Series]): Plotted data, used as the data version.
+            **render_params: Anything else that changes the image (dpi, size, title).
+        Returns:
+            str: Hex digest identifying the chart.
+        """
+        spec = json.dumps({
+                           "symbols": list(symbols),
+                           "range": [str(start_date), str(end_date)],
+                           "data": data_version(gains),
+                           "render": render_params,
+                           }, sort_keys = True, default = str)
+
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get_or_render(self, key, render, dpi = 300):
+        """
+        Returns the stored PNG for a key, rendering and storing it on a miss.
+        Args:
+            key (str): Key from RenderCache.key().
+            render (callable): render() -> Figure, only called on a miss.
+            dpi (int): Resolution used when saving a new file.
+        Returns:
+            str: Path of the PNG file.
+        """
+        path = self.path(key)
+
+        try:
+            os.utime(path)  # mark as recently used, which also shields it from pruning
+
+            with self._lock:
+                self.hits += 1
+
+            return path
+
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.misses += 1
+
+        fig = render()
+        tmp_path = None
+
+        try:
+            # Write to a temporary name first so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(suffix = ".png", dir = self.directory)
+            os.close(fd)
+            save_png(fig, tmp_path, dpi = dpi)
+            os.replace(tmp_path, path)
+            tmp_path = None
+
+        finally:
+            close_figure(fig)
+
+            # The save failed: do not leave a partial file behind
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._prune()
+
+        return path
+
+    def stats(self):
+        """
+        Returns:
+            dict: Hit and miss counts.
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _prune(self):
+        with self._lock:
+            files = []
+
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".png"):
+                    try:
+                        files.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass    # already pruned by another request
+
+            if len(files) <= self.max_files:
+                return
+
+            files.sort()
+            cutoff = time.time() - self.grace
+
+            for mtime, path in files[:len(files) - self.max_files]:
+                # Oldest first, so everything after a recently used file is recent as well
+                if mtime > cutoff:
+                    break
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass    # already pruned by another request
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    Returns the process-wide render cache, creating it on first use.
+    Returns:
+        RenderCache: Shared cache stored next to the scripts.
+    """
+    global _default_cache
+
+    # Concurrent Gradio handlers reach this at the same time on the first requests
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = RenderCache()
+
+        return _default_cache
@@ -0,0 +1,601 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+from fetch_engine import TokenBucket
+
+
+REPLAY_HOST = "127.0.0.1"
+REPLAY_PORT = 8765
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay_fixtures")
+DEFAULT_MODELS = ["gemma2:2b", "mistral:7b"]
+COMPACT_BARS = 100          # bars in an Alpha Vantage 'compact' response
+FULL_BARS = 5000            # bars in a synthetic 'full' response (~20 years)
+SYNTHETIC_END_DATE = "2025-10-31"   # last bar of synthetic series, fixed so runs are repeatable
+FULL_INTRADAY_BARS = 2000   # bars in a synthetic intraday 'full' response
+INTRADAY_INTERVALS = ("1min", "5min", "15min", "30min", "60min")
+
+# Alpha Vantage's own wording: the rate-limit note mentions the premium plans too
+AV_RATE_LIMIT_NOTE = ("Thank you for using Alpha Vantage! Our standard API rate limit is "
+                      "25 requests per day. Please subscribe to any of the premium plans at "
+                      "https://www.alphavantage.co/premium/ to instantly remove all daily rate limits.")
+AV_PREMIUM_INFO = ("Thank you for using Alpha Vantage! This is a premium endpoint. You may subscribe to "
+                   "any of the premium plans at https://www.alphavantage.co/premium/ to instantly "
+                   "unlock all premium endpoints")
+
+
+def synthetic_daily_series(symbol, adjusted = False, bars = FULL_BARS, end_date = SYNTHETIC_END_DATE):
+    """
+    Builds a deterministic random-walk price history in Alpha Vantage's daily JSON layout.
+    The same symbol always yields the same prices.
+    Args:
+        symbol (str): Ticker symbol, also the random seed.
+        adjusted (bool): Use the TIME_SERIES_DAILY_ADJUSTED field names.
+        bars (int): Number of business days, ending at end_date.
+        end_date (str): Date of the newest bar (YYYY-MM-DD).
+    Returns:
+        dict: Bars keyed by date string, newest first, as in the real API.
+    """
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    dates = np.busday_offset(np.datetime64(end_date), np.arange(-bars + 1, 1), roll = 'backward')
+    close = 20 + rng.uniform(0, 200) * np.exp(np.cumsum(rng.normal(0.0004, 0.02, bars)))
+    open_ = close * (1 + rng.normal(0, 0.005, bars))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, bars))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, bars))
+    volume = rng.integers(1_000_000, 50_000_000, bars)
+    series = {}
+
+    for i in range(bars - 1, -1, -1):
+        bar = {"1. open": f"{open_[i]:.4f}", "2. high": f"{high[i]:.4f}",
+               "3. low": f"{low[i]:.4f}", "4. close": f"{close[i]:.4f}"}
+
+        if adjusted:
+            bar.update({"5. adjusted close": f"{close[i]:.4f}", "6. volume": str(volume[i]),
+                        "7. dividend amount": "0.0000", "8. split coefficient": "1.0"})
+        else:
+            bar["5. volume"] = str(volume[i])
+
+        series[str(dates[i])] = bar
+
+    return series
+
+
+def synthetic_intraday_series(symbol, interval = "5min", bars = COMPACT_BARS, now = None):
+    """
+    Builds intraday bars in Alpha Vantage's JSON layout, ending at the current interval.
+    Unlike the daily series they follow the wall clock, around the clock, so a polling
+    client sees a new bar every interval at any time of day. A bar's prices depend only
+    on the symbol and its timestamp, so overlapping responses agree.
+    Args:
+        symbol (str): Ticker symbol, also the random seed.
+        interval (str): '1min', '5min', '15min', '30min' or '60min'.
+        bars (int): Number of bars.
+        now (float | None): Unix time of the newest bar; the current time when None.
+    Returns:
+        dict: Bars keyed by 'YYYY-MM-DD HH:MM:SS' (US/Eastern), newest first.
+    """
+    minutes = int(interval.removesuffix("min"))
+    seed = zlib.crc32(symbol.encode())
+    last = int((time.time() if now is None else now) // (minutes * 60))
+    steps = np.arange(last - bars + 1, last + 1)
+    # Smooth daily and hourly swings plus per-bar noise hashed from the bar number
+    phase = (seed % 1000) / 1000 * 2 * np.pi
+    noise = np.array([zlib.crc32(f"{symbol}{step}".encode()) / 2 ** 32 - 0.5 for step in steps])
+    level = 20 + seed % 200
+    close = level * np.exp(0.02 * np.sin(steps * minutes / 1440 * 2 * np.pi + phase)
+                           + 0.005 * np.sin(steps * minutes / 60 * 2 * np.pi) + 0.002 * noise)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    volume = 1000 + (np.abs(noise) * 100_000).astype(int)
+    eastern = ZoneInfo("US/Eastern")
+    series = {}
+
+    for i in range(bars - 1, -1, -1):
+        stamp = datetime.datetime.fromtimestamp(int(steps[i]) * minutes * 60, eastern)
+        series[stamp.strftime("%Y-%m-%d %H:%M:%S")] = {
+                                                      "1. open": f"{open_[i]:.4f}",
+                                                      "2. high": f"{max(open_[i], close[i]):.4f}",
+                                                      "3. low": f"{min(open_[i], close[i]):.4f}",
+                                                      "4. close": f"{close[i]:.4f}",
+                                                      "5. volume": str(volume[i]),
+                                                      }
+
+    return series
+
+
+class ReplayServer:
+    """
+    Local stand-in for the Alpha Vantage query API and the Ollama HTTP API, so the
+    fetch, chart and chat paths can be run and benchmarked without network access.
+
+    Alpha Vantage: GET /query?function=TIME_SERIES_DAILY[_ADJUSTED]&symbol=...&outputsize=...
+    serves replay_fixtures/alpha_vantage/<FUNCTION>_<SYMBOL>.json when recorded, otherwise
+    a synthetic series; function=TIME_SERIES_INTRADAY&interval=... serves synthetic bars
+    that follow the wall clock. Ollama: GET /api/tags, GET /api/ps, POST /api/generate (streamed
+    or not, with cold/warm load times) and POST /api/chat. GET /replay/stats returns
+    request counters.
+
+    Injected behaviour: fixed latency plus jitter on every request, per-token delay for
+    generation, a per-minute Alpha Vantage quota answered with the API's rate-limit note,
+    and a random error rate (HTTP 503). All randomness is seeded.
+    """
+
+    def __init__(self, host = REPLAY_HOST, port = REPLAY_PORT, fixture_dir = DEFAULT_FIXTURE_DIR,
+                 latency = 0.0, jitter = 0.0, rate_limit_per_minute = None, error_rate = 0.0,
+                 premium = False, models = None, load_seconds = 1.0, token_seconds = 0.01,
+                 seed = 0):
+        """
+        Args:
+            host (str): Interface to bind.
+            port (int): Port to bind; 0 picks a free port.
+            fixture_dir (str): Folder with recorded responses.
+            latency (float): Seconds added to every request.
+            jitter (float): Extra random delay of up to this many seconds.
+            rate_limit_per_minute (int | None): Alpha Vantage calls allowed per minute; None for no limit.
+            error_rate (float): Fraction of requests answered with HTTP 503.
+            premium (bool): Serve TIME_SERIES_DAILY_ADJUSTED instead of the premium notice.
+            models (list[str] | None): Model names reported by /api/tags.
+            load_seconds (float): Simulated load time of a model that is not resident.
+            token_seconds (float): Simulated time per generated token.
+            seed (int): Seed of the latency, error and text generators.
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.premium = premium
+        self.models = list(models or DEFAULT_MODELS)
+        self.load_seconds = load_seconds
+        self.token_seconds = token_seconds
+        self.quota = TokenBucket(rate_limit_per_minute, 60) if rate_limit_per_minute else None
+        self.loaded = {}    # model -> expiry timestamp
+        self.counters = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _ReplayHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.replay = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+
+        return f"http://{host}:{port}"
+
+    @property
+    def alpha_vantage_url(self):
+        """Value for alpha_vantage_client's ALPHAVANTAGE_BASE_URL / PooledTimeSeries(base_url = ...)."""
+        return f"{self.url}/query?"
+
+    def start(self):
+        """Serves requests on a background thread and returns self."""
+        self._thread = threading.Thread(target = self._httpd.serve_forever, name = "replay-server",
+                                        daemon = True)
+        self._thread.start()
+
+        return self
+
+    def serve_forever(self):
+        """Serves requests on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def stats(self):
+        """
+        Returns:
+            dict: Requests served per endpoint plus injected rate-limit and error counts.
+        """
+        with self._lock:
+            return dict(self.counters)
+
+    def delay(self):
+        """Sleeps for the configured latency; returns True when this request should fail."""
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+            fail = self._random.random() < self.error_rate
+
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+        return fail
+
+    def fixture(self, *parts):
+        """Returns the parsed JSON fixture at fixture_dir/parts, or None when not recorded."""
+        path = os.path.join(self.fixture_dir, *parts)
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, encoding = "utf-8") as f:
+            return json.load(f)
+
+    def alpha_vantage(self, params):
+        function = params.get("function", "")
+        symbol = params.get("symbol", "").upper()
+        compact = params.get("outputsize", "compact") == "compact"
+
+        if function not in ("TIME_SERIES_DAILY", "TIME_SERIES_DAILY_ADJUSTED", "TIME_SERIES_INTRADAY"):
+            return {"Error Message": f"Invalid API call. Function {function!r} is not replayed."}
+
+        if not symbol:
+            return {"Error Message": "Invalid API call. Missing symbol."}
+
+        if self.quota is not None and self.quota.try_acquire():
+            self.count("alpha_vantage_rate_limited")
+
+            return {"Information": AV_RATE_LIMIT_NOTE}
+
+        if function == "TIME_SERIES_INTRADAY":
+            return self.intraday(symbol, params.get("interval", "15min"), compact)
+
+        adjusted = function == "TIME_SERIES_DAILY_ADJUSTED"
+
+        if adjusted and not self.premium:
+            return {"Information": AV_PREMIUM_INFO}
+
+        recorded = self.fixture("alpha_vantage", f"{function}_{symbol}.json")
+
+        if recorded is not None:
+            key = next(name for name in recorded if name != "Meta Data")
+            series = recorded[key]
+        else:
+            key = "Time Series (Daily)"
+            series = synthetic_daily_series(symbol, adjusted)
+
+        if compact:
+            series = dict(list(series.items())[:COMPACT_BARS])
+
+        information = "Daily Time Series with Splits and Dividend Events" if adjusted else \
+            "Daily Prices (open, high, low, close) and Volumes"
+
+        return {
+                "Meta Data": {
+                              "1. Information": information,
+                              "2. Symbol": symbol,
+                              "3. Last Refreshed": next(iter(series), ""),
+                              "4. Output Size": "Compact" if compact else "Full size",
+                              "5. Time Zone": "US/Eastern",
+                              },
+                key: series,
+                }
+
+    def intraday(self, symbol, interval, compact):
+        if interval not in INTRADAY_INTERVALS:
+            return {"Error Message": f"Invalid API call. Interval {interval!r} is not supported."}
+
+        series = synthetic_intraday_series(symbol, interval, COMPACT_BARS if compact else FULL_INTRADAY_BARS)
+
+        return {
+                "Meta Data": {
+                              "1. Information": f"Intraday ({interval}) open, high, low, close prices and volume",
+                              "2. Symbol": symbol,
+                              "3. Last Refreshed": next(iter(series)),
+                              "4. Interval": interval,
+                              "5. Output Size": "Compact" if compact else "Full size",
+                              "6. Time Zone": "US/Eastern",
+                              },
+                f"Time Series ({interval})": series,
+                }
+
+    def tags(self):
+        recorded = self.fixture("ollama", "tags.json")
+
+        if recorded is not None:
+            return recorded
+
+        return {"models": [{
+                            "name": model,
+                            "model": model,
+                            "modified_at": "2025-01-01T00:00:00Z",
+                            "size": 1_600_000_000,
+                            "digest": hashlib.sha256(model.encode()).hexdigest(),
+                            "details": {"format": "gguf", "family": model.split(":")[0],
+                                        "parameter_size": model.split(":")[-1].upper(),
+                                        "quantization_level": "Q4_0"},
+                            } for model in self.models]}
+
+    def running(self):
+        now = time.time()
+
+        with self._lock:
+            names = [model for model, expires in self.loaded.items() if expires > now]
+
+        return {"models": [{"name": model, "model": model, "size": 1_600_000_000,
+                            "digest": hashlib.sha256(model.encode()).hexdigest()}
+                           for model in names]}
+
+    def load(self, model, keep_alive):
+        """
+        Marks a model resident and returns the simulated load time in seconds:
+        load_seconds when it was not resident, a few milliseconds otherwise.
+        """
+        now = time.time()
+        seconds = _keep_alive_seconds(keep_alive)
+
+        with self._lock:
+            cold = self.loaded.get(model, 0) <= now
+
+            if seconds == 0:
+                self.loaded.pop(model, None)
+            else:
+                self.loaded[model] = now + seconds
+
+        load = self.load_seconds if cold and seconds != 0 else 0.005
+        time.sleep(load)
+
+        return load
+
+    def response_tokens(self, model, prompt):
+        """Recorded reply for (model, prompt) when available, else a deterministic synthetic one."""
+        name = hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()[:16]
+        recorded = self.fixture("ollama", "generate", f"{name}.json")
+
+        if recorded is not None:
+            text = recorded["response"]
+            # Split after whitespace so the chunks concatenate back to the recorded text
+            return [word + " " for word in text.split(" ")[:-1]] + [text.split(" ")[-1]]
+
+        words = prompt.split() or ["OK"]
+        rng = random.Random(name)
+        count = rng.randint(8, 32)
+
+        return [f"{rng.choice(words)} " for _ in range(count - 1)] + ["OK."]
+
+
+def _keep_alive_seconds(keep_alive):
+    """Converts an Ollama keep_alive value ('10m', '1h', 300, -1, 0) to seconds."""
+    if keep_alive is None:
+        return 300
+
+    if isinstance(keep_alive, (int, float)):
+        return float("inf") if keep_alive < 0 else float(keep_alive)
+
+    units = {"s": 1, "m": 60, "h": 3600}
+    value = keep_alive.strip()
+
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+
+    return float(value)
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass    # keep benchmark output clean
+
+    def send_json(self, payload, status = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        replay = self.server.replay
+        url = urlparse(self.path)
+
+        if url.path == "/replay/stats":
+            return self.send_json(replay.stats())
+
+        replay.count(url.path)
+
+        if replay.delay():
+            replay.count("errors")
+
+            return self.send_json({"error": "injected failure (replay server)"}, 503)
+
+        if url.path == "/query":
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+            return self.send_json(replay.alpha_vantage(params))
+
+        if url.path == "/api/tags":
+            return self.send_json(replay.tags())
+
+        if url.path == "/api/ps":
+            return self.send_json(replay.running())
+
+        self.send_json({"error": f"{url.path} is not replayed"}, 404)
+
+    def do_POST(self):
+        replay = self.server.replay
+        path = urlparse(self.path).path
+        replay.count(path)
+        request = self.read_json()
+
+        if replay.delay():
+            replay.count("errors")
+
+            return self.send_json({"error": "injected failure (replay server)"}, 503)
+
+        if path not in ("/api/generate", "/api/chat"):
+            return self.send_json({"error": f"{path} is not replayed"}, 404)
+
+        model = request.get("model", "")
+
+        if model not in replay.models:
+            return self.send_json({"error": f"model '{model}' not found"}, 404)
+
+        if path == "/api/chat":
+            messages = request.get("messages") or []
+            prompt = messages[-1].get("content", "") if messages else ""
+        else:
+            prompt = request.get("prompt", "")
+
+        started = time.perf_counter()
+        load = replay.load(model, request.get("keep_alive"))
+        created_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+        if not prompt and path == "/api/generate":
+            # Empty prompt: load (or unload with keep_alive=0) without generating
+            reason = "unload" if request.get("keep_alive") == 0 else "load"
+
+            return self.send_json({"model": model, "created_at": created_at, "response": "",
+                                   "done": True, "done_reason": reason})
+
+        tokens = replay.response_tokens(model, prompt)
+        generation_started = time.perf_counter()
+
+        def chunk(text, done = False):
+            body = {"model": model, "created_at": created_at, "done": done}
+
+            if path == "/api/chat":
+                body["message"] = {"role": "assistant", "content": text}
+            else:
+                body["response"] = text
+
+            if done:
+                eval_ns = int((time.perf_counter() - generation_started) * 1e9)
+                body.update({"done_reason": "stop",
+                             "total_duration": int((time.perf_counter() - started) * 1e9),
+                             "load_duration": int(load * 1e9),
+                             "prompt_eval_count": len(prompt.split()),
+                             "prompt_eval_duration": 1_000_000,
+                             "eval_count": len(tokens),
+                             "eval_duration": max(eval_ns, 1)})
+
+            return body
+
+        if not request.get("stream", True):
+            time.sleep(replay.token_seconds * len(tokens))
+
+            return self.send_json(chunk("".join(tokens), done = True))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for token in tokens:
+            time.sleep(replay.token_seconds)
+            self.write_chunk(chunk(token))
+
+        self.write_chunk(chunk("", done = True))
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, payload):
+        line = json.dumps(payload).encode() + b"\n"
+        self.wfile.write(f"{len(line):X}\r\n".encode() + line + b"\r\n")
+        self.wfile.flush()
+
+
+def record_alpha_vantage(api_key, symbol, function = "TIME_SERIES_DAILY", fixture_dir = DEFAULT_FIXTURE_DIR):
+    """
+    Saves a live full-history Alpha Vantage response as a replay fixture.
+    Args:
+        api_key (str): Alpha Vantage API key.
+        symbol (str): Ticker symbol.
+        function (str): TIME_SERIES_DAILY or TIME_SERIES_DAILY_ADJUSTED.
+        fixture_dir (str): Fixture folder.
+    Returns:
+        str: Path of the written file.
+    """
+    import requests
+
+    response = requests.get("https://www.alphavantage.co/query",
+                            params = {"function": function, "symbol": symbol,
+                                      "outputsize": "full", "apikey": api_key}, timeout = 30)
+    payload = response.json()
+
+    if "Meta Data" not in payload:
+        raise ValueError(f"Alpha Vantage returned no data for {symbol}: {payload}")
+
+    return _write_fixture(payload, fixture_dir, "alpha_vantage", f"{function}_{symbol.upper()}.json")
+
+
+def record_ollama(model, prompt, fixture_dir = DEFAULT_FIXTURE_DIR):
+    """
+    Saves the local Ollama daemon's model list and its reply to one prompt as replay fixtures.
+    Returns:
+        str: Path of the written reply fixture.
+    """
+    from ollama_manager import get_client
+
+    client = get_client()
+    _write_fixture(client.list().model_dump(mode = "json"), fixture_dir, "ollama", "tags.json")
+    reply = client.generate(model = model, prompt = prompt)
+    name = hashlib.sha256(f"{model}\n{prompt}".encode()).hexdigest()[:16]
+
+    return _write_fixture({"model": model, "prompt": prompt, "response": reply['response']},
+                          fixture_dir, "ollama", "generate", f"{name}.json")
+
+
+def _write_fixture(payload, fixture_dir, *parts):
+    path = os.path.join(fixture_dir, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+
+    with open(path, "w", encoding = "utf-8") as f:
+        json.dump(payload, f, indent = 1)
+
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Offline replay server for Alpha Vantage and Ollama.")
+    parser.add_argument("--host", default = REPLAY_HOST)
+    parser.add_argument("--port", type = int, default = REPLAY_PORT)
+    parser.add_argument("--fixtures", default = DEFAULT_FIXTURE_DIR)
+    parser.add_argument("--latency", type = float, default = 0.0, help = "seconds added to every request")
+    parser.add_argument("--jitter", type = float, default = 0.0, help = "extra random delay, seconds")
+    parser.add_argument("--rate-limit", type = int, default = None,
+                        help = "Alpha Vantage calls per minute before the rate-limit note")
+    parser.add_argument("--error-rate", type = float, default = 0.0, help = "fraction of HTTP 503 replies")
+    parser.add_argument("--premium", action = "store_true", help = "serve TIME_SERIES_DAILY_ADJUSTED")
+    parser.add_argument("--models", default = ",".join(DEFAULT_MODELS))
+    parser.add_argument("--load-seconds", type = float, default = 1.0)
+    parser.add_argument("--token-seconds", type = float, default = 0.01)
+    args = parser.parse_args()
+
+    server = ReplayServer(args.host, args.port, args.fixtures, args.latency, args.jitter,
+                          args.rate_limit, args.error_rate, args.premium,
+                          [m.strip() for m in args.models.split(",") if m.strip()],
+                          args.load_seconds, args.token_seconds)
+    print(f"Replay server on {server.url}")
+    print(f"  ALPHAVANTAGE_BASE_URL={server.alpha_vantage_url}")
+    print(f"  OLLAMA_HOST={server.url}")
+
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import os
+
+
+# Concurrency limits shared by the Gradio apps; override through environment variables.
+# Generate calls share one limit per GPU, cheap cached lookups get many slots.
+OLLAMA_GENERATE_LIMIT = int(os.getenv("OLLAMA_GPU_SLOTS", "1"))
+OLLAMA_GENERATE_ID = "ollama_generate"
+STOCK_CHART_LIMIT = int(os.getenv("STOCK_CHART_CONCURRENCY", "8"))
+DEFAULT_CONCURRENCY_LIMIT = int(os.getenv("GRADIO_DEFAULT_CONCURRENCY", "4"))
+QUEUE_MAX_SIZE = int(os.getenv("GRADIO_QUEUE_MAX_SIZE", "64"))
+MAX_THREADS = int(os.getenv("GRADIO_MAX_THREADS", "40"))
+
+
+def launch(demo, **kwargs):
+    """
+    Enables the bounded request queue and launches a Gradio app.
+    Sync handlers run on Gradio's worker thread pool (MAX_THREADS), so one slow
+    Alpha Vantage or Ollama call only occupies its own event's concurrency slots.
+    Users see their queue position while waiting, and the /monitoring dashboard
+    shows queue depth and per-event latency.
+    Args:
+        demo (gr.Blocks): App to launch.
+        **kwargs: Extra arguments passed to demo.launch().
+    Returns:
+        The result of demo.launch().
+    """
+    demo.queue(max_size = QUEUE_MAX_SIZE, default_concurrency_limit = DEFAULT_CONCURRENCY_LIMIT)
+
+    kwargs.setdefault("max_threads", MAX_THREADS)
+    kwargs.setdefault("enable_monitoring", True)
+
+    return demo.launch(**kwargs)
@@ -0,0 +1,352 @@
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from fetch_engine import SingleFlight
+from market_calendar import last_publish
+from tracing import span
+
+
+DEFAULT_CACHE_PATH = os.getenv("PRICE_CACHE_PATH",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), "price_cache.sqlite"))
+DEFAULT_TTL = 6 * 60 * 60       # refresh at most every 6 hours
+DEFAULT_MAX_ENTRIES = 500       # LRU limit on cached (symbol, endpoint, adjusted) series
+PREMIUM_RECHECK = 24 * 60 * 60  # retry the adjusted endpoint for a key at most once a day
+REVISION_RTOL = 1e-6            # a stored bar that moved more than this was revised
+
+# Identical downloads in flight at the same time share one API call
+_downloads = SingleFlight()
+# API key -> time the adjusted (premium) endpoint was last refused for it
+_premium_unavailable = {}
+# Wording of the premium refusal; the rate-limit notes also link to the "premium plans"
+PREMIUM_REFUSAL = "premium endpoint"
+_premium_lock = threading.Lock()
+
+
+class PriceCache:
+    """
+    Persistent SQLite cache for Alpha Vantage time series.
+    The full history of a series is downloaded once; after the TTL expires, or once a
+    new daily bar has been published since the last fetch, only a 'compact' delta
+    (last 100 bars) is fetched and merged into the stored bars. When the delta does not
+    reach back to the stored bars (a gap) or changes a stored bar (a dividend or split
+    re-adjusted the history, or the data was corrected), the full series is downloaded
+    again instead, so the stored history never mixes adjustment bases.
+    Entries are keyed by (symbol, endpoint, adjusted) and evicted least-recently-used.
+    """
+
+    def __init__(self, path = DEFAULT_CACHE_PATH, ttl = DEFAULT_TTL, max_entries = DEFAULT_MAX_ENTRIES):
+        """
+        Opens (or creates) the cache database.
+        Args:
+            path (str): SQLite file path, or ':memory:' for a throw-away cache.
+            ttl (float): Seconds a cached series is served without contacting the API.
+            max_entries (int): Maximum number of cached series before LRU eviction.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.reloads = 0
+        self.stale = 0          # failed refreshes answered with the stored bars
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread = False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                symbol      TEXT    NOT NULL,
+                endpoint    TEXT    NOT NULL,
+                adjusted    INTEGER NOT NULL,
+                fetched_at  REAL    NOT NULL,
+                last_access REAL    NOT NULL,
+                PRIMARY KEY (symbol, endpoint, adjusted)
+            );
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol   TEXT    NOT NULL,
+                endpoint TEXT    NOT NULL,
+                adjusted INTEGER NOT NULL,
+                date     TEXT    NOT NULL,
+                field    TEXT    NOT NULL,
+                value    REAL,
+                PRIMARY KEY (symbol, endpoint, adjusted, date, field)
+            );
+        """)
+
+    def get(self, symbol, endpoint, adjusted, fetch, full_size = 'full'):
+        """
+        Returns the cached series, fetching or refreshing it through `fetch` when needed.
+        Args:
+            symbol (str): Stock ticker symbol.
+            endpoint (str): Alpha Vantage function name, e.g. 'TIME_SERIES_DAILY_ADJUSTED'.
+            adjusted (bool): Whether the series holds split/dividend-adjusted prices.
+            fetch (callable): fetch(outputsize) -> pandas.DataFrame indexed by date.
+            full_size (str): Output size used for the first download of a series.
+        Returns:
+            pandas.DataFrame: All stored bars for the key, sorted by date.
+        """
+        key = (symbol, endpoint, int(bool(adjusted)))
+
+        with self._lock:
+            row = self._conn.execute("SELECT fetched_at FROM entries "
+                                     "WHERE symbol = ? AND endpoint = ? AND adjusted = ?",
+                                     key).fetchone()
+
+        now = time.time()
+
+        if row is not None and now - row[0] < self.ttl and row[0] >= last_publish(now):
+            self._count("hits")
+        elif row is not None:
+            try:
+                delta = fetch('compact')
+
+                if full_size != 'compact' and self._revised(key, delta):
+                    print(f"Stored history of {symbol} was revised or has a gap; downloading it again.")
+                    self._store(key, fetch(full_size), now, replace = True)
+                    self._count("reloads")
+                else:
+                    self._store(key, delta, now)
+
+                self._count("refreshes")
+
+            except Exception as e:
+                # Quota exhausted, network or API hiccup: stale bars beat no bars. The
+                # attempt may have used quota, so it is not counted as a saved call
+                self._count("stale")
+                print(f"⚠️ Refresh of {symbol} failed ({e}). Serving cached data.")
+        else:
+            self._count("misses")
+            self._store(key, fetch(full_size), now)
+
+        return self._load(key, now)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _revised(self, key, delta):
+        """
+        Compares a 'compact' delta with the stored bars.
+        Returns:
+            bool: True when the delta does not overlap the stored bars, or when it changes a
+            stored bar other than the newest one (which may have been an intraday snapshot).
+        """
+        delta = delta.set_axis(pd.to_datetime(delta.index)).sort_index()
+
+        with self._lock:
+            newest = self._conn.execute("SELECT MAX(date) FROM bars "
+                                        "WHERE symbol = ? AND endpoint = ? AND adjusted = ?", key).fetchone()[0]
+
+            if newest is None or delta.empty or delta.index[0] > pd.Timestamp(newest):
+                return True
+
+            rows = self._conn.execute("SELECT date, field, value FROM bars "
+                                      "WHERE symbol = ? AND endpoint = ? AND adjusted = ? "
+                                      "AND date >= ? AND date < ?",
+                                      (*key, delta.index[0].strftime("%Y-%m-%d %H:%M:%S"), newest)).fetchall()
+
+        if not rows:
+            return False
+
+        stored = pd.DataFrame(rows, columns = ["date", "field", "value"]) \
+                   .pivot(index = "date", columns = "field", values = "value")
+        stored.index = pd.to_datetime(stored.index, format = "%Y-%m-%d %H:%M:%S")
+        dates = stored.index.intersection(delta.index)
+        fields = stored.columns.intersection(delta.columns)
+
+        if len(dates) < len(stored):
+            return True     # a stored bar is missing from the new data
+
+        new = delta.loc[dates, fields].to_numpy(dtype = float)
+        old = stored.loc[dates, fields].to_numpy(dtype = float)
+
+        return not np.allclose(new, old, rtol = REVISION_RTOL, atol = 0.0, equal_nan = True)
+
+    def invalidate(self, symbol = None):
+        """
+        Drops cached series.
+        Args:
+            symbol (str | None): Drop only this symbol, or everything when None.
+        """
+        where, params = ("WHERE symbol = ?", (symbol,)) if symbol else ("", ())
+
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM bars {where}", params)
+            self._conn.execute(f"DELETE FROM entries {where}", params)
+
+    def evict_expired(self, max_age):
+        """
+        Removes series that have not been refreshed for `max_age` seconds.
+        Args:
+            max_age (float): Age in seconds after which a series is dropped.
+        Returns:
+            int: Number of evicted series.
+        """
+        cutoff = time.time() - max_age
+
+        with self._lock, self._conn:
+            keys = self._conn.execute("SELECT symbol, endpoint, adjusted FROM entries "
+                                      "WHERE fetched_at < ?", (cutoff,)).fetchall()
+            self._delete(keys)
+
+        return len(keys)
+
+    def stats(self):
+        """
+        Reports cache effectiveness.
+        Returns:
+            dict: Hit/miss/refresh/reload counts, failed refreshes served 'stale', and
+            the number of API calls the cache saved.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+        return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "reloads": self.reloads,
+                "stale": self.stale,
+                "entries": entries,
+                "api_calls_saved": self.hits,
+                "full_downloads_saved": self.hits + self.refreshes,
+                }
+
+    def _store(self, key, frame, now, replace = False):
+        frame = frame.copy()
+        frame.index = pd.to_datetime(frame.index).strftime("%Y-%m-%d %H:%M:%S")
+        rows = [(*key, date, field, None if pd.isna(value) else float(value))
+                for field, column in frame.items()
+                for date, value in column.items()]
+
+        with self._lock, self._conn:
+            if replace:
+                self._conn.execute("DELETE FROM bars WHERE symbol = ? AND endpoint = ? AND adjusted = ?", key)
+
+            self._conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                               (*key, now, now))
+            self._evict_lru()
+
+    def _load(self, key, now):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE entries SET last_access = ? "
+                               "WHERE symbol = ? AND endpoint = ? AND adjusted = ?",
+                               (now, *key))
+            rows = self._conn.execute("SELECT date, field, value FROM bars "
+                                      "WHERE symbol = ? AND endpoint = ? AND adjusted = ?",
+                                      key).fetchall()
+
+        long = pd.DataFrame(rows, columns = ["date", "field", "value"])
+        # pivot sorts the ISO date strings, which is already chronological order
+        data = long.pivot(index = "date", columns = "field", values = "value")
+        data.index = pd.to_datetime(data.index, format = "%Y-%m-%d %H:%M:%S")
+        data.index.name = "date"
+        data.columns.name = None
+
+        return data
+
+    def _evict_lru(self):
+        # Caller holds the lock and an open transaction
+        overflow = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+
+        if overflow > 0:
+            keys = self._conn.execute("SELECT symbol, endpoint, adjusted FROM entries "
+                                      "ORDER BY last_access ASC LIMIT ?", (overflow,)).fetchall()
+            self._delete(keys)
+
+    def _delete(self, keys):
+        for table in ("bars", "entries"):
+            self._conn.executemany(f"DELETE FROM {table} "
+                                   "WHERE symbol = ? AND endpoint = ? AND adjusted = ?", keys)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """
+    Returns the process-wide price cache, creating it on first use.
+    Returns:
+        PriceCache: Shared cache stored next to the scripts.
+    """
+    global _default_cache
+
+    # fetch_many worker threads reach this at the same time on the first batch
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PriceCache()
+
+        return _default_cache
+
+
+def premium_available(api_key):
+    """
+    Returns:
+        bool: False when the adjusted endpoint refused this key within the last PREMIUM_RECHECK seconds.
+    """
+    with _premium_lock:
+        refused_at = _premium_unavailable.get(api_key)
+
+    return refused_at is None or time.time() - refused_at >= PREMIUM_RECHECK
+
+
+def _remember_premium_refusal(api_key, error):
+    # Only the premium notice is remembered; quota notes and network errors are retried
+    if PREMIUM_REFUSAL not in str(error).lower():
+        return False
+
+    with _premium_lock:
+        _premium_unavailable[api_key] = time.time()
+
+    return True
+
+
+def get_daily_prices(ts, symbol, cache = None):
+    """
+    Fetches daily prices through the cache, preferring the adjusted (premium) endpoint
+    and falling back to basic daily data when it is not available.
+    Concurrent downloads of the same (key, symbol, endpoint, outputsize) share one API call,
+    and a key refused by the premium endpoint goes straight to basic data until PREMIUM_RECHECK.
+    Args:
+        ts (TimeSeries): Alpha Vantage TimeSeries client with pandas output.
+        symbol (str): Stock ticker symbol.
+        cache (PriceCache | None): Cache to use; the shared default cache when None.
+    Returns:
+        tuple[pandas.DataFrame, str]: Price bars sorted by date and the close column to use.
+    """
+    cache = cache or default_cache()
+
+    api_key = getattr(ts, 'key', None)
+
+    def download(get, endpoint, size):
+        # Includes the HTTP call and the library's JSON → DataFrame conversion
+        with span("alpha_vantage.download", symbol = symbol, size = size):
+            return _downloads.do((api_key, symbol, endpoint, size),
+                                 lambda: get(symbol = symbol, outputsize = size)[0])
+
+    if premium_available(api_key):
+        try:
+            with span("price_cache.get", symbol = symbol, adjusted = True):
+                data = cache.get(symbol, 'TIME_SERIES_DAILY_ADJUSTED', True,
+                                 lambda size: download(ts.get_daily_adjusted, 'TIME_SERIES_DAILY_ADJUSTED', size))
+            print(f"✅ Using adjusted data for {symbol}")
+
+            return data, '5. adjusted close'
+
+        except ValueError as e:
+            if _remember_premium_refusal(api_key, e):
+                print(f"⚠️ Premium endpoint not available for {symbol}. Using basic daily data.")
+            else:
+                print(f"⚠️ Adjusted data for {symbol} failed ({e}). Using basic daily data.")
+
+    with span("price_cache.get", symbol = symbol, adjusted = False):
+        data = cache.get(symbol, 'TIME_SERIES_DAILY', False,
+                         lambda size: download(ts.get_daily, 'TIME_SERIES_DAILY', size), full_size = 'compact')
+
+    return data, '4. close'
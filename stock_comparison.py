@@ -0,0 +1,139 @@
+import re
+import string
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from chart_render import MAX_CHART_POINTS, decimate_gains, plot_comparison
+from gain_kernel import cumulative_gains, gains_frame
+from price_sources import StoredSource, get_source
+from tracing import span
+
+
+MAX_SYMBOLS = 200           # largest basket accepted by one comparison
+DEFAULT_TOP_N = 5           # symbols drawn as individual lines; the rest form the band
+BAND_PERCENTILES = (10, 90)
+
+
+def parse_symbols(text, max_symbols = MAX_SYMBOLS):
+    """
+    Splits a comma/space separated symbol list.
+    Args:
+        text (str): e.g. "NVDA, AMD IBM;msft".
+        max_symbols (int): Symbols beyond this count are dropped.
+    Returns:
+        list[str]: Upper-case symbols (Latin letters only), duplicates removed, in input order.
+    """
+    symbols = [''.join(filter(lambda c: c in string.ascii_uppercase, part.upper()))
+               for part in re.split(r"[\s,;]+", text or "")]
+
+    return [symbol for symbol in dict.fromkeys(symbols) if symbol][:max_symbols]
+
+
+def compare(symbols, start_date, end_date, source = None):
+    """
+    Fetches any number of symbols in one deduplicated, batched request set and computes
+    all cumulative gains as one date×symbol matrix.
+    Args:
+        symbols (list[str]): Ticker symbols.
+        start_date (str): First date (YYYY-MM-DD), inclusive.
+        end_date (str): Last date (YYYY-MM-DD), inclusive.
+        source (PriceSource | None): Price source; the shared keyless source when None.
+    Returns:
+        tuple[pandas.DataFrame, list[str]]: Gains (%) indexed by date with one column per
+        symbol that returned data, and the symbols that did not.
+    """
+    source = source or get_source()
+    symbols = list(dict.fromkeys(symbols))
+
+    if isinstance(source, StoredSource):
+        # The store aligns every symbol on its shared calendar straight into one matrix
+        with span("fetch", symbols = len(symbols)):
+            index, present, prices = source.aligned(symbols, start_date, end_date)
+
+        keep = ~np.isnan(prices).all(axis = 0)
+        present = [symbol for symbol, kept in zip(present, keep) if kept]
+        missing = [symbol for symbol in symbols if symbol not in present]
+
+        if not present:
+            return pd.DataFrame(), missing
+
+        with span("gains", symbols = len(present)):
+            return pd.DataFrame(cumulative_gains(prices[:, keep]), index = index, columns = present), missing
+
+    with span("fetch", symbols = len(symbols)):
+        prices = source.fetch_many(symbols, start_date, end_date)
+
+    closes = {symbol: prices[symbol]['adj_close'] for symbol in symbols if symbol in prices}
+    missing = [symbol for symbol in symbols if symbol not in prices]
+
+    if not closes:
+        return pd.DataFrame(), missing
+
+    with span("gains", symbols = len(closes)):
+        return gains_frame(closes), missing
+
+
+def final_gains(gains):
+    """
+    Returns:
+        pandas.Series: Gain at the last date per symbol, best first. Gains are
+        forward-filled by the kernel, so the last row holds every symbol's latest value.
+    """
+    return gains.iloc[-1].sort_values(ascending = False)
+
+
+def basket_band(gains, percentiles = BAND_PERCENTILES):
+    """
+    Summarises a basket per date.
+    Args:
+        gains (pandas.DataFrame): date×symbol gains.
+        percentiles (tuple[float, float]): Lower and upper edge of the band.
+    Returns:
+        pandas.DataFrame: 'low', 'median' and 'high' columns indexed by date.
+    """
+    low, high = percentiles
+
+    with warnings.catch_warnings():
+        # Dates before every symbol's first bar are all-NaN rows
+        warnings.simplefilter("ignore", RuntimeWarning)
+        values = np.nanpercentile(gains.to_numpy(dtype = np.float64), [low, 50, high], axis = 1)
+
+    return pd.DataFrame({'low': values[0], 'median': values[1], 'high': values[2]}, index = gains.index)
+
+
+def comparison_chart(gains, top_n = DEFAULT_TOP_N, max_points = MAX_CHART_POINTS):
+    """
+    Builds the interactive chart data for a basket: the top_n symbols by final gain as
+    their own lines plus the basket median and percentile band, each LTTB-decimated,
+    so the chart size does not grow with the basket.
+    Args:
+        gains (pandas.DataFrame): date×symbol gains.
+        top_n (int): Number of highlighted symbols.
+        max_points (int): Maximum points per line.
+    Returns:
+        pandas.DataFrame: Long table with 'Date', 'Gain (%)' and 'Symbol' columns.
+    """
+    top = list(final_gains(gains).index[:top_n])
+    series = {symbol: gains[symbol] for symbol in top}
+
+    if gains.shape[1] > len(top):
+        band = basket_band(gains)
+        low, high = BAND_PERCENTILES
+        series.update({f"Basket p{high}": band['high'], "Basket median": band['median'],
+                       f"Basket p{low}": band['low']})
+
+    return decimate_gains(series, max_points)
+
+
+def comparison_figure(gains, title, top_n = DEFAULT_TOP_N, figsize = (12, 7)):
+    """
+    Renders a basket for PNG export: top_n lines over a faint band of the whole basket.
+    Returns:
+        Figure: The rendered figure.
+    """
+    top = list(final_gains(gains).index[:top_n])
+    band = basket_band(gains) if gains.shape[1] > len(top) else None
+
+    return plot_comparison(gains, top, band, title, figsize = figsize)
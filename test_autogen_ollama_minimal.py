@@ -2,11 +2,17 @@ import datetime
 import traceback
 import gradio as gr
 
-from autogen import ConversableAgent, AssistantAgent
+from agent_tools import AGENT_MODEL, run_analysis
+from llm_cache import register_ollama_client
+from serving import OLLAMA_GENERATE_ID, OLLAMA_GENERATE_LIMIT, launch
 
 
 # Configs to be tested
-llm_config_writer = {"model" : "gemma2:2b"}    # {"model" : "mistral:7b"}
+# Answered through Ollama's chat API and the persistent LLM cache (llm_cache.py); AutoGen's own
+# disk cache is switched off so responses are not stored twice
+llm_config_writer = {"config_list" : [{"model" : "gemma2:2b", "model_client_cls" : "OllamaModelClient",
+                                       "temperature" : 0}],
+                     "cache_seed" : None}    # "model" : "mistral:7b"
 llm_config_executor = None
 
 def test_agent_configs(writer_cfg = None, executor_cfg = None):
@@ -15,6 +21,9 @@ def test_agent_configs(writer_cfg = None, executor_cfg = None):
     safe initiating message. Returns (status_message, error_trace_or_empty).
     """
     try:
+        # AutoGen takes over a second to import, so it is loaded on the first test run
+        from autogen import ConversableAgent, AssistantAgent
+
         # 1) Check if it can instantiate the AssistantAgent (writer)
         writer = AssistantAgent(
                                 name = "test_writer",
@@ -22,6 +31,7 @@ def test_agent_configs(writer_cfg = None, executor_cfg = None):
                                 code_execution_config = False,
                                 human_input_mode = "NEVER",
                                 )
+        register_ollama_client(writer)
 
         # 2) Check if it can instantiate the ConversableAgent (executor)
         executor = ConversableAgent(
@@ -40,7 +50,8 @@ def test_agent_configs(writer_cfg = None, executor_cfg = None):
 
         # initiate_chat may call the LLM backend depending on AutoGen internals;
         # this will expose errors related to llm_config format/initialization.
-        chat_result = executor.initiate_chat(writer, message = message)
+        # One round trip is enough for a config test; the executor never waits for console input
+        chat_result = executor.initiate_chat(writer, message = message, max_turns = 1)
 
         # If it reaches this point, instantiation and initiation succeeded
         return (
@@ -56,6 +67,26 @@ def test_agent_configs(writer_cfg = None, executor_cfg = None):
                 tb
                 )
 
+
+def run_pipeline(model, question):
+    """
+    Runs the tool-calling finance agents on a question.
+    Returns (answer, tool_cache_stats_or_trace).
+    """
+    if not question.strip():
+        return "⚠️ Please enter a question.", ""
+
+    try:
+        from agent_tools import ollama_llm_config
+
+        answer, stats = run_analysis(question.strip(), ollama_llm_config(model.strip() or AGENT_MODEL))
+
+        return answer, (f"Tool cache: {stats['hits']} hits, {stats['misses']} misses, "
+                        f"{stats['results']} stored results.")
+
+    except Exception:
+        return "❌ Pipeline run failed. See trace below.", traceback.format_exc()
+
 # --- Gradio interface for quick local testing --- #
 with gr.Blocks() as demo:
     gr.Markdown("### Quick AutoGen + Ollama config smoke-test\nPress the button to test only the " \
@@ -64,8 +95,21 @@ with gr.Blocks() as demo:
     out_text = gr.Textbox(label = "Result", interactive = False, lines = 3)
     out_trace = gr.Textbox(label = "Trace (if any)", interactive = False, lines = 12)
 
-    btn.click(fn = test_agent_configs, inputs = None, outputs = [out_text, out_trace])
+    btn.click(fn = lambda: test_agent_configs(llm_config_writer, llm_config_executor),
+              inputs = None, outputs = [out_text, out_trace],
+              concurrency_limit = OLLAMA_GENERATE_LIMIT, concurrency_id = OLLAMA_GENERATE_ID)
+
+    gr.Markdown("### Finance agent pipeline\nThe analyst calls the project's price and gain functions " \
+                "as tools; results are cached, so repeated questions spend no API quota.")
+    model_box = gr.Textbox(label = "Ollama model (must support tool calls)", value = AGENT_MODEL)
+    question_box = gr.Textbox(label = "Question", placeholder = "e.g. How did NVDA and IBM do this year?")
+    ask_btn = gr.Button("Ask the agents")
+    answer_text = gr.Textbox(label = "Answer", interactive = False, lines = 6)
+    pipeline_info = gr.Textbox(label = "Cache / trace", interactive = False, lines = 4)
+
+    ask_btn.click(fn = run_pipeline, inputs = [model_box, question_box], outputs = [answer_text, pipeline_info],
+                  concurrency_limit = OLLAMA_GENERATE_LIMIT, concurrency_id = OLLAMA_GENERATE_ID)
 
 
 if __name__ == "__main__":
-    demo.launch()
+    launch(demo)
@@ -1,25 +1,26 @@
-import yfinance as yf
+from price_sources import get_source
 
 
-def test_fetch_stock_data(ticker):
+def test_fetch_stock_data(tickers):
     """
-    Fetches historical stock data for a given ticker using Yahoo Finance API.
+    Fetches historical stock data for a list of tickers in one batched request through
+    the shared price sources (Yahoo Finance, with local CSV files as fallback).
     Args:
-    ticker (str): Stock symbol (e.g., "NVDA", "META") to fetch data for.
+    tickers (list[str]): Stock symbols (e.g., ["NVDA", "META"]) to fetch data for.
     """
     try:
-        # Attempt to fetch historical data
-        data = yf.download(ticker, start = "2025-01-01", end = "2025-10-29")
+        # Attempt to fetch historical data for the whole list at once
+        results = get_source().fetch_many(tickers, "2025-01-01", "2025-10-29")
 
-        if data.empty:
-            print(f"No data fetched for {ticker}.")
-        else:
-            print(f"Data fetched successfully for {ticker}.")
+        for ticker in tickers:
+            if ticker in results:
+                print(f"Data fetched successfully for {ticker} ({len(results[ticker])} rows).")
+            else:
+                print(f"No data fetched for {ticker}.")
 
     except Exception as e:
-        print(f"Failed to fetch data for {ticker}: {e}")
+        print(f"Failed to fetch data for {', '.join(tickers)}: {e}")
 
 
 # Test fetching data for NVDA and META
-test_fetch_stock_data("NVDA")
-test_fetch_stock_data("META")
+test_fetch_stock_data(["NVDA", "META"])
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gain_kernel import cumulative_gain, cumulative_gains, forward_fill, gains_frame
+
+
+def reference_gain(close):
+    # The pct_change/cumprod chain the kernel replaced
+    return ((1 + close.ffill().pct_change(fill_method = None).fillna(0)).cumprod() - 1) * 100
+
+
+def test_forward_fill_keeps_leading_nans():
+    prices = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan], [4.0, 5.0]])
+    expected = np.array([[np.nan, 1.0], [2.0, 1.0], [2.0, 1.0], [4.0, 5.0]])
+
+    np.testing.assert_array_equal(forward_fill(prices), expected)
+
+
+def test_cumulative_gain_matches_the_pandas_chain():
+    rng = np.random.default_rng(3)
+    close = pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.02, 250)),
+                      index = pd.bdate_range("2025-01-01", periods = 250))
+    close.iloc[[10, 11, 100]] = np.nan
+
+    np.testing.assert_allclose(cumulative_gain(close).to_numpy(), reference_gain(close).to_numpy(), rtol = 1e-9)
+
+
+def test_gains_are_relative_to_each_symbols_first_bar():
+    prices = np.array([[np.nan, 50.0], [10.0, 55.0], [12.0, np.nan], [15.0, 45.0]])
+    gains = cumulative_gains(prices, percent = False)
+
+    assert np.isnan(gains[0, 0])
+    np.testing.assert_allclose(gains[1:, 0], [0.0, 0.2, 0.5])
+    np.testing.assert_allclose(gains[:, 1], [0.0, 0.1, 0.1, -0.1])
+
+
+def test_empty_matrix():
+    assert cumulative_gains(np.empty((0, 3))).shape == (0, 3)
+
+
+def test_gains_frame_aligns_on_the_union_of_dates():
+    a = pd.Series([10.0, 11.0, 12.0], index = pd.to_datetime(["2025-01-02", "2025-01-03", "2025-01-06"]))
+    b = pd.Series([20.0, 30.0], index = pd.to_datetime(["2025-01-03", "2025-01-07"]))
+    frame = gains_frame({"A": a, "B": b})
+
+    assert list(frame.columns) == ["A", "B"]
+    assert list(frame.index.strftime("%Y-%m-%d")) == ["2025-01-02", "2025-01-03", "2025-01-06", "2025-01-07"]
+    np.testing.assert_allclose(frame["A"].to_numpy(), [0.0, 10.0, 20.0, 20.0])
+    assert np.isnan(frame["B"].iloc[0])
+    np.testing.assert_allclose(frame["B"].to_numpy()[1:], [0.0, 0.0, 50.0])
+
+
+@pytest.mark.parametrize("percent, scale", [(True, 100), (False, 1)])
+def test_percent_scaling(percent, scale):
+    gains = cumulative_gains(np.array([[2.0], [3.0]]), percent = percent)
+
+    np.testing.assert_allclose(gains[:, 0], [0.0, 0.5 * scale])
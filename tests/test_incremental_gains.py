@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gain_kernel import cumulative_gain
+from incremental_gains import IncrementalGains
+
+
+START = "2025-01-01"
+
+
+@pytest.fixture
+def prices():
+    rng = np.random.default_rng(7)
+    close = pd.Series(100 * np.cumprod(1 + rng.normal(0, 0.02, 300)),
+                      index = pd.bdate_range(START, periods = 300, name = 'date'), name = 'adj_close')
+    close.iloc[[0, 1, 50, 51, 200]] = np.nan
+
+    return close
+
+
+@pytest.fixture
+def engine():
+    return IncrementalGains()
+
+
+def assert_matches_kernel(gains, prices):
+    expected = cumulative_gain(prices)
+
+    assert gains.index.equals(expected.index)
+    np.testing.assert_allclose(gains.to_numpy(), expected.to_numpy(), rtol = 1e-12, equal_nan = True)
+
+
+def rebuilds(engine, symbol = "NVDA"):
+    return engine._get(symbol, START, 'adj_close')[0].rebuilds
+
+
+def test_growing_and_shrinking_windows_match_the_kernel(engine, prices):
+    for end in (10, 120, 121, 300, 40):
+        assert_matches_kernel(engine.update("NVDA", START, prices.iloc[:end]), prices.iloc[:end])
+
+    assert rebuilds(engine) == 0
+
+
+def test_interior_revision_rebuilds(engine, prices):
+    engine.update("NVDA", START, prices)
+    # A dividend re-adjusts every bar before the ex-date, leaving the base price alone
+    revised = prices.copy()
+    revised.iloc[150:299] *= 0.98
+
+    assert_matches_kernel(engine.update("NVDA", START, revised), revised)
+    assert rebuilds(engine) == 1
+
+
+def test_revised_date_rebuilds(engine, prices):
+    engine.update("NVDA", START, prices)
+    moved = prices.copy()
+    moved.index = moved.index.where(moved.index != moved.index[100], moved.index[100] + pd.Timedelta(hours = 1))
+
+    assert_matches_kernel(engine.update("NVDA", START, moved), moved)
+    assert rebuilds(engine) == 1
+
+
+def test_newest_bar_revision_is_recomputed_alone(engine, prices):
+    engine.update("NVDA", START, prices)
+    revised = prices.copy()
+    revised.iloc[-1] *= 1.01
+
+    assert_matches_kernel(engine.update("NVDA", START, revised), revised)
+    assert rebuilds(engine) == 0
+
+
+def test_random_revisions_match_the_kernel(engine, prices):
+    rng = np.random.default_rng(11)
+    current = prices.copy()
+
+    for _ in range(200):
+        end = int(rng.integers(1, len(prices) + 1))
+
+        if rng.random() < 0.3:
+            current.iloc[int(rng.integers(0, end))] *= 1 + rng.normal(0, 0.01)
+
+        assert_matches_kernel(engine.update("NVDA", START, current.iloc[:end]), current.iloc[:end])
+
+
+def test_handed_out_series_never_change(engine, prices):
+    first = engine.update("NVDA", START, prices.iloc[:200])
+    snapshot = first.copy()
+
+    revised = prices.copy()
+    revised.iloc[199] *= 1.05        # newest bar of the first request
+    engine.update("NVDA", START, revised.iloc[:200])
+    engine.push("NVDA", START, prices.index[199], 1.0)
+    engine.update("NVDA", START, revised * 0.9)
+
+    pd.testing.assert_series_equal(first, snapshot)
+
+
+def test_push_matches_the_kernel(engine, prices):
+    engine.update("NVDA", START, prices.iloc[:100])
+    date = prices.index[100]
+
+    engine.push("NVDA", START, date, 1.0)       # provisional quote, replaced below
+    gain = engine.push("NVDA", START, date, prices.iloc[100])
+
+    expected = cumulative_gain(prices.iloc[:101])
+    assert gain == pytest.approx(expected.iloc[-1])
+    assert engine.last("NVDA", START) == (date, pytest.approx(expected.iloc[-1]))
+
+
+def test_push_rejects_older_bars(engine, prices):
+    engine.update("NVDA", START, prices.iloc[:100])
+
+    with pytest.raises(ValueError):
+        engine.push("NVDA", START, prices.index[50], 100.0)
+
+
+def test_nanosecond_and_second_indexes_agree(engine, prices):
+    seconds = prices.copy()
+    seconds.index = seconds.index.as_unit('s')
+
+    assert_matches_kernel(engine.update("NVDA", START, prices.iloc[:150]), prices.iloc[:150])
+    assert_matches_kernel(engine.update("NVDA", START, seconds), prices)
+    assert rebuilds(engine) == 0
+
+
+def test_series_are_keyed_by_symbol_start_and_column(engine, prices):
+    engine.update("NVDA", START, prices)
+    later = prices.loc["2025-06-02":]
+
+    assert_matches_kernel(engine.update("NVDA", "2025-06-02", later), later)
+    assert_matches_kernel(engine.update("NVDA", START, prices.iloc[:10] * 2, column = 'close'), prices.iloc[:10])
+    assert rebuilds(engine) == 0
@@ -0,0 +1,146 @@
+import itertools
+
+from types import SimpleNamespace
+
+import pytest
+
+import llm_cache
+
+from llm_cache import LLMCache, deterministic
+
+
+MODEL = "llama3.1:8b"
+DIGEST = "sha256:aaaa"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Strictly increasing access times, so LRU order never depends on timer resolution
+    ticks = itertools.count(1_000_000)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time = lambda: float(next(ticks))))
+
+
+@pytest.fixture
+def cache(clock):
+    return LLMCache(":memory:")
+
+
+def key(prompt = "hi", options = None, model = MODEL, digest = DIGEST):
+    return LLMCache.key(model, digest, {"prompt": prompt}, options)
+
+
+def test_key_is_canonical():
+    assert LLMCache.key(MODEL, DIGEST, {"prompt": "hi"}, {"seed": 1, "temperature": 0}) == \
+           LLMCache.key(MODEL, DIGEST, {"prompt": "hi"}, {"temperature": 0, "seed": 1})
+    assert key(options = None) == key(options = {})
+
+
+@pytest.mark.parametrize("changed", [key(prompt = "hello"), key(model = "mistral"), key(digest = "sha256:bbbb"),
+                                     key(options = {"seed": 2}), key(options = {"seed": 1, "temperature": 0.5}),
+                                     LLMCache.key(MODEL, DIGEST, {"messages": [{"role": "user", "content": "hi"}]},
+                                                  {"seed": 1})])
+def test_every_part_of_the_request_changes_the_key(changed):
+    assert changed != key(options = {"seed": 1})
+
+
+def test_put_and_get(cache):
+    assert cache.get(key()) is None
+    cache.put(key(), MODEL, DIGEST, "hello there")
+
+    assert cache.get(key()) == "hello there"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "responses": 1, "bytes": 11}
+
+
+def test_eviction_drops_least_recently_used_bytes(clock):
+    cache = LLMCache(":memory:", max_bytes = 30)
+    cache.put(key("a"), MODEL, DIGEST, "x" * 10)
+    cache.put(key("b"), MODEL, DIGEST, "y" * 10)
+    cache.put(key("c"), MODEL, DIGEST, "z" * 10)
+    cache.get(key("a"))                         # "b" is now the least recently used
+    cache.put(key("d"), MODEL, DIGEST, "w" * 10)
+
+    assert cache.get(key("b")) is None
+    assert [cache.get(key(prompt)) for prompt in "acd"] == ["x" * 10, "z" * 10, "w" * 10]
+    assert cache.stats()["bytes"] == 30
+
+
+def test_eviction_counts_utf8_bytes(clock):
+    cache = LLMCache(":memory:", max_bytes = 10)
+    cache.put(key("a"), MODEL, DIGEST, "é" * 4)     # 8 bytes
+    cache.put(key("b"), MODEL, DIGEST, "ab")
+
+    assert cache.stats()["bytes"] == 10
+    cache.put(key("c"), MODEL, DIGEST, "c")
+
+    assert cache.get(key("a")) is None
+
+
+def test_new_digest_drops_the_old_weights_responses(cache):
+    cache.put(key(), MODEL, DIGEST, "old")
+    cache.put(key(model = "mistral"), "mistral", DIGEST, "other model")
+    cache.use_digest(MODEL, "sha256:bbbb")
+
+    assert cache.get(key()) is None
+    assert cache.get(key(model = "mistral")) == "other model"
+
+
+def test_failed_generations_are_not_stored(cache):
+    def fail():
+        raise ConnectionError("ollama down")
+
+    with pytest.raises(ConnectionError):
+        cache.get_or_call(key(), MODEL, DIGEST, fail)
+
+    assert cache.get_or_call(key(), MODEL, DIGEST, lambda: "ok") == "ok"
+    assert cache.get_or_call(key(), MODEL, DIGEST, fail) == "ok"
+
+
+@pytest.mark.parametrize("options, expected", [(None, False), ({}, False), ({"temperature": 0.7}, False),
+                                               ({"seed": None}, False), ({"temperature": 0}, True),
+                                               ({"temperature": 0.0}, True), ({"seed": 0}, True),
+                                               ({"seed": 42, "temperature": 0.9}, True)])
+def test_deterministic(options, expected):
+    assert deterministic(options) is expected
+
+
+class FakeOllama:
+    def __init__(self):
+        self.calls = 0
+
+    def generate(self, model, prompt, options = None):
+        self.calls += 1
+
+        return {"response": f"answer {self.calls}"}
+
+
+@pytest.fixture
+def ollama(monkeypatch, cache):
+    client = FakeOllama()
+    monkeypatch.setattr(llm_cache, "get_client", lambda: client)
+    monkeypatch.setattr(llm_cache, "default_llm_cache", lambda: cache)
+    monkeypatch.setattr(llm_cache, "model_digest", lambda model: DIGEST)
+
+    return client
+
+
+def test_only_deterministic_requests_are_cached(ollama):
+    assert llm_cache.generate(MODEL, "hi", {"seed": 1}) == "answer 1"
+    assert llm_cache.generate(MODEL, "hi", {"seed": 1}) == "answer 1"
+    assert llm_cache.generate(MODEL, "hi", {"temperature": 0.8}) == "answer 2"
+    assert llm_cache.generate(MODEL, "hi", {"temperature": 0.8}) == "answer 3"
+    assert ollama.calls == 3
+
+
+def test_unknown_digest_bypasses_the_cache(ollama, monkeypatch):
+    monkeypatch.setattr(llm_cache, "model_digest", lambda model: None)
+    llm_cache.generate(MODEL, "hi", {"seed": 1})
+    llm_cache.generate(MODEL, "hi", {"seed": 1})
+
+    assert ollama.calls == 2
+
+
+def test_generate_many_sends_each_prompt_once(ollama):
+    answers = llm_cache.generate_many(MODEL, ["a", "b", "a"], {"temperature": 0})
+
+    assert answers[0] == answers[2] and answers[0] != answers[1]
+    assert ollama.calls == 2
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from price_store import PriceStore
+
+
+def prices(start, periods, first = 100.0):
+    dates = pd.bdate_range(start, periods = periods, name = 'date')
+    close = first + np.arange(periods, dtype = float) * 0.25
+
+    return pd.DataFrame({'close': close, 'adj_close': close * 0.99,
+                         'volume': np.arange(periods, dtype = float) * 1000}, index = dates)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path))
+
+
+def test_write_read_roundtrip(store):
+    data = prices("2025-01-01", 250)
+    store.write("NVDA", data)
+    read = store.read("NVDA")
+
+    assert read.index.equals(data.index.as_unit('s'))
+    # Prices are stored as float32
+    np.testing.assert_allclose(read['close'].to_numpy(), data['close'].to_numpy(), rtol = 1e-6)
+    np.testing.assert_allclose(read['adj_close'].to_numpy(), data['adj_close'].to_numpy(), rtol = 1e-6)
+    np.testing.assert_array_equal(read['volume'].to_numpy(), data['volume'].to_numpy().astype(np.int64))
+    assert store.symbols() == ["NVDA"]
+    assert store.updated_at("NVDA") is not None
+
+
+def test_read_is_inclusive_and_unsorted_input_is_sorted(store):
+    data = prices("2025-01-01", 20)
+    store.write("NVDA", data.iloc[::-1])
+    read = store.read("NVDA", "2025-01-03", "2025-01-08")
+
+    assert list(read.index.strftime("%Y-%m-%d")) == ["2025-01-03", "2025-01-06", "2025-01-07", "2025-01-08"]
+    assert store.read("NVDA", "2026-01-01").empty
+
+
+def test_missing_symbol(store):
+    assert store.read("NVDA") is None
+    assert store.updated_at("NVDA") is None
+
+
+def test_similar_symbols_stay_apart(store):
+    store.write("BRK", prices("2025-01-01", 5, first = 10.0))
+    store.write("BRK.B", prices("2025-01-01", 7, first = 20.0))
+
+    assert len(store.read("BRK")) == 5
+    assert len(store.read("BRK.B")) == 7
+    assert store.symbols() == ["BRK", "BRK.B"]
+
+
+def test_rewrite_replaces_the_version_but_not_open_views(store, tmp_path):
+    store.write("NVDA", prices("2025-01-01", 10))
+    old = store.read("NVDA")
+    store.write("NVDA", prices("2025-01-01", 12, first = 200.0))
+
+    assert len(store.read("NVDA")) == 12
+    assert store.read("NVDA")['close'].iloc[0] == 200.0
+    assert len(old) == 10 and old['close'].iloc[0] == 100.0
+    assert len(list(tmp_path.glob("NVDA.*.prices"))) == 1
+
+
+def test_writes_of_another_store_are_seen(store, tmp_path):
+    store.write("NVDA", prices("2025-01-01", 10))
+    assert len(store.read("NVDA")) == 10
+
+    # e.g. refresh_scheduler.py running as its own process
+    PriceStore(str(tmp_path)).write("NVDA", prices("2025-01-01", 15))
+
+    assert len(store.read("NVDA")) == 15
+
+
+def test_aligned_places_symbols_on_the_shared_calendar(store):
+    store.write("A", prices("2025-01-01", 3))
+    store.write("B", prices("2025-01-02", 3, first = 50.0))
+    dates, symbols, matrix = store.aligned(["A", "MISSING", "B"], column = 'close')
+
+    assert symbols == ["A", "B"]
+    assert list(dates.strftime("%Y-%m-%d")) == ["2025-01-01", "2025-01-02", "2025-01-03", "2025-01-06"]
+    np.testing.assert_allclose(matrix[:, 0], [100.0, 100.25, 100.5, np.nan])
+    np.testing.assert_allclose(matrix[:, 1], [np.nan, 50.0, 50.25, 50.5])
+
+
+def test_version_removed_before_it_is_mapped(store, monkeypatch):
+    store.write("NVDA", prices("2025-01-01", 10))
+    stale = store._path("NVDA")
+    store.write("NVDA", prices("2025-01-01", 12))
+    paths = iter([stale])
+    newest = PriceStore._path
+
+    # The first lookup returns the version the second write already removed
+    monkeypatch.setattr(PriceStore, "_path", lambda self, symbol: next(paths, None) or newest(self, symbol))
+
+    assert len(store.read("NVDA")) == 12
+
+
+def test_calendar_skips_symbols_removed_after_listing(store, monkeypatch):
+    store.write("A", prices("2025-01-01", 3))
+    store.write("B", prices("2025-01-06", 2))
+    monkeypatch.setattr(store, "symbols", lambda: ["A", "B", "GONE"])
+
+    assert len(store.calendar()) == 5
@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from stock_cache import PriceCache
+
+
+CLOSE = '5. adjusted close'
+
+
+def bars(dates, closes):
+    return pd.DataFrame({CLOSE: closes, '6. volume': np.full(len(closes), 1000.0)},
+                        index = pd.DatetimeIndex(dates, name = 'date'))
+
+
+class FakeAPI:
+    """Serves a full history and 'compact' windows of its last 100 bars, recording every call."""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.calls = []
+        self.error = None
+
+    def __call__(self, outputsize):
+        self.calls.append(outputsize)
+
+        if self.error is not None:
+            raise self.error
+
+        return self.frame.copy() if outputsize == 'full' else self.frame.iloc[-100:].copy()
+
+
+@pytest.fixture
+def history():
+    dates = pd.bdate_range("2025-01-01", periods = 200)
+
+    return bars(dates, np.linspace(100.0, 150.0, len(dates)))
+
+
+@pytest.fixture
+def cache():
+    # ttl = 0: every get after the first refreshes
+    return PriceCache(":memory:", ttl = 0)
+
+
+def get(cache, api, full_size = 'full'):
+    return cache.get("NVDA", 'TIME_SERIES_DAILY_ADJUSTED', True, api, full_size = full_size)
+
+
+def next_bar(frame, close):
+    return bars([frame.index[-1] + pd.offsets.BDay()], [close])
+
+
+def test_first_get_downloads_full_history(cache, history):
+    api = FakeAPI(history)
+    data = get(cache, api)
+
+    assert api.calls == ['full']
+    assert cache.stats()["misses"] == 1
+    np.testing.assert_allclose(data[CLOSE].to_numpy(), history[CLOSE].to_numpy())
+
+
+def test_fresh_entry_is_served_without_a_call(history):
+    cache = PriceCache(":memory:", ttl = 3600)
+    api = FakeAPI(history)
+    get(cache, api)
+    get(cache, api)
+
+    # The entry was fetched after the last publish time and within the TTL
+    assert api.calls == ['full']
+    assert cache.stats()["hits"] == 1
+
+
+def test_new_bar_is_merged_from_a_compact_delta(cache, history):
+    api = FakeAPI(history)
+    get(cache, api)
+    api.frame = pd.concat([history, next_bar(history, 151.0)])
+    data = get(cache, api)
+
+    assert api.calls == ['full', 'compact']
+    assert cache.stats()["refreshes"] == 1 and cache.stats()["reloads"] == 0
+    assert len(data) == len(history) + 1
+    assert data[CLOSE].iloc[-1] == 151.0
+
+
+def test_revised_newest_bar_is_merged(cache, history):
+    api = FakeAPI(history)
+    get(cache, api)
+    # The newest stored bar may have been an intraday snapshot
+    api.frame = history.copy()
+    api.frame.iloc[-1, 0] = 149.0
+    data = get(cache, api)
+
+    assert api.calls == ['full', 'compact']
+    assert data[CLOSE].iloc[-1] == 149.0
+
+
+def test_dividend_reloads_the_full_history(cache, history):
+    api = FakeAPI(history)
+    get(cache, api)
+    # A dividend re-adjusts every earlier bar, including those outside the compact window
+    adjusted = history.copy()
+    adjusted[CLOSE] *= 0.99
+    api.frame = pd.concat([adjusted, next_bar(adjusted, 151.0)])
+    data = get(cache, api)
+
+    assert api.calls == ['full', 'compact', 'full']
+    assert cache.stats()["reloads"] == 1
+    np.testing.assert_allclose(data[CLOSE].to_numpy(), api.frame[CLOSE].to_numpy())
+
+
+def test_gap_reloads_the_full_history(cache, history):
+    api = FakeAPI(history.iloc[:50])
+    get(cache, api)
+    # The compact window starts after the newest stored bar
+    api.frame = history
+    data = get(cache, api)
+
+    assert api.calls == ['full', 'compact', 'full']
+    assert cache.stats()["reloads"] == 1
+    assert len(data) == len(history)
+
+
+def test_missing_stored_bar_reloads_the_full_history(cache, history):
+    api = FakeAPI(history)
+    get(cache, api)
+    api.frame = history.drop(history.index[-10])
+    data = get(cache, api)
+
+    assert api.calls == ['full', 'compact', 'full']
+    assert history.index[-10] not in data.index
+
+
+def test_compact_only_series_are_merged_without_reload(cache, history):
+    # Basic daily data has no full download; a gap is merged as it is
+    api = FakeAPI(history.iloc[:50])
+    get(cache, api, full_size = 'compact')
+    api.frame = history
+    data = get(cache, api, full_size = 'compact')
+
+    assert api.calls == ['compact', 'compact']
+    assert cache.stats()["reloads"] == 0
+    assert len(data) == 150
+
+
+@pytest.mark.parametrize("error", [ValueError("Thank you for using Alpha Vantage!"),
+                                   ConnectionError("network down"), KeyError("Time Series (Daily)")])
+def test_refresh_error_serves_stale_bars(cache, history, error):
+    api = FakeAPI(history)
+    get(cache, api)
+    api.error = error
+    data = get(cache, api)
+
+    assert len(data) == len(history)
+    assert cache.stats()["stale"] == 1
+    # The failed attempt may have used quota, so it saved nothing
+    assert cache.stats()["api_calls_saved"] == 0
+
+
+def test_failed_reload_keeps_the_stored_history(cache, history):
+    api = FakeAPI(history)
+    get(cache, api)
+    adjusted = history.copy()
+    adjusted[CLOSE] *= 0.99
+    api.frame = adjusted
+
+    def fail_full(outputsize):
+        if outputsize == 'full':
+            raise ConnectionError("network down")
+
+        return FakeAPI.__call__(api, outputsize)
+
+    data = get(cache, fail_full)
+
+    # Mixing the compact delta into the old basis would be worse than stale bars
+    np.testing.assert_allclose(data[CLOSE].to_numpy(), history[CLOSE].to_numpy())
@@ -0,0 +1,304 @@
+import contextvars
+import functools
+import inspect
+import os
+import threading
+import time
+
+from collections import deque
+
+
+# Set TRACE_STAGES=1 to record per-stage timings of every handler request
+TRACE_ENABLED = os.getenv("TRACE_STAGES", "0") not in ("", "0", "false", "False")
+# Comma-separated exporters: 'log' prints each request, 'prometheus' and 'otel' need their packages
+TRACE_EXPORT = [name.strip() for name in os.getenv("TRACE_EXPORT", "log").split(",") if name.strip()]
+PROMETHEUS_PORT = os.getenv("PROMETHEUS_PORT")     # serve /metrics on this port when set
+RECENT_TRACES = 100
+
+_current = contextvars.ContextVar("trace", default = None)
+_recent = deque(maxlen = RECENT_TRACES)
+_recent_lock = threading.Lock()
+_exporters = None
+_exporters_lock = threading.Lock()
+
+
+class _NoopSpan:
+    """Returned by span() when no trace is active, so disabled tracing costs one lookup."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "started")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+
+        self.trace.record(self.name, self.started, time.perf_counter(), self.attrs)
+
+        return False
+
+
+class Trace:
+    """
+    Timings of one request: a list of named spans with their start offset and duration.
+    Spans may be recorded from any thread that runs with the trace active.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.started = time.perf_counter()
+        self.wall_started = time.time()
+        self.total = None
+        self._lock = threading.Lock()
+
+    def span(self, name, **attrs):
+        return _Span(self, name, attrs)
+
+    def record(self, name, started, ended, attrs = None):
+        with self._lock:
+            self.spans.append({"name": name, "offset": started - self.started,
+                               "seconds": ended - started, "thread": threading.current_thread().name,
+                               "attrs": attrs or {}})
+
+    def activate(self):
+        """Context manager making this the trace that span() records into."""
+        return _Activation(self)
+
+    def finish(self):
+        """Stops the clock, keeps the trace for recent_traces() and sends it to the exporters."""
+        self.total = time.perf_counter() - self.started
+
+        with _recent_lock:
+            _recent.append(self)
+
+        for export in get_exporters():
+            try:
+                export(self)
+
+            except Exception as e:
+                print(f"⚠️ Trace export failed: {e}")
+
+    def format(self):
+        """
+        Returns:
+            str: One line per span, in start order, followed by the request total.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key = lambda s: s["offset"])
+
+        lines = [f"{s['offset'] * 1000:8.1f} ms  +{s['seconds'] * 1000:8.1f} ms  {s['name']}"
+                 + (f"  {s['attrs']}" if s["attrs"] else "") for s in spans]
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        lines.append(f"{'':>8}     ={total * 1000:8.1f} ms  {self.name} total")
+
+        return "\n".join(lines)
+
+
+class _Activation:
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self.token = _current.set(self.trace)
+
+        return self.trace
+
+    def __exit__(self, *exc_info):
+        _current.reset(self.token)
+
+        return False
+
+
+def span(name, **attrs):
+    """
+    Times a stage of the active request, e.g. `with span("alpha_vantage.http"): ...`.
+    Does nothing when no trace is active.
+    """
+    trace = _current.get()
+
+    return _NOOP if trace is None else _Span(trace, name, attrs)
+
+
+def recent_traces():
+    """
+    Returns:
+        list[Trace]: The last RECENT_TRACES finished requests, oldest first.
+    """
+    with _recent_lock:
+        return list(_recent)
+
+
+def traced(name = None):
+    """
+    Decorator that runs a Gradio handler under a new trace when TRACE_ENABLED.
+    Works for plain functions and for generator handlers, whose trace stays active
+    for every step and finishes when the stream ends.
+    """
+    def decorate(fn):
+        trace_name = name or fn.__name__
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def stream(*args, **kwargs):
+                if not TRACE_ENABLED:
+                    yield from fn(*args, **kwargs)
+                    return
+
+                trace = Trace(trace_name)
+                steps = fn(*args, **kwargs)
+
+                try:
+                    while True:
+                        # Gradio may run each step in a different thread/context, so activate per step
+                        with trace.activate():
+                            try:
+                                item = next(steps)
+                            except StopIteration:
+                                return
+
+                        yield item
+
+                finally:
+                    trace.finish()
+
+            return stream
+
+        @functools.wraps(fn)
+        def call(*args, **kwargs):
+            if not TRACE_ENABLED:
+                return fn(*args, **kwargs)
+
+            trace = Trace(trace_name)
+
+            try:
+                with trace.activate():
+                    return fn(*args, **kwargs)
+
+            finally:
+                trace.finish()
+
+        return call
+
+    return decorate
+
+
+def with_timings(fn, name = None):
+    """
+    Wraps a handler that returns a tuple so its stage timings are returned as one
+    more output, for a debug panel next to the handler's own outputs.
+    Args:
+        fn (callable): Handler returning a tuple.
+        name (str | None): Trace name; the function name by default.
+    Returns:
+        callable: Handler returning fn's outputs plus the formatted trace
+        ('' when tracing is off).
+    """
+    trace_name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def call(*args, **kwargs):
+        if not TRACE_ENABLED:
+            return (*fn(*args, **kwargs), "")
+
+        trace = Trace(trace_name)
+
+        try:
+            with trace.activate():
+                result = fn(*args, **kwargs)
+
+        finally:
+            trace.finish()
+
+        return (*result, trace.format())
+
+    return call
+
+
+def _log_exporter(trace):
+    print(f"[trace] {trace.name}\n{trace.format()}")
+
+
+def _prometheus_exporter():
+    from prometheus_client import Histogram, start_http_server
+
+    stages = Histogram("app_stage_seconds", "Duration of traced stages", ["request", "stage"])
+    requests = Histogram("app_request_seconds", "Duration of traced requests", ["request"])
+
+    if PROMETHEUS_PORT:
+        start_http_server(int(PROMETHEUS_PORT))
+
+    def export(trace):
+        for s in trace.spans:
+            stages.labels(trace.name, s["name"]).observe(s["seconds"])
+
+        requests.labels(trace.name).observe(trace.total)
+
+    return export
+
+
+def _otel_exporter():
+    from opentelemetry import trace as otel
+
+    tracer = otel.get_tracer("agentic_finance")
+
+    def export(trace):
+        # Spans are replayed after the request with their measured timestamps
+        base_ns = int(trace.wall_started * 1e9)
+        root = tracer.start_span(trace.name, start_time = base_ns)
+        context = otel.set_span_in_context(root)
+
+        for s in trace.spans:
+            start_ns = base_ns + int(s["offset"] * 1e9)
+            child = tracer.start_span(s["name"], context = context, start_time = start_ns,
+                                      attributes = {key: str(value) for key, value in s["attrs"].items()})
+            child.end(end_time = start_ns + int(s["seconds"] * 1e9))
+
+        root.end(end_time = base_ns + int(trace.total * 1e9))
+
+    return export
+
+
+def get_exporters():
+    """
+    Returns:
+        list[callable]: Exporters named in TRACE_EXPORT whose packages are installed.
+    """
+    global _exporters
+
+    with _exporters_lock:
+        if _exporters is None:
+            factories = {"log": lambda: _log_exporter, "prometheus": _prometheus_exporter,
+                         "otel": _otel_exporter}
+            _exporters = []
+
+            for name in TRACE_EXPORT:
+                try:
+                    _exporters.append(factories[name]())
+
+                except ImportError as e:
+                    print(f"⚠️ Trace exporter '{name}' unavailable: {e}")
+
+                except KeyError:
+                    print(f"⚠️ Unknown trace exporter '{name}'.")
+
+        return _exporters